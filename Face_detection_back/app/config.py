@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -12,15 +13,99 @@ class Settings(BaseSettings):
     face_distance_metric: str = "cosine"
     face_detection_threshold: float = 0.50
     face_detection_confidence: float = 0.3
+    face_alignment: bool = True
+    face_live_alignment: str = "detector"
+    
+    embedding_backend: str = "tensorflow"
+    embedding_model_path: Optional[str] = None
+    embedding_num_threads: int = 0
+    
+    face_embedding_cache_enabled: bool = True
+    face_embedding_cache_size: int = 1024
+    face_embedding_cache_dir: Optional[str] = None
+    face_template_dir: Optional[str] = "face_templates"
+    
+    identify_top_k: int = 5
+    
+    ann_backend: str = "exact"
+    ann_nlist: int = 0
+    ann_nprobe: int = 16
+    ann_rerank_k: int = 100
+    ann_min_train_size: int = 10000
+    ann_train_iterations: int = 10
+    ann_index_path: Optional[str] = "face_index/ivf_index.npz"
     
     liveness_min_valid_frames: int = 2
     liveness_center_ratio_min: float = 0.5
     liveness_center_ratio_max: float = 2.0
     liveness_left_turn_threshold: float = 0.50
     liveness_mirror_threshold: float = 1.5
+    liveness_analysis_max_side: int = 640
+    
+    face_crop_margin: float = 0.3
+    face_crop_max_side: int = 480
+    
+    face_mesh_pool_size: int = 0
+    face_mesh_pool_timeout: float = 30.0
+    
+    model_warmup_enabled: bool = True
+    model_warmup_timeout: float = 120.0
+    
+    fake_models: bool = False
+    fake_model_cost: str = "sleep"
+    fake_face_mesh_ms: float = 5.0
+    fake_detector_ms: float = 25.0
+    fake_embedding_ms: float = 80.0
+    
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = True
+    
+    pipeline_executor: str = "thread"
+    pipeline_max_workers: int = 0
+    
+    inference_batching_enabled: bool = False
+    inference_batch_max_size: int = 8
+    inference_batch_max_wait_ms: float = 5.0
+    inference_batch_timeout_seconds: float = 30.0
+    
+    admission_enabled: bool = True
+    admission_max_concurrent: int = 0
+    admission_queue_size: int = 16
+    admission_max_wait_seconds: float = 10.0
+    admission_reject_status: int = 503
+    
+    stream_max_frames: int = 120
+    stream_max_frame_bytes: int = 2097152
+    stream_idle_timeout_seconds: float = 10.0
+    stream_max_seconds: float = 60.0
+    
+    job_workers: int = 2
+    job_queue_size: int = 16
+    job_result_ttl_seconds: float = 600.0
+    job_callback_url: Optional[str] = None
+    job_callback_allowed_hosts: str = ""
+    job_callback_timeout: float = 5.0
+    job_callback_retries: int = 3
+    job_callback_workers: int = 4
+    
+    upload_chunk_size: int = 1048576
+    upload_max_image_bytes: int = 10485760
+    upload_max_video_bytes: int = 52428800
+    upload_max_frames: int = 16
+    upload_max_frame_bytes: int = 2097152
     
     video_num_frames: int = 4
+    video_max_frames: int = 10
+    video_refine_frames: int = 2
+    video_refine_min_change: float = 0.3
     video_temp_suffix: str = ".mp4"
+    video_in_memory: bool = True
+    video_seek_min_gap: int = 120
+    video_max_scan_frames: int = 3000
+    video_check_container: bool = True
+    video_allowed_codecs: str = ""
+    video_max_dimension: int = 3840
+    video_max_duration_seconds: float = 30.0
     
     debug_mode: bool = False
     debug_dir: str = "debug_images"
@@ -1,21 +1,49 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from app.routers import verify
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routers import verify, enroll, jobs, stream
 from app.config import get_settings
 from app.logger import setup_logging, get_logger
-from app.models import HealthResponse
+from app.models import HealthResponse, ReadinessResponse
+from app.services.executor import shutdown_executor
+from app.services.face_matcher import shutdown_embedding_batcher
+from app.services.jobs import get_job_queue
+from app.services.metrics import CONTENT_TYPE, render_metrics
+from app.services.warmup import get_model_warmup
+from app.middleware import AdmissionCheckMiddleware, RequestSizeLimitMiddleware, RequestTimingMiddleware
 
 setup_logging()
 logger = get_logger(__name__)
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms models up in the background and starts the job workers; releases them on shutdown."""
+    if settings.model_warmup_enabled:
+        get_model_warmup().start()
+    get_job_queue().start()
+    yield
+    await get_job_queue().stop()
+    shutdown_executor()
+    shutdown_embedding_batcher()
+
+
 app = FastAPI(
     title=settings.app_title,
     description=settings.app_description,
-    version=settings.app_version
+    version=settings.app_version,
+    lifespan=lifespan
 )
 
+app.add_middleware(RequestSizeLimitMiddleware)
+app.add_middleware(RequestTimingMiddleware)
+app.add_middleware(AdmissionCheckMiddleware)
+
 app.include_router(verify.router)
+app.include_router(enroll.router)
+app.include_router(jobs.router)
+app.include_router(stream.router)
 
 
 @app.get("/", response_model=HealthResponse)
@@ -30,6 +58,33 @@ async def health_check() -> HealthResponse:
     return HealthResponse(version=settings.app_version)
 
 
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response) -> ReadinessResponse:
+    """
+    Readiness check: 200 once every model has loaded and warmed up, 503 before.
+    
+    With warm-up disabled, models load on first use and the service is
+    always reported ready.
+    """
+    warmup = get_model_warmup()
+    ready = warmup.is_ready() or not settings.model_warmup_enabled
+    if not ready:
+        response.status_code = 503
+    return ReadinessResponse(status="ready" if ready else "loading", models=warmup.status())
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Prometheus text-format metrics: per-stage and total request latency
+    histograms, verification outcome counters, in-flight requests and
+    executor queue depth. Disabled (404) with METRICS_ENABLED=false.
+    """
+    if not settings.metrics_enabled:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler for unhandled errors."""
@@ -0,0 +1,140 @@
+import json
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.admission import Overloaded, get_admission_controller, overloaded_response
+from app.services.metrics import record_shed
+from app.services.tracing import start_trace
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Requests that go through admission control (see routers/verify.py).
+ADMISSION_PATH_PREFIXES = ("/verify_identity", "/identify")
+
+# Room for multipart boundaries, part headers and small form fields.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def max_request_bytes() -> int:
+    """Largest request body accepted: one profile image plus one video."""
+    return settings.upload_max_image_bytes + settings.upload_max_video_bytes + MULTIPART_OVERHEAD_BYTES
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Rejects request bodies larger than a fixed limit before they are buffered.
+
+    A declared Content-Length over the limit is answered with 413 before any
+    of the body is read. Bodies without one (chunked transfer) are counted as
+    they stream in, and the request fails with 413 as soon as the limit is
+    crossed, so multipart parsing never spools more than the limit.
+    """
+
+    def __init__(self, app, max_body_bytes: int = None):
+        self.app = app
+        self.max_body_bytes = max_body_bytes or max_request_bytes()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body_bytes:
+            logger.warning(f"Rejected {declared.decode()} byte request to {scope['path']}")
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Request body exceeds the {self.max_body_bytes} byte limit"}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Request body exceeds the {self.max_body_bytes} byte limit"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class RequestTimingMiddleware:
+    """
+    Traces each request and reports where its time went.
+
+    Starts a RequestTrace that the pipeline stages record into. Requests that
+    recorded anything get a Server-Timing header (when SERVER_TIMING_ENABLED)
+    and one structured "request_timing" log line with the same spans and
+    frame counts as JSON.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace()
+        status = None
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.server_timing_enabled and not trace.empty:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            if not trace.empty:
+                record = {"method": scope["method"], "path": scope["path"], "status": status, **trace.summary()}
+                logger.info(f"request_timing {json.dumps(record)}")
+
+
+class AdmissionCheckMiddleware:
+    """
+    Sheds verification requests before their body is uploaded.
+
+    When the admission queue is full or the estimated wait is over budget,
+    POSTs to the verification routes are answered at once with
+    ADMISSION_REJECT_STATUS and Retry-After, so a burst does not also cost
+    the upload bandwidth of requests that would be shed anyway. The slot
+    itself is only taken by the route once the body is in, so slow uploads
+    do not hold pipeline capacity.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and settings.admission_enabled
+            and scope["method"] == "POST"
+            and scope["path"].startswith(ADMISSION_PATH_PREFIXES)
+        ):
+            try:
+                get_admission_controller().check()
+            except Overloaded as e:
+                record_shed(e.reason)
+                await overloaded_response(e)(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Any
+from typing import Optional, Any, List, Dict
 
 
 class VerificationRequest(BaseModel):
@@ -26,6 +26,36 @@ class VerificationResponse(BaseModel):
     status: str = Field(..., description="success, failed, or error")
     liveness: LivenessResult
     verification: VerificationResult
+    timings: Optional[dict] = Field(None, description="Per-stage timings and frame counts (debug mode only)")
+
+
+class IdentificationMatch(BaseModel):
+    user_id: str
+    distance: float
+    verified: bool
+
+
+class IdentificationResult(BaseModel):
+    identified: bool
+    user_id: Optional[str] = None
+    matches: List[IdentificationMatch] = []
+    threshold: Optional[float] = None
+    model: str
+    error: Optional[str] = None
+    message: Optional[str] = None
+
+
+class IdentificationResponse(BaseModel):
+    status: str = Field(..., description="success, failed, or error")
+    liveness: LivenessResult
+    identification: IdentificationResult
+
+
+class EnrollmentResponse(BaseModel):
+    status: str = Field(..., description="enrolled or removed")
+    user_id: str
+    model: str
+    message: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):
@@ -37,3 +67,38 @@ class ErrorResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str = "healthy"
     version: str
+
+
+class ModelStatus(BaseModel):
+    state: str = Field(..., description="pending, loading, ready, or failed")
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ReadinessResponse(BaseModel):
+    status: str = Field(..., description="ready or loading")
+    models: Dict[str, ModelStatus] = {}
+
+
+class JobError(BaseModel):
+    status_code: int
+    detail: str
+
+
+class CallbackDelivery(BaseModel):
+    url: str
+    delivered: bool
+    attempts: int
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, completed, or failed")
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[VerificationResponse] = Field(None, description="Verification result once completed")
+    error: Optional[JobError] = Field(None, description="Why the job failed")
+    callback: Optional[CallbackDelivery] = Field(None, description="Callback delivery outcome, if a callback was requested")
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+import tempfile
+import os
+from typing import Optional
+
+from app.services.face_matcher import get_profile_embedding
+from app.services.executor import run_in_executor
+from app.services.uploads import UploadRejected, copy_upload
+from app.services.template_store import get_template_store, is_valid_user_id
+from app.services.ann_index import get_gallery
+from app.config import get_settings
+from app.logger import get_logger
+from app.models import EnrollmentResponse
+
+router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+@router.post("/enroll", response_model=EnrollmentResponse)
+async def enroll(
+    user_id: str = Form(...),
+    profile_image: UploadFile = File(...)
+) -> dict:
+    """
+    Computes and stores the face template of a user.
+
+    The template can then be used by /verify_identity/{user_id}, which only
+    needs the live video, and is added to the /identify gallery.
+
+    Args:
+        user_id: Identifier of the user to enroll
+        profile_image: Reference profile image file
+
+    Returns:
+        Dictionary with enrollment status, user id and model name
+    """
+    tmp_profile_path: Optional[str] = None
+
+    try:
+        if not is_valid_user_id(user_id):
+            raise HTTPException(status_code=400, detail="Invalid user id")
+        if not profile_image.filename:
+            raise HTTPException(status_code=400, detail="Missing required files")
+
+        suffix = os.path.splitext(profile_image.filename)[1] or ".jpg"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_profile:
+            tmp_profile_path = tmp_profile.name
+            await copy_upload(profile_image, tmp_profile, settings.upload_max_image_bytes)
+
+        embedding = await run_in_executor(get_profile_embedding, tmp_profile_path)
+        if embedding is None:
+            raise HTTPException(status_code=422, detail="Could not compute face template from profile image")
+
+        store = get_template_store()
+        replaced = user_id in store
+        store.enroll(user_id, embedding)
+        gallery = await run_in_threadpool(get_gallery)
+        await run_in_threadpool(gallery.add, user_id, embedding)
+        logger.info(f"Enrolled user {user_id} ({'replaced' if replaced else 'new'} template)")
+
+        return {
+            "status": "enrolled",
+            "user_id": user_id,
+            "model": settings.face_model,
+            "message": "Template replaced" if replaced else "Template created"
+        }
+
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Enrollment error: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": str(e),
+                "error_code": "ENROLLMENT_ERROR"
+            }
+        )
+
+    finally:
+        if tmp_profile_path and os.path.exists(tmp_profile_path):
+            try:
+                os.remove(tmp_profile_path)
+            except Exception as e:
+                logger.warning(f"Could not delete temp file: {e}")
+
+
+@router.delete("/enroll/{user_id}", response_model=EnrollmentResponse)
+async def unenroll(user_id: str) -> dict:
+    """
+    Removes the stored face template of a user.
+
+    Args:
+        user_id: Identifier of the enrolled user
+
+    Returns:
+        Dictionary with removal status and user id
+    """
+    if not get_template_store().delete(user_id):
+        raise HTTPException(status_code=404, detail=f"User '{user_id}' is not enrolled")
+    gallery = await run_in_threadpool(get_gallery)
+    await run_in_threadpool(gallery.remove, user_id)
+
+    logger.info(f"Removed template of user {user_id}")
+    return {
+        "status": "removed",
+        "user_id": user_id,
+        "model": settings.face_model
+    }
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Response
+from fastapi.responses import JSONResponse
+from starlette.datastructures import UploadFile as StarletteUploadFile
+import tempfile
+import os
+from functools import partial
+from typing import List, Optional
+
+from app.routers.verify import verify_profile, verification_outcome
+from app.services.jobs import JobFailed, QueueFull, callback_allowed, get_job_queue
+from app.services.metrics import record_outcome
+from app.services.uploads import UploadRejected, check_video_header, copy_upload
+from app.config import get_settings
+from app.logger import get_logger
+from app.models import JobResponse
+
+router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception as e:
+                logger.warning(f"Could not delete temp file: {e}")
+
+
+async def _run_verification(profile_path: str, video_path: str, video_filename: str) -> dict:
+    """Job body: runs the /verify_identity pipeline on the files persisted at submission."""
+    with open(video_path, "rb") as video:
+        try:
+            result = await verify_profile(profile_path, StarletteUploadFile(file=video, filename=video_filename))
+        except HTTPException as e:
+            record_outcome("rejected")
+            raise JobFailed(e.status_code, str(e.detail))
+        except UploadRejected as e:
+            record_outcome("rejected")
+            raise JobFailed(e.status_code, e.message)
+        except Exception:
+            record_outcome("error")
+            raise
+    record_outcome(verification_outcome(result))
+    return result
+
+
+@router.post("/jobs/verify_identity", response_model=JobResponse, status_code=202)
+async def submit_verification(
+    response: Response,
+    profile_image: UploadFile = File(...),
+    live_video: UploadFile = File(...),
+    callback_url: Optional[str] = Form(None)
+) -> dict:
+    """
+    Queues an identity verification and returns its job id immediately.
+    
+    The uploads are stored and checked against the size and container limits
+    before this returns, so a client only sends them once. The result is
+    polled from GET /jobs/{job_id} (the Location header), and is also POSTed
+    to the callback URL (the form field, or JOB_CALLBACK_URL) if there is one.
+    
+    Args:
+        profile_image: Reference profile image file
+        live_video: Video file for liveness and verification
+        callback_url: Optional URL to POST the finished job to; its host must be allowed
+        
+    Returns:
+        Dictionary with the job id and its queued state
+    """
+    paths: List[str] = []
+    queued = False
+
+    try:
+        if not profile_image.filename or not live_video.filename:
+            raise HTTPException(status_code=400, detail="Missing required files")
+        if callback_url and not callback_allowed(callback_url):
+            raise HTTPException(status_code=400, detail="Callback URL host is not allowed")
+
+        suffix = os.path.splitext(profile_image.filename)[1] or ".jpg"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_profile:
+            paths.append(tmp_profile.name)
+            await copy_upload(profile_image, tmp_profile, settings.upload_max_image_bytes)
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=settings.video_temp_suffix) as tmp_video:
+            paths.append(tmp_video.name)
+            await copy_upload(live_video, tmp_video, settings.upload_max_video_bytes, check_header=check_video_header)
+
+        profile_path, video_path = paths
+        job = get_job_queue().submit(
+            partial(_run_verification, profile_path, video_path, live_video.filename),
+            cleanup=partial(_remove_files, paths),
+            callback_url=callback_url or settings.job_callback_url
+        )
+        queued = True
+        logger.info(f"Queued verification job {job.id}")
+
+        response.headers["Location"] = f"/jobs/{job.id}"
+        return job.to_dict()
+
+    except QueueFull as e:
+        queued = True  # submit() already ran the cleanup
+        logger.warning(f"Rejected verification job: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Job queue is full"},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    finally:
+        if not queued:
+            _remove_files(paths)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str) -> dict:
+    """
+    Returns the state of a verification job, with its result once completed.
+    
+    Finished jobs are kept for JOB_RESULT_TTL_SECONDS, then answer 404.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired")
+    return job.to_dict()
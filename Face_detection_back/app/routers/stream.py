@@ -0,0 +1,152 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+import tempfile
+import os
+from typing import Optional
+
+from app.routers.verify import liveness_failed_response, verification_response, verification_outcome
+from app.services.streaming import StreamingVerification
+from app.services.metrics import record_outcome, time_stage
+from app.services.template_store import get_template_store
+from app.services.tracing import start_trace
+from app.config import get_settings
+from app.logger import get_logger
+
+router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Close codes: the client sent something we refuse, or the server failed.
+POLICY_VIOLATION = 1008
+INTERNAL_ERROR = 1011
+
+
+class StreamError(Exception):
+    """Ends a stream with an error event carrying an HTTP-like status code."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def _receive(websocket: WebSocket, deadline: float) -> dict:
+    """Next message, or StreamError 408 if the client goes quiet or the session runs too long."""
+    loop = asyncio.get_running_loop()
+    timeout = min(settings.stream_idle_timeout_seconds, deadline - loop.time())
+    try:
+        message = await asyncio.wait_for(websocket.receive(), timeout=max(timeout, 0))
+    except asyncio.TimeoutError:
+        raise StreamError(408, "Stream timed out")
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message
+
+
+def _check_end(message: dict) -> None:
+    """Accepts the end-of-stream control message; any other text message is a StreamError 400."""
+    try:
+        control = json.loads(message["text"])
+    except ValueError:
+        control = None
+    if not isinstance(control, dict) or control.get("type") != "end":
+        raise StreamError(400, "Text messages must be {\"type\": \"end\"}")
+
+
+@router.websocket("/verify_identity/stream")
+async def verify_identity_stream(websocket: WebSocket, user_id: Optional[str] = None):
+    """
+    Verifies identity from frames streamed while the user is still recording.
+
+    Protocol:
+    1. Without ``user_id``, the first message is the profile image (binary);
+       with ``?user_id=``, the enrolled template is used instead
+    2. The client sends each captured frame as a binary JPEG message and gets
+       a ``{"type": "frame", ...}`` event back with the face, yaw ratio and
+       liveness decision so far
+    3. As soon as liveness passes (or after ``{"type": "end"}`` if it never
+       does), the server sends ``{"type": "result", ...}`` with the same
+       fields as /verify_identity and closes the connection
+
+    Errors are sent as ``{"type": "error", "status_code", "detail"}`` before
+    the connection is closed.
+    """
+    await websocket.accept()
+    trace = start_trace()
+    deadline = asyncio.get_running_loop().time() + settings.stream_max_seconds
+    tmp_profile_path: Optional[str] = None
+    stream: Optional[StreamingVerification] = None
+
+    try:
+        if user_id is not None:
+            store = get_template_store()
+            template = store.get(user_id)
+            if template is None:
+                if store.needs_reenrollment(user_id):
+                    raise StreamError(409, f"User '{user_id}' must re-enroll: template was built with another embedding model")
+                raise StreamError(404, f"User '{user_id}' is not enrolled")
+            stream = StreamingVerification(template=template)
+        else:
+            profile = (await _receive(websocket, deadline)).get("bytes")
+            if not profile:
+                raise StreamError(400, "First message must be the profile image")
+            if len(profile) > settings.upload_max_image_bytes:
+                raise StreamError(413, f"Profile image exceeds the {settings.upload_max_image_bytes} byte limit")
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_profile:
+                tmp_profile_path = tmp_profile.name
+                tmp_profile.write(profile)
+            stream = StreamingVerification(profile_path=tmp_profile_path)
+
+        while not stream.done and stream.frames_received < settings.stream_max_frames:
+            message = await _receive(websocket, deadline)
+            if message.get("text") is not None:
+                _check_end(message)
+                break
+            frame = message.get("bytes") or b""
+            if len(frame) > settings.stream_max_frame_bytes:
+                raise StreamError(413, f"Frame exceeds the {settings.stream_max_frame_bytes} byte limit")
+            await websocket.send_json(await stream.add_frame(frame))
+
+        with time_stage("stream_finish"):
+            (is_live, message, details), match_result = await stream.finish()
+        if not is_live:
+            logger.warning(f"Streaming liveness check failed after {stream.frames_received} frames: {message}")
+            result = liveness_failed_response(message, details)
+        else:
+            final_status = "success" if match_result["verified"] else "failed"
+            logger.info(f"Streaming verification completed after {stream.frames_received} frames with status: {final_status}")
+            result = verification_response(final_status, is_live, message, details, match_result)
+
+        record_outcome(verification_outcome(result))
+        if settings.debug_mode:
+            result["timings"] = trace.summary()
+        await websocket.send_json({"type": "result", **result})
+        await websocket.close()
+
+    except StreamError as e:
+        logger.warning(f"Verification stream rejected: {e.detail}")
+        record_outcome("rejected")
+        await websocket.send_json({"type": "error", "status_code": e.status_code, "detail": e.detail})
+        await websocket.close(code=POLICY_VIOLATION)
+    except WebSocketDisconnect:
+        logger.info("Verification stream closed by client")
+    except Exception as e:
+        logger.error(f"Streaming verification error: {e}", exc_info=True)
+        record_outcome("error")
+        try:
+            await websocket.send_json({"type": "error", "status_code": 500, "detail": str(e)})
+            await websocket.close(code=INTERNAL_ERROR)
+        except Exception:
+            pass
+
+    finally:
+        if stream is not None:
+            stream.close()
+        if not trace.empty:
+            logger.info(f"stream_timing {json.dumps({'path': websocket.url.path, **trace.summary()})}")
+        if tmp_profile_path and os.path.exists(tmp_profile_path):
+            try:
+                os.remove(tmp_profile_path)
+            except Exception as e:
+                logger.warning(f"Could not delete temp file: {e}")
@@ -1,40 +1,235 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Form
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import tempfile
 import os
 import shutil
+import time
 import cv2
 import numpy as np
-from typing import Optional
+from functools import wraps
+from typing import List, Optional
 
-from app.services.video_utils import extract_frames_from_video
-from app.services.liveness import check_liveness_pose, get_head_pose_yaw
-from app.services.face_matcher import verify_faces
+from app.services.video_utils import analyze_frame_uploads, analyze_video
+from app.services.liveness import check_liveness_pose, select_best_frame
+from app.services.frame_prep import crop_face
+from app.services.face_matcher import FACE_VALIDATION_FAILED, verify_faces, verify_against_template, get_face_embedding, match_gallery
+from app.services.executor import run_in_executor
+from app.services.admission import Overloaded, get_admission_controller, overloaded_response
+from app.services.metrics import observe_stage, record_outcome, record_shed, time_stage, track_request
+from app.services.tracing import current_trace
+from app.services.uploads import UploadRejected, copy_upload
+from app.services.ann_index import get_gallery
+from app.services.template_store import get_template_store
 from app.config import get_settings
 from app.logger import get_logger
-from app.models import VerificationResponse, ErrorResponse, LivenessResult, VerificationResult
+from app.models import VerificationResponse, IdentificationResponse, ErrorResponse, LivenessResult, VerificationResult
 
 router = APIRouter()
 logger = get_logger(__name__)
 settings = get_settings()
 
 
+def liveness_failed_response(message: str, details: dict) -> dict:
+    return {
+        "status": "failed",
+        "liveness": {
+            "passed": False,
+            "message": message,
+            "details": details
+        },
+        "verification": {
+            "verified": False,
+            "distance": 1.0,
+            "threshold": settings.face_detection_threshold,
+            "model": settings.face_model,
+            "message": "Liveness check failed"
+        }
+    }
+
+
+def verification_response(status: str, is_live: bool, message: str, details: dict, match_result: dict) -> dict:
+    return {
+        "status": status,
+        "liveness": {
+            "passed": is_live,
+            "message": message,
+            "details": details
+        },
+        "verification": match_result
+    }
+
+
+def verification_outcome(result) -> str:
+    """Classifies a verification handler's return value for the outcome counter."""
+    if not isinstance(result, dict):
+        return "error"
+    if not result["liveness"]["passed"]:
+        return "liveness_failed"
+    if "identification" in result:
+        return "identified" if result["identification"]["identified"] else "not_identified"
+    verification = result["verification"]
+    if verification.get("verified"):
+        return "verified"
+    if "error" not in verification:
+        return "not_verified"
+    return "no_face" if verification.get("message") == FACE_VALIDATION_FAILED else "error"
+
+
+def _instrumented(handler):
+    """
+    Records in-flight count, total time and outcome of a verification endpoint.
+    
+    In debug mode, the request's stage timings are added to the response.
+    """
+    @wraps(handler)
+    async def wrapper(*args, **kwargs):
+        with track_request():
+            try:
+                result = await handler(*args, **kwargs)
+            except HTTPException:
+                record_outcome("rejected")
+                raise
+            except Exception:
+                record_outcome("error")
+                raise
+        record_outcome(verification_outcome(result))
+        trace = current_trace()
+        if settings.debug_mode and trace is not None and isinstance(result, dict):
+            result["timings"] = trace.summary()
+        return result
+    return wrapper
+
+
+def _admitted(handler):
+    """
+    Runs a verification endpoint under admission control.
+    
+    The handler waits for one of ADMISSION_MAX_CONCURRENT slots; requests
+    that cannot get one within ADMISSION_MAX_WAIT_SECONDS are shed with
+    ADMISSION_REJECT_STATUS and Retry-After. Time spent queued is recorded
+    as the admission_wait stage.
+    """
+    @wraps(handler)
+    async def wrapper(*args, **kwargs):
+        if not settings.admission_enabled:
+            return await handler(*args, **kwargs)
+        try:
+            waited = await get_admission_controller().acquire()
+        except Overloaded as e:
+            record_shed(e.reason)
+            return overloaded_response(e)
+        if waited:
+            observe_stage("admission_wait", waited)
+        start = time.perf_counter()
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            get_admission_controller().release(time.perf_counter() - start)
+    return wrapper
+
+
+def _order_frames(frames: List[UploadFile], frame_timestamps: str):
+    """Parses one timestamp per frame and sorts the frames by capture time."""
+    try:
+        timestamps = [float(t) for t in frame_timestamps.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="frame_timestamps must be comma-separated numbers")
+    if len(timestamps) != len(frames):
+        raise HTTPException(status_code=400, detail=f"Got {len(timestamps)} timestamps for {len(frames)} frames")
+    order = sorted(range(len(frames)), key=timestamps.__getitem__)
+    return [frames[i] for i in order], [timestamps[i] for i in order]
+
+
+def _select_best_frame(frames, poses):
+    with time_stage("best_frame"):
+        return select_best_frame(frames, poses)
+
+
+async def verify_profile(
+    profile_path: str,
+    live_video: Optional[UploadFile] = None,
+    frame_images: Optional[List[UploadFile]] = None,
+    timestamps: Optional[List[float]] = None
+) -> dict:
+    """
+    Runs liveness and face matching of a live capture against a stored profile image.
+    
+    Shared by /verify_identity and the asynchronous job API.
+    
+    Args:
+        profile_path: Path of the reference profile image
+        live_video: Video file for liveness and verification
+        frame_images: Still frames in capture order, instead of live_video
+        timestamps: Capture time of each frame, reported in the liveness details
+        
+    Returns:
+        Dictionary with verification status, liveness result, and face match result
+        
+    Raises:
+        HTTPException: If no frames could be decoded
+        UploadRejected: If the video or frames exceed the upload limits
+    """
+    if frame_images:
+        frames, liveness = await analyze_frame_uploads(frame_images, check_liveness_pose)
+    else:
+        frames, liveness = await analyze_video(live_video, check_liveness_pose)
+    if not frames:
+        logger.error("Could not extract frames from video")
+        raise HTTPException(status_code=400, detail="Could not extract frames from video")
+        
+    logger.info(f"Analyzed {len(frames)} frames from {'uploaded frames' if frame_images else 'video'}")
+    
+    is_live, message, details = liveness
+    if timestamps is not None:
+        details["timestamps"] = timestamps[:len(details.get("poses", []))]
+    
+    if not is_live:
+        logger.warning(f"Liveness check failed: {message}")
+        return liveness_failed_response(message, details)
+    
+    logger.info("Liveness check passed")
+    
+    best_frame, best_pose = _select_best_frame(frames, details.get("poses", []))
+    
+    if settings.debug_mode:
+        debug_dir = settings.debug_dir
+        os.makedirs(debug_dir, exist_ok=True)
+        shutil.copy(profile_path, os.path.join(debug_dir, "debug_profile.jpg"))
+        cv2.imwrite(os.path.join(debug_dir, "debug_frame.jpg"), cv2.cvtColor(crop_face(best_frame, best_pose), cv2.COLOR_RGB2BGR))
+    
+    logger.info("Performing face verification")
+    match_result = await run_in_executor(verify_faces, profile_path, best_frame, best_pose)
+    
+    final_status = "success" if is_live and match_result["verified"] else "failed"
+    
+    logger.info(f"Verification completed with status: {final_status}")
+    
+    return verification_response(final_status, is_live, message, details, match_result)
+
+
 @router.post("/verify_identity", response_model=Optional[VerificationResponse])
+@_admitted
+@_instrumented
 async def verify_identity(
     profile_image: UploadFile = File(...),
-    live_video: UploadFile = File(...)
+    live_video: Optional[UploadFile] = File(None),
+    frames: Optional[List[UploadFile]] = File(None),
+    frame_timestamps: Optional[str] = Form(None)
 ) -> dict:
     """
     Verifies user identity through liveness detection and face matching.
     
     Process:
-    1. Extract frames from video
+    1. Decode frames from video (or the uploaded frames), stopping once liveness is settled
     2. Check liveness (center to left head movement)
     3. Verify face match with best center frame
     
     Args:
         profile_image: Reference profile image file
         live_video: Video file for liveness and verification
+        frames: JPEG/PNG/WebP still frames in capture order, instead of live_video
+        frame_timestamps: Optional comma-separated capture times of the frames, in seconds
         
     Returns:
         Dictionary with verification status, liveness result, and face match result
@@ -42,24 +237,155 @@ async def verify_identity(
     tmp_profile_path: Optional[str] = None
 
     try:
-        if not profile_image.filename or not live_video.filename:
+        has_video = live_video is not None and bool(live_video.filename)
+        if not profile_image.filename or not (has_video or frames):
             raise HTTPException(status_code=400, detail="Missing required files")
+        if has_video and frames:
+            raise HTTPException(status_code=400, detail="Send either live_video or frames, not both")
+        
+        timestamps = None
+        if frames and frame_timestamps:
+            frames, timestamps = _order_frames(frames, frame_timestamps)
 
         suffix = os.path.splitext(profile_image.filename)[1] or ".jpg"
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_profile:
             tmp_profile_path = tmp_profile.name
-            shutil.copyfileobj(profile_image.file, tmp_profile)
+            await copy_upload(profile_image, tmp_profile, settings.upload_max_image_bytes)
 
         logger.info(f"Processing profile image: {profile_image.filename}")
         
-        frames = await extract_frames_from_video(live_video)
+        return await verify_profile(tmp_profile_path, live_video, frames, timestamps)
+
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Verification error: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": str(e),
+                "error_code": "VERIFICATION_ERROR"
+            }
+        )
+
+    finally:
+        if tmp_profile_path and os.path.exists(tmp_profile_path):
+            try:
+                os.remove(tmp_profile_path)
+            except Exception as e:
+                logger.warning(f"Could not delete temp file: {e}")
+
+
+@router.post("/verify_identity/{user_id}", response_model=Optional[VerificationResponse])
+@_admitted
+@_instrumented
+async def verify_enrolled_identity(
+    user_id: str,
+    live_video: UploadFile = File(...)
+) -> dict:
+    """
+    Verifies an enrolled user through liveness detection and template matching.
+    
+    Same flow as /verify_identity, but the reference face is the template stored
+    at enrollment, so no profile image is uploaded, decoded or embedded.
+    
+    Args:
+        user_id: Identifier used at enrollment
+        live_video: Video file for liveness and verification
+        
+    Returns:
+        Dictionary with verification status, liveness result, and face match result
+    """
+    try:
+        store = get_template_store()
+        template = store.get(user_id)
+        if template is None:
+            if store.needs_reenrollment(user_id):
+                raise HTTPException(status_code=409, detail=f"User '{user_id}' must re-enroll: template was built with another embedding model")
+            raise HTTPException(status_code=404, detail=f"User '{user_id}' is not enrolled")
+        
+        if not live_video.filename:
+            raise HTTPException(status_code=400, detail="Missing required files")
+        
+        frames, liveness = await analyze_video(live_video, check_liveness_pose)
+        if not frames:
+            logger.error("Could not extract frames from video")
+            raise HTTPException(status_code=400, detail="Could not extract frames from video")
+        
+        logger.info(f"Analyzed {len(frames)} frames from video for user {user_id}")
+        
+        is_live, message, details = liveness
+        
+        if not is_live:
+            logger.warning(f"Liveness check failed: {message}")
+            return liveness_failed_response(message, details)
+        
+        logger.info("Liveness check passed")
+        
+        best_frame, best_pose = _select_best_frame(frames, details.get("poses", []))
+        
+        logger.info(f"Performing face verification against template of {user_id}")
+        match_result = await run_in_executor(verify_against_template, template, best_frame, best_pose)
+        
+        final_status = "success" if is_live and match_result["verified"] else "failed"
+        
+        logger.info(f"Verification completed with status: {final_status}")
+        
+        return verification_response(final_status, is_live, message, details, match_result)
+
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Verification error: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": str(e),
+                "error_code": "VERIFICATION_ERROR"
+            }
+        )
+
+
+@router.post("/identify", response_model=IdentificationResponse)
+@_admitted
+@_instrumented
+async def identify(
+    live_video: UploadFile = File(...),
+    top_k: Optional[int] = Form(None)
+) -> dict:
+    """
+    Identifies the person in a live video among all enrolled users.
+    
+    Process:
+    1. Extract frames from video and check liveness
+    2. Embed the best center frame once
+    3. Score it against the whole enrolled gallery and return the top-k
+    
+    Args:
+        live_video: Video file for liveness and identification
+        top_k: Number of candidates to return. Uses config value if not specified.
+        
+    Returns:
+        Dictionary with identification status, liveness result, and ranked candidates
+    """
+    try:
+        if not live_video.filename:
+            raise HTTPException(status_code=400, detail="Missing required files")
+        if top_k is not None and top_k <= 0:
+            raise HTTPException(status_code=400, detail="top_k must be positive")
+        
+        frames, liveness = await analyze_video(live_video, check_liveness_pose)
         if not frames:
             logger.error("Could not extract frames from video")
             raise HTTPException(status_code=400, detail="Could not extract frames from video")
-            
-        logger.info(f"Extracted {len(frames)} frames from video")
         
-        is_live, message, details = check_liveness_pose(frames)
+        is_live, message, details = liveness
         
         if not is_live:
             logger.warning(f"Liveness check failed: {message}")
@@ -70,42 +396,25 @@ async def verify_identity(
                     "message": message,
                     "details": details
                 },
-                "verification": {
-                    "verified": False,
-                    "distance": 1.0,
+                "identification": {
+                    "identified": False,
+                    "matches": [],
                     "threshold": settings.face_detection_threshold,
                     "model": settings.face_model,
                     "message": "Liveness check failed"
                 }
             }
         
-        logger.info("Liveness check passed")
-        
-        best_frame = frames[0]
-        best_diff = 999.0
+        best_frame, best_pose = _select_best_frame(frames, details.get("poses", []))
         
-        for frame in frames:
-            r = get_head_pose_yaw(frame)
-            if r is not None:
-                diff = abs(r - 1.0)
-                if diff < best_diff:
-                    best_diff = diff
-                    best_frame = frame
-                    if diff < 0.15:
-                        break
+        logger.info("Performing face identification")
+        embedding = await run_in_executor(get_face_embedding, best_frame, best_pose)
+        gallery = await run_in_threadpool(get_gallery)
+        identification = await run_in_threadpool(match_gallery, embedding, gallery, top_k)
         
-        if settings.debug_mode:
-            debug_dir = settings.debug_dir
-            os.makedirs(debug_dir, exist_ok=True)
-            shutil.copy(tmp_profile_path, os.path.join(debug_dir, "debug_profile.jpg"))
-            cv2.imwrite(os.path.join(debug_dir, "debug_frame.jpg"), cv2.cvtColor(best_frame, cv2.COLOR_RGB2BGR))
+        final_status = "success" if identification["identified"] else "failed"
         
-        logger.info("Performing face verification")
-        match_result = verify_faces(tmp_profile_path, best_frame)
-        
-        final_status = "success" if is_live and match_result["verified"] else "failed"
-        
-        logger.info(f"Verification completed with status: {final_status}")
+        logger.info(f"Identification completed with status: {final_status}")
         
         return {
             "status": final_status,
@@ -114,25 +423,20 @@ async def verify_identity(
                 "message": message,
                 "details": details
             },
-            "verification": match_result
+            "identification": identification
         }
 
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Verification error: {e}", exc_info=True)
+        logger.error(f"Identification error: {e}", exc_info=True)
         return JSONResponse(
             status_code=500,
             content={
                 "status": "error",
                 "message": str(e),
-                "error_code": "VERIFICATION_ERROR"
+                "error_code": "IDENTIFICATION_ERROR"
             }
         )
-
-    finally:
-        if tmp_profile_path and os.path.exists(tmp_profile_path):
-            try:
-                os.remove(tmp_profile_path)
-            except Exception as e:
-                logger.warning(f"Could not delete temp file: {e}")
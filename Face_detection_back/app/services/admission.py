@@ -0,0 +1,180 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+QUEUE_FULL = "queue_full"
+WAIT_BUDGET = "wait_budget"
+QUEUE_TIMEOUT = "queue_timeout"
+
+# Weight of the latest request in the service time estimate.
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Overloaded ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO wait queue.
+
+    Up to ``max_concurrent`` requests hold a slot at once; the next
+    ``max_queued`` wait for one in arrival order. A request is shed when the
+    queue is full, when its estimated wait (queue position times the
+    moving average time a slot is held, over the number of slots) exceeds
+    ``max_wait``, or when it has actually waited ``max_wait``. Admitted
+    requests therefore start within the wait budget instead of every
+    request slowing down together.
+
+    Not thread-safe: used from the event loop only.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, max_wait: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_seconds: Optional[float] = None
+        self._admitted = 0
+        self._rejected: Dict[str, int] = {QUEUE_FULL: 0, WAIT_BUDGET: 0, QUEUE_TIMEOUT: 0}
+
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def active(self) -> int:
+        return self._active
+
+    def estimated_wait(self) -> float:
+        """Seconds a request arriving now would wait for a slot."""
+        if self._active < self.max_concurrent and not self.queued():
+            return 0.0
+        if self._service_seconds is None:
+            return 0.0
+        return self._service_seconds * (self.queued() + 1) / self.max_concurrent
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait before retrying."""
+        return max(1, math.ceil(self.estimated_wait() or self._service_seconds or 1.0))
+
+    def check(self) -> None:
+        """
+        Sheds a request that would not be admitted in time, without taking a slot.
+
+        Raises:
+            Overloaded: If the queue is full or the estimated wait exceeds max_wait.
+        """
+        if self._active < self.max_concurrent and not self.queued():
+            return
+        if self.queued() >= self.max_queued:
+            self._reject(QUEUE_FULL)
+        if self.estimated_wait() > self.max_wait:
+            self._reject(WAIT_BUDGET)
+
+    async def acquire(self) -> float:
+        """
+        Takes a slot, waiting in the queue if all are busy.
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            Overloaded: If the request is shed (see check) or times out in the queue.
+        """
+        self.check()
+        if self._active < self.max_concurrent and not self.queued():
+            self._active += 1
+            self._admitted += 1
+            return 0.0
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended.
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(QUEUE_TIMEOUT)
+            raise
+        self._admitted += 1
+        return time.perf_counter() - start
+
+    def release(self, held_seconds: float = None) -> None:
+        """Frees a slot, handing it straight to the oldest waiter if there is one."""
+        if held_seconds is not None:
+            if self._service_seconds is None:
+                self._service_seconds = held_seconds
+            else:
+                self._service_seconds += SERVICE_TIME_ALPHA * (held_seconds - self._service_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> dict:
+        """Returns slot usage, queue depth, service time estimate and admission counts."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "max_wait_seconds": self.max_wait,
+            "active": self._active,
+            "queued": self.queued(),
+            "avg_service_seconds": round(self._service_seconds, 3) if self._service_seconds is not None else None,
+            "estimated_wait_seconds": round(self.estimated_wait(), 3),
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected)
+        }
+
+    def _reject(self, reason: str) -> None:
+        self._rejected[reason] += 1
+        retry_after = self.retry_after()
+        logger.warning(
+            f"Shedding request ({reason}): {self._active} active, {self.queued()} queued, "
+            f"estimated wait {self.estimated_wait():.1f}s"
+        )
+        raise Overloaded(reason, retry_after)
+
+
+def overloaded_response(error: Overloaded) -> JSONResponse:
+    """The fast ADMISSION_REJECT_STATUS answer for a shed request, with Retry-After."""
+    return JSONResponse(
+        status_code=settings.admission_reject_status,
+        content={
+            "status": "error",
+            "message": "Server is overloaded, retry later",
+            "error_code": "OVERLOADED"
+        },
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_concurrent=settings.admission_max_concurrent or settings.pipeline_max_workers or os.cpu_count() or 1,
+        max_queued=settings.admission_queue_size,
+        max_wait=settings.admission_max_wait_seconds
+    )
@@ -0,0 +1,406 @@
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.embedding_backend import model_tag
+from app.services.gallery import EmbeddingGallery, _l2_normalize
+from app.services.template_store import get_template_store
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+ASSIGN_BATCH_SIZE = 8192
+TRAIN_SAMPLES_PER_LIST = 64
+RETRAIN_GROWTH_FACTOR = 2.0
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10,
+                    max_samples: int = None, seed: int = 0) -> np.ndarray:
+    """
+    Trains coarse quantizer centroids with spherical k-means.
+
+    Args:
+        vectors: (N, D) L2-normalized embeddings.
+        nlist: Number of centroids (inverted lists).
+        iterations: Number of Lloyd iterations.
+        max_samples: Upper bound on the training sample size. Defaults to
+            TRAIN_SAMPLES_PER_LIST points per centroid.
+        seed: Random seed, so rebuilding the same gallery gives the same index.
+
+    Returns:
+        (nlist, D) array of L2-normalized centroids.
+    """
+    rng = np.random.default_rng(seed)
+    if max_samples is None:
+        max_samples = TRAIN_SAMPLES_PER_LIST * nlist
+    if len(vectors) > max_samples:
+        vectors = vectors[rng.choice(len(vectors), max_samples, replace=False)]
+    nlist = min(nlist, len(vectors))
+
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        occupied = counts > 0
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[occupied]
+        sums = np.zeros_like(centroids)
+        sums[occupied] = np.add.reduceat(vectors[order], starts, axis=0)
+        empty = ~occupied
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _l2_normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest neighbour index over face embeddings.
+
+    Embeddings are routed to their nearest coarse centroid and stored there as
+    L2-normalized float16 vectors. A search scores only the ``nprobe`` closest
+    lists, takes the best ``rerank_k`` candidates by approximate cosine
+    similarity and re-ranks them exactly, with the configured metric, against
+    the float32 embeddings. The returned distances are therefore exact and the
+    configured threshold applies unchanged; only recall depends on ``nprobe``.
+
+    Until the gallery reaches ``min_train_size`` the index is untrained and
+    searches are exact brute force. It retrains itself when the gallery has
+    grown by RETRAIN_GROWTH_FACTOR since the last training; with
+    ``background_training`` that retraining runs on a separate thread and the
+    new centroids and lists are swapped in once ready, so an insert never
+    waits for k-means.
+
+    Only the centroids and list assignments are persisted, after each
+    training. The enrolled templates remain the source of truth: on load,
+    users missing from the saved assignments are routed to their nearest
+    centroid and users no longer enrolled are dropped.
+    """
+
+    def __init__(self, nlist: int = 0, nprobe: int = 16, rerank_k: int = 100,
+                 min_train_size: int = 10000, train_iterations: int = 10,
+                 index_path: Optional[str] = None, model_name: str = None,
+                 background_training: bool = False):
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.rerank_k = max(1, rerank_k)
+        self.min_train_size = max(1, min_train_size)
+        self.train_iterations = train_iterations
+        self.index_path = index_path
+        self.model_name = model_name or model_tag()
+        self.background_training = background_training
+        self._exact = EmbeddingGallery()
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[EmbeddingGallery] = []
+        self._assignments: Dict[str, int] = {}
+        self._trained_size = 0
+        self._lock = threading.RLock()
+        self._training_thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._exact
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _nearest_lists(self, unit_vectors: np.ndarray, centroids: np.ndarray = None) -> np.ndarray:
+        centroids = self._centroids if centroids is None else centroids
+        nearest = np.empty(len(unit_vectors), dtype=np.int64)
+        for start in range(0, len(unit_vectors), ASSIGN_BATCH_SIZE):
+            batch = unit_vectors[start:start + ASSIGN_BATCH_SIZE]
+            nearest[start:start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+        return nearest
+
+    def _build_lists(self, user_ids: List[str], unit_vectors: np.ndarray, list_numbers: np.ndarray) -> None:
+        self._lists = [EmbeddingGallery(dtype=np.float16) for _ in range(len(self._centroids))]
+        self._assignments = {}
+        order = np.argsort(list_numbers, kind="stable")
+        boundaries = np.searchsorted(list_numbers[order], np.arange(len(self._centroids) + 1))
+        for list_no in range(len(self._centroids)):
+            rows = order[boundaries[list_no]:boundaries[list_no + 1]]
+            if len(rows) == 0:
+                continue
+            ids = [user_ids[i] for i in rows]
+            self._lists[list_no].extend(ids, unit_vectors[rows])
+            for user_id in ids:
+                self._assignments[user_id] = list_no
+
+    def _assign(self, user_id: str, embedding: np.ndarray) -> None:
+        unit = _l2_normalize(np.asarray(embedding, dtype=np.float32).ravel())
+        list_no = int(np.argmax(self._centroids @ unit))
+        previous = self._assignments.get(user_id)
+        if previous is not None and previous != list_no:
+            self._lists[previous].remove(user_id)
+        self._lists[list_no].add(user_id, unit)
+        self._assignments[user_id] = list_no
+
+    def add(self, user_id: str, embedding: np.ndarray) -> None:
+        """Inserts or replaces the embedding of a user."""
+        with self._lock:
+            self._exact.add(user_id, embedding)
+            if not self.is_trained:
+                if len(self) >= self.min_train_size:
+                    self._retrain()
+                return
+            if len(self) >= RETRAIN_GROWTH_FACTOR * self._trained_size:
+                self._retrain()
+            self._assign(user_id, embedding)
+
+    def extend(self, user_ids: List[str], embeddings: np.ndarray) -> None:
+        """Inserts many users at once, then trains or routes them in a single pass."""
+        with self._lock:
+            self._exact.extend(user_ids, embeddings)
+            if not self.is_trained:
+                if len(self) >= self.min_train_size:
+                    self.train()
+                return
+            if len(self) >= RETRAIN_GROWTH_FACTOR * self._trained_size:
+                self.train()
+                return
+            self._route(dict(self._assignments))
+
+    def remove(self, user_id: str) -> bool:
+        """
+        Removes a user from the index.
+
+        Returns:
+            True if the user was present.
+        """
+        with self._lock:
+            if not self._exact.remove(user_id):
+                return False
+            list_no = self._assignments.pop(user_id, None)
+            if list_no is not None:
+                self._lists[list_no].remove(user_id)
+            return True
+
+    def train(self) -> None:
+        """
+        Trains the coarse quantizer on the current gallery and rebuilds the lists.
+
+        k-means and the list assignment run on a snapshot without holding the
+        lock, so searches and inserts carry on with the previous state; users
+        added or removed meanwhile are reconciled when the result is swapped in.
+        """
+        with self._lock:
+            if len(self) == 0:
+                return
+            user_ids = self._exact.ids
+            unit_vectors = _l2_normalize(np.asarray(self._exact.matrix, dtype=np.float32))
+        nlist = self.nlist or max(1, int(np.sqrt(len(user_ids))))
+
+        centroids = train_centroids(unit_vectors, nlist, self.train_iterations)
+        list_numbers = self._nearest_lists(unit_vectors, centroids)
+
+        with self._lock:
+            self._centroids = centroids
+            self._trained_size = len(user_ids)
+            self._route(dict(zip(user_ids, list_numbers.tolist())))
+        logger.info(f"IVF index trained: {len(user_ids)} embeddings, {len(centroids)} lists")
+        self.save()
+
+    def wait_for_training(self, timeout: float = None) -> None:
+        """Blocks until a background retraining in progress has been swapped in."""
+        thread = self._training_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _retrain(self) -> None:
+        if not self.background_training:
+            self.train()
+            return
+        if self._training_thread is not None and self._training_thread.is_alive():
+            return
+        self._training_thread = threading.Thread(target=self._train_in_background, name="ivf-train", daemon=True)
+        self._training_thread.start()
+
+    def _train_in_background(self) -> None:
+        try:
+            self.train()
+        except Exception as e:
+            logger.error(f"IVF index training failed: {e}", exc_info=True)
+
+    def _route(self, known_assignments: Dict[str, int]) -> None:
+        with self._lock:
+            user_ids = self._exact.ids
+            unit_vectors = _l2_normalize(np.asarray(self._exact.matrix, dtype=np.float32))
+            list_numbers = np.array([known_assignments.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+            list_numbers[list_numbers >= len(self._centroids)] = -1
+            missing = np.flatnonzero(list_numbers < 0)
+            if len(missing):
+                list_numbers[missing] = self._nearest_lists(unit_vectors[missing])
+            self._build_lists(user_ids, unit_vectors, list_numbers)
+
+    def search(self, query: np.ndarray, top_k: int = 5, metric: str = None) -> List[Tuple[str, float]]:
+        """
+        Finds the closest users to a query embedding.
+
+        Args:
+            query: Query embedding.
+            top_k: Number of closest users to return.
+            metric: Distance metric used for the exact re-rank. Uses config value if not specified.
+
+        Returns:
+            List of (user_id, distance) sorted by increasing exact distance.
+        """
+        metric = metric or settings.face_distance_metric
+        with self._lock:
+            if not self.is_trained:
+                return self._exact.search(query, top_k, metric)
+            if len(self) == 0 or top_k <= 0:
+                return []
+
+            unit = _l2_normalize(np.asarray(query, dtype=np.float32).ravel())
+            nprobe = min(self.nprobe, len(self._centroids))
+            centroid_scores = self._centroids @ unit
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+            candidate_ids: List[str] = []
+            candidate_scores = []
+            for list_no in probed:
+                inverted_list = self._lists[list_no]
+                if len(inverted_list) == 0:
+                    continue
+                candidate_ids.extend(inverted_list.ids)
+                candidate_scores.append(inverted_list.matrix.astype(np.float32) @ unit)
+            if not candidate_ids:
+                return []
+
+            scores = np.concatenate(candidate_scores)
+            k = min(max(top_k, self.rerank_k), len(scores))
+            shortlist = np.argpartition(-scores, k - 1)[:k]
+            shortlist_ids = [candidate_ids[i] for i in shortlist]
+            distances = self._exact.score(shortlist_ids, query, metric)
+
+        order = np.argsort(distances, kind="stable")[:top_k]
+        return [(shortlist_ids[i], float(distances[i])) for i in order]
+
+    def save(self) -> None:
+        """Persists the centroids and list assignments, if an index path is configured."""
+        if not self.index_path or not self.is_trained:
+            return
+
+        with self._lock:
+            user_ids = list(self._assignments)
+            list_numbers = np.array([self._assignments[user_id] for user_id in user_ids], dtype=np.int32)
+            centroids = self._centroids.copy()
+            trained_size = self._trained_size
+
+        directory = os.path.dirname(self.index_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=".tmp") as tmp_file:
+                tmp_path = tmp_file.name
+                np.savez(
+                    tmp_file,
+                    model=np.array(self.model_name),
+                    centroids=centroids,
+                    user_ids=np.array(user_ids, dtype=str),
+                    list_numbers=list_numbers,
+                    trained_size=np.array(trained_size)
+                )
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"Could not persist IVF index: {e}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load(self) -> bool:
+        """
+        Loads persisted centroids and assignments, if present and built for the configured embedding model.
+
+        Embeddings added afterwards are routed with the saved assignments, so
+        loading must happen before the gallery is filled.
+
+        Returns:
+            True if a persisted index was loaded.
+        """
+        if not self.index_path or not os.path.exists(self.index_path):
+            return False
+
+        try:
+            with np.load(self.index_path) as data:
+                if str(data["model"]) != self.model_name:
+                    logger.warning(f"Ignoring IVF index built with {data['model']}; it will be retrained")
+                    return False
+                with self._lock:
+                    self._centroids = data["centroids"].astype(np.float32)
+                    self._trained_size = int(data["trained_size"])
+                    self._lists = [EmbeddingGallery(dtype=np.float16) for _ in range(len(self._centroids))]
+                    self._assignments = dict(zip(data["user_ids"].tolist(), data["list_numbers"].tolist()))
+            logger.info(f"IVF index loaded with {len(self._centroids)} lists")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not load IVF index: {e}")
+            return False
+
+
+def build_gallery(backend: str, user_ids: List[str], embeddings: np.ndarray):
+    """
+    Builds the gallery search backend named in config.
+
+    Args:
+        backend: "exact" for brute-force search or "ivf" for the ANN index.
+        user_ids: Ids of the enrolled users.
+        embeddings: (N, D) array of their templates.
+
+    Returns:
+        EmbeddingGallery or IVFIndex; both expose add, remove and search.
+    """
+    if backend == "exact":
+        gallery = EmbeddingGallery()
+        if user_ids:
+            gallery.extend(user_ids, embeddings)
+        return gallery
+
+    if backend == "ivf":
+        index = IVFIndex(
+            nlist=settings.ann_nlist,
+            nprobe=settings.ann_nprobe,
+            rerank_k=settings.ann_rerank_k,
+            min_train_size=settings.ann_min_train_size,
+            train_iterations=settings.ann_train_iterations,
+            index_path=settings.ann_index_path,
+            background_training=True
+        )
+        index.load()
+        if user_ids:
+            index.extend(user_ids, embeddings)
+        return index
+
+    raise ValueError(f"Unsupported ANN backend: {backend}")
+
+
+_gallery_lock = threading.Lock()
+
+
+@lru_cache()
+def _configured_gallery():
+    store = get_template_store()
+    user_ids = store.user_ids()
+    embeddings = np.array([store.get(user_id) for user_id in user_ids], dtype=np.float32)
+    gallery = build_gallery(settings.ann_backend, user_ids, embeddings)
+    logger.info(f"Gallery built with {len(gallery)} embeddings ({settings.ann_backend} backend)")
+    return gallery
+
+
+def get_gallery():
+    """
+    Returns the gallery of all enrolled templates, building it on first use.
+
+    Building loads every template and may train the IVF index, so call it
+    from the thread pool; the lock makes concurrent first calls build once.
+    """
+    with _gallery_lock:
+        return _configured_gallery()
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from app.logger import get_logger
+from app.services.metrics import BATCH_QUEUE_DELAY, BATCH_SIZE, observe_batch
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ("item", "future", "enqueued")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects items from concurrent callers and runs them through one batched call.
+
+    A single worker thread takes the oldest queued item, then keeps taking
+    items until the batch holds ``max_batch_size`` of them or ``max_wait_ms``
+    have passed since that oldest item was queued. Items already waiting are
+    always drained without sleeping, so under load batches fill up without
+    adding delay. Each caller gets back the output at its own position.
+
+    Batch sizes and queue delays are exported on /metrics, labelled with
+    ``name``.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0, name: str = "default"):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._batch_fn = batch_fn
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queues one item for the next batch.
+
+        Returns:
+            Future resolved with the batch output for this item.
+
+        Raises:
+            RuntimeError: If the batcher is closed or closing.
+        """
+        request = _Request(item)
+        # Queued under the lock, so no item can land behind the stop marker.
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Batcher is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+            self._queue.put(request)
+        return request.future
+
+    def infer(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Queues one item and blocks until its output is ready.
+
+        Raises:
+            TimeoutError: If no result arrived within ``timeout`` seconds.
+            Exception: Whatever the batch function raised for this batch.
+        """
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if batch:
+                self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_Request]) -> None:
+        start = time.perf_counter()
+        try:
+            outputs = self._batch_fn([r.item for r in batch])
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(outputs)} outputs for {len(batch)} inputs")
+        except Exception as e:
+            logger.error(f"Batched inference failed for {len(batch)} items: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+        else:
+            for request, output in zip(batch, outputs):
+                request.future.set_result(output)
+
+        observe_batch(self.name, [start - r.enqueued for r in batch])
+        logger.debug(f"Ran batch of {len(batch)} in {1000 * (time.perf_counter() - start):.1f} ms")
+
+    def stats(self) -> dict:
+        """Returns the configuration and queue depth, with batch size and queue delay from /metrics."""
+        batches = BATCH_SIZE.count(batcher=self.name)
+        items = BATCH_QUEUE_DELAY.count(batcher=self.name)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(1000 * self.max_wait, 3),
+            "queued": self._queue.qsize(),
+            "batches": batches,
+            "items": items,
+            "avg_batch_size": round(items / batches, 3) if batches else 0.0,
+            "avg_queue_delay_ms": round(1000 * BATCH_QUEUE_DELAY.sum(batcher=self.name) / items, 3) if items else 0.0
+        }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Runs the batches already queued, then stops the worker thread.
+
+        New items are rejected as soon as closing starts. If the worker has
+        stopped, anything still queued is failed so no caller waits forever.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            if worker is not None:
+                self._queue.put(_STOP)
+        if worker is not None:
+            worker.join(timeout)
+            if worker.is_alive():
+                logger.warning("Batcher worker did not stop in time; queued items are left to their timeouts")
+                return
+        self._fail_queued()
+
+    def _fail_queued(self) -> None:
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if request is not _STOP and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("Batcher is closed"))
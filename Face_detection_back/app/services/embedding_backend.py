@@ -0,0 +1,198 @@
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from deepface import DeepFace
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.fake_models import FakeEmbeddingBackend
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+EMBEDDING_BACKENDS = ("tensorflow", "onnx", "tflite")
+
+
+class TensorFlowBackend:
+    """Runs the Keras model built by DeepFace (the reference implementation)."""
+
+    name = "tensorflow"
+
+    def __init__(self, model_name: str):
+        self._model = DeepFace.build_model(model_name)
+        self.input_shape: Tuple[int, int] = tuple(self._model.input_shape)
+
+    @property
+    def keras_model(self):
+        """Underlying Keras model, used when exporting to other runtimes."""
+        return self._model.model
+
+    def embed(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Runs one forward pass.
+
+        Args:
+            batch: (N, H, W, 3) float array of prepared faces.
+
+        Returns:
+            (N, D) float32 array of embeddings.
+        """
+        return np.asarray(self._model.model(batch, training=False), dtype=np.float32)
+
+
+class OnnxBackend:
+    """
+    Runs an exported ONNX model on the ONNX Runtime CPU provider.
+
+    Float16 exports are fed float16 inputs; int8 (dynamically quantized)
+    exports keep float inputs and outputs.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("EMBEDDING_BACKEND=onnx requires the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+        self.input_shape: Tuple[int, int] = (int(model_input.shape[1]), int(model_input.shape[2]))
+
+    def embed(self, batch: np.ndarray) -> np.ndarray:
+        """Runs one forward pass; same contract as TensorFlowBackend.embed."""
+        outputs = self._session.run(None, {self._input_name: batch.astype(self._input_dtype, copy=False)})
+        return np.asarray(outputs[0], dtype=np.float32)
+
+
+class TFLiteBackend:
+    """
+    Runs an exported TFLite model with tflite_runtime (or tf.lite as a fallback).
+
+    The interpreter holds per-call tensor state, so calls are serialised; use
+    inference batching to keep throughput up under concurrency.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+            except ImportError as e:
+                raise ImportError("EMBEDDING_BACKEND=tflite requires tflite_runtime or tensorflow") from e
+
+        self._interpreter = Interpreter(model_path=model_path, num_threads=num_threads or None)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._lock = threading.Lock()
+        self.input_shape: Tuple[int, int] = (int(self._input["shape"][1]), int(self._input["shape"][2]))
+
+    def embed(self, batch: np.ndarray) -> np.ndarray:
+        """Runs one forward pass; same contract as TensorFlowBackend.embed."""
+        scale, zero_point = self._input.get("quantization", (0.0, 0))
+        if np.issubdtype(self._input["dtype"], np.integer) and scale:
+            batch = np.round(batch / scale + zero_point)
+        batch = batch.astype(self._input["dtype"], copy=False)
+
+        with self._lock:
+            if tuple(self._input["shape"]) != batch.shape:
+                self._interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self._interpreter.allocate_tensors()
+                self._input = self._interpreter.get_input_details()[0]
+                self._output = self._interpreter.get_output_details()[0]
+            self._interpreter.set_tensor(self._input["index"], batch)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output["index"]).astype(np.float32)
+
+        scale, zero_point = self._output.get("quantization", (0.0, 0))
+        if np.issubdtype(self._output["dtype"], np.integer) and scale:
+            output = (output - zero_point) * scale
+        return output
+
+
+@lru_cache()
+def _file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def model_tag() -> str:
+    """
+    Identifies the model that produces embeddings, for cache keys.
+
+    The TensorFlow backend keeps the plain model name; exported models add the
+    backend and a digest of the model file, so a re-export or a different
+    quantization never reuses stale cached embeddings. Fake models (load
+    testing) get their own tag for the same reason.
+    """
+    if settings.fake_models:
+        return f"{settings.face_model}@fake"
+    if settings.embedding_backend == "tensorflow":
+        return settings.face_model
+    return f"{settings.face_model}@{settings.embedding_backend}:{_file_digest(settings.embedding_model_path)[:16]}"
+
+
+@lru_cache()
+def get_embedding_backend():
+    """
+    Returns the configured embedding backend (a timed stand-in with FAKE_MODELS).
+
+    Raises:
+        ValueError: If the backend is unknown or an exported model path is missing.
+    """
+    if settings.fake_models:
+        logger.warning("FAKE_MODELS is on: embeddings are simulated")
+        return FakeEmbeddingBackend()
+    backend = settings.embedding_backend
+    if backend == "tensorflow":
+        return TensorFlowBackend(settings.face_model)
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+    if not settings.embedding_model_path:
+        raise ValueError(f"EMBEDDING_BACKEND={backend} requires EMBEDDING_MODEL_PATH")
+
+    logger.info(f"Loading {backend} embedding model from {settings.embedding_model_path}")
+    if backend == "onnx":
+        return OnnxBackend(settings.embedding_model_path, settings.embedding_num_threads)
+    return TFLiteBackend(settings.embedding_model_path, settings.embedding_num_threads)
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """
+    Measures how far a candidate backend's embeddings are from the reference.
+
+    Args:
+        reference: (N, D) embeddings from the reference backend.
+        candidate: (N, D) embeddings of the same inputs from the candidate.
+
+    Returns:
+        Dictionary with max_abs_diff, mean_cosine_distance and max_cosine_distance.
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    candidate = np.asarray(candidate, dtype=np.float64)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Embedding shapes differ: {reference.shape} vs {candidate.shape}")
+
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    cosine = 1.0 - np.einsum("ij,ij->i", reference, candidate) / np.maximum(norms, 1e-12)
+    return {
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+        "mean_cosine_distance": float(cosine.mean()),
+        "max_cosine_distance": float(cosine.max())
+    }
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def make_cache_key(image_bytes: bytes, model_name: str, detector_backend: str, align: bool) -> str:
+    """
+    Builds a content-addressed cache key for a face image.
+
+    Args:
+        image_bytes: Raw bytes of the encoded image file.
+        model_name: Face recognition model used to compute the embedding.
+        detector_backend: Face detector used before embedding.
+        align: Whether faces are aligned before embedding.
+
+    Returns:
+        Hex digest uniquely identifying the image and embedding settings.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    settings_tag = f"{model_name}|{detector_backend}|{int(align)}"
+    return hashlib.sha256(f"{digest}|{settings_tag}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Bounded in-memory LRU of face embeddings with an optional on-disk store.
+
+    Entries evicted from memory stay on disk (if a directory is configured)
+    and are promoted back into memory on the next lookup.
+    """
+
+    def __init__(self, max_size: int = 1024, disk_dir: Optional[str] = None):
+        self.max_size = max(0, max_size)
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        if self.max_size == 0:
+            return
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Looks up an embedding by key.
+
+        Args:
+            key: Cache key from make_cache_key.
+
+        Returns:
+            Embedding as a float32 numpy array, or None if not cached.
+        """
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    embedding = np.load(path)
+                    with self._lock:
+                        self._remember(key, embedding)
+                        self.hits += 1
+                    return embedding
+                except Exception as e:
+                    logger.warning(f"Could not read cached embedding {key}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        """
+        Stores an embedding in memory and, if configured, on disk.
+
+        Args:
+            key: Cache key from make_cache_key.
+            embedding: Embedding vector to store.
+        """
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, embedding)
+
+        if self.disk_dir:
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(delete=False, dir=self.disk_dir, suffix=".tmp") as tmp_file:
+                    tmp_path = tmp_file.name
+                    np.save(tmp_file, embedding)
+                os.replace(tmp_path, self._disk_path(key))
+            except Exception as e:
+                logger.warning(f"Could not persist embedding {key}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def clear(self) -> None:
+        """Drops all in-memory entries. The on-disk store is left untouched."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+@lru_cache()
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache(
+        max_size=settings.face_embedding_cache_size,
+        disk_dir=settings.face_embedding_cache_dir
+    )
@@ -0,0 +1,87 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable
+
+from app.config import get_settings
+from app.logger import get_logger, setup_logging
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    return settings.pipeline_max_workers or os.cpu_count() or 1
+
+
+@lru_cache()
+def get_executor() -> Executor:
+    """
+    Returns the shared pool that runs blocking CV/ML work.
+
+    "thread" (default) shares loaded models between workers and relies on
+    OpenCV, MediaPipe and TensorFlow releasing the GIL. "process" sidesteps
+    the GIL entirely; each worker is spawned fresh and loads its own models.
+    """
+    max_workers = _pool_size()
+    if settings.pipeline_executor == "process":
+        logger.info(f"Starting process pool with {max_workers} workers")
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_logging
+        )
+    if settings.pipeline_executor == "thread":
+        logger.info(f"Starting thread pool with {max_workers} workers")
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+    raise ValueError(f"Unsupported pipeline executor: {settings.pipeline_executor}")
+
+
+def pending_tasks() -> int:
+    """Number of tasks submitted to the pool that have not finished yet."""
+    return _pending
+
+
+async def run_in_executor(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a blocking function on the pipeline pool without blocking the event loop.
+
+    With the process pool, func and its arguments must be picklable
+    (module-level functions, numpy arrays, plain data). With the thread pool,
+    func runs in a copy of the caller's context, so the request trace (see
+    tracing.py) follows the work into the pool.
+
+    Args:
+        func: Blocking callable to run.
+        *args: Positional arguments for func.
+        **kwargs: Keyword arguments for func.
+
+    Returns:
+        Whatever func returns; exceptions raised by func propagate.
+    """
+    global _pending
+    with _pending_lock:
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        call = partial(func, *args, **kwargs)
+        if settings.pipeline_executor == "thread":
+            call = partial(contextvars.copy_context().run, call)
+        return await loop.run_in_executor(get_executor(), call)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+def shutdown_executor() -> None:
+    """Stops the pipeline pool, if it was started."""
+    if get_executor.cache_info().currsize:
+        get_executor().shutdown(wait=False, cancel_futures=True)
+        get_executor.cache_clear()
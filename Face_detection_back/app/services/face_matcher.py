@@ -1,43 +1,334 @@
 from deepface import DeepFace
+from deepface.modules import preprocessing
 import cv2
 import numpy as np
+from functools import lru_cache
+from typing import List, Optional, Union
 from app.config import get_settings
 from app.logger import get_logger
+from app.services.batcher import MicroBatcher
+from app.services.embedding_backend import get_embedding_backend, model_tag
+from app.services.embedding_cache import get_embedding_cache, make_cache_key
+from app.services.fake_models import fake_prepare_face
+from app.services.frame_prep import crop_face
+from app.services.gallery import EmbeddingGallery, compute_distances
+from app.services.metrics import time_stage
+from app.services.ann_index import IVFIndex
+from app.services.warmup import wait_for_models
 
 logger = get_logger(__name__)
 settings = get_settings()
 
-try:
-    DeepFace.build_model(settings.face_model)
-    logger.info(f"{settings.face_model} model loaded successfully")
-except Exception as e:
-    logger.warning(f"Could not pre-load model: {e}")
+MODELS = ("face_detector", "face_embedding")
+FACE_VALIDATION_FAILED = "Face validation failed. Ensure face is clear and visible."
 
 
-def verify_faces(profile_path: str, live_frame_rgb: np.ndarray) -> dict:
+def warm_up_embedding() -> None:
+    """Loads the embedding backend and runs one dummy forward pass."""
+    backend = get_embedding_backend()
+    target_h, target_w = backend.input_shape
+    backend.embed(np.zeros((1, target_h, target_w, 3), dtype=np.float32))
+
+
+def warm_up_detector() -> None:
+    """Builds the face detector by running it on a blank image."""
+    if settings.fake_models:
+        return
+    DeepFace.extract_faces(
+        img_path=np.zeros((160, 160, 3), dtype=np.uint8),
+        detector_backend=settings.face_detector_backend,
+        enforce_detection=False,
+        align=settings.face_alignment
+    )
+
+
+def prepare_face(img: Union[str, np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Detects and aligns the face in an image and shapes it as model input.
+    
+    Mirrors the preprocessing of DeepFace.represent, so embeddings match the
+    unbatched path.
+    
+    Args:
+        img: Image file path or BGR numpy array.
+    
+    Returns:
+        (1, H, W, 3) float array ready for the model, or None if no face was found.
+    """
+    if settings.fake_models:
+        return fake_prepare_face(img, get_embedding_backend().input_shape)
+    
+    faces = DeepFace.extract_faces(
+        img_path=img,
+        detector_backend=settings.face_detector_backend,
+        enforce_detection=False,
+        align=settings.face_alignment
+    )
+    if not faces:
+        return None
+    
+    target_size = get_embedding_backend().input_shape
+    face = faces[0]["face"][:, :, ::-1]
+    face = preprocessing.resize_image(img=face, target_size=(target_size[1], target_size[0]))
+    return preprocessing.normalize_input(img=face, normalization="base")
+
+
+def embed_face_batch(faces: List[np.ndarray]) -> np.ndarray:
+    """
+    Runs one forward pass of the configured embedding backend over several prepared faces.
+    
+    Args:
+        faces: Outputs of prepare_face.
+    
+    Returns:
+        (N, D) float32 array of embeddings, one row per face.
+    """
+    return get_embedding_backend().embed(np.concatenate(faces, axis=0))
+
+
+@lru_cache()
+def get_embedding_batcher() -> MicroBatcher:
+    return MicroBatcher(
+        embed_face_batch,
+        max_batch_size=settings.inference_batch_max_size,
+        max_wait_ms=settings.inference_batch_max_wait_ms,
+        name="embedding"
+    )
+
+
+def shutdown_embedding_batcher() -> None:
+    """Stops the embedding batcher, if it was started."""
+    if get_embedding_batcher.cache_info().currsize:
+        get_embedding_batcher().close()
+        get_embedding_batcher.cache_clear()
+
+
+def align_face(frame_rgb: np.ndarray, pose: Optional[dict]) -> Optional[np.ndarray]:
+    """
+    Builds model input for a live face from its FaceMesh landmarks.
+    
+    The face box is rotated so the eyes are level and resampled straight to
+    the model input size in one affine warp, so no detector runs on the
+    live frame.
+    
+    Args:
+        frame_rgb: Full-resolution RGB frame.
+        pose: Pose record from estimate_head_pose for this frame.
+        
+    Returns:
+        (1, H, W, 3) float array like prepare_face, or None if the pose has
+        no face box or eye landmarks.
+    """
+    if not pose or not pose.get("face_box"):
+        return None
+    landmarks = pose.get("landmarks") or {}
+    if "left_eye" not in landmarks or "right_eye" not in landmarks:
+        return None
+    
+    box = pose["face_box"]
+    side = max(box["w"], box["h"])
+    if side <= 0:
+        return None
+    
+    (x1, y1), (x2, y2) = sorted([landmarks["left_eye"], landmarks["right_eye"]])
+    angle = float(np.degrees(np.arctan2(y2 - y1, x2 - x1)))
+    target_h, target_w = get_embedding_backend().input_shape
+    scale = min(target_w, target_h) / side
+    cx = box["x"] + box["w"] / 2
+    cy = box["y"] + box["h"] / 2
+    
+    matrix = cv2.getRotationMatrix2D((cx, cy), angle, scale)
+    matrix[0, 2] += target_w / 2 - cx
+    matrix[1, 2] += target_h / 2 - cy
+    face = cv2.warpAffine(frame_rgb, matrix, (target_w, target_h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+    return np.expand_dims(face[:, :, ::-1].astype(np.float32) / 255.0, axis=0)
+
+
+def embed_prepared_face(face: np.ndarray) -> np.ndarray:
+    """Embeds one prepared face, sharing a batch with other requests when batching is enabled."""
+    if settings.inference_batching_enabled:
+        return get_embedding_batcher().infer(face, timeout=settings.inference_batch_timeout_seconds)
+    return embed_face_batch([face])[0]
+
+
+def _uses_deepface_represent() -> bool:
+    """True when DeepFace.represent (detector + Keras model in one call) is the embedding path."""
+    return settings.embedding_backend == "tensorflow" and not settings.fake_models
+
+
+def _live_embedding(live_frame_rgb: np.ndarray, pose: Optional[dict]) -> np.ndarray:
+    with time_stage("embedding"):
+        return _embed_live_face(live_frame_rgb, pose)
+
+
+def _embed_live_face(live_frame_rgb: np.ndarray, pose: Optional[dict]) -> np.ndarray:
+    face = align_face(live_frame_rgb, pose) if settings.face_live_alignment == "landmarks" else None
+    if face is None:
+        frame_bgr = cv2.cvtColor(crop_face(live_frame_rgb, pose), cv2.COLOR_RGB2BGR)
+        if _uses_deepface_represent() and not settings.inference_batching_enabled:
+            representations = DeepFace.represent(
+                img_path=frame_bgr,
+                model_name=settings.face_model,
+                detector_backend=settings.face_detector_backend,
+                enforce_detection=False,
+                align=settings.face_alignment
+            )
+            return np.asarray(representations[0]["embedding"], dtype=np.float32)
+        face = prepare_face(frame_bgr)
+        if face is None:
+            raise ValueError("Face could not be detected in the live frame")
+    return np.asarray(embed_prepared_face(face), dtype=np.float32)
+
+
+def _embed_profile(profile_path: str) -> np.ndarray:
+    if _uses_deepface_represent():
+        representations = DeepFace.represent(
+            img_path=profile_path,
+            model_name=settings.face_model,
+            detector_backend=settings.face_detector_backend,
+            enforce_detection=False,
+            align=settings.face_alignment
+        )
+        return np.asarray(representations[0]["embedding"], dtype=np.float32)
+    
+    face = prepare_face(profile_path)
+    if face is None:
+        raise ValueError("Face could not be detected in the profile image")
+    return embed_face_batch([face])[0]
+
+
+def get_profile_embedding(profile_path: str) -> Optional[List[float]]:
+    """
+    Returns the embedding of a profile image, computing it only on cache miss.
+    
+    The cache is keyed on the image bytes, the embedding model (and backend)
+    and the detector and alignment settings, so retries against the same
+    profile skip detection and inference for it entirely. With the cache
+    disabled, the embedding is computed on every call.
+    
+    Args:
+        profile_path: Path to the profile image file.
+        
+    Returns:
+        Embedding as a list of floats, or None if it could not be computed.
+    """
+    try:
+        wait_for_models(*MODELS)
+        with time_stage("profile_embedding"):
+            return _cached_profile_embedding(profile_path)
+    except Exception as e:
+        logger.warning(f"Could not compute cached profile embedding: {e}")
+        return None
+
+
+def _cached_profile_embedding(profile_path: str) -> List[float]:
+    if not settings.face_embedding_cache_enabled:
+        return _embed_profile(profile_path).tolist()
+        
+    with open(profile_path, "rb") as f:
+        key = make_cache_key(
+            f.read(),
+            model_tag(),
+            settings.face_detector_backend,
+            settings.face_alignment
+        )
+    
+    cache = get_embedding_cache()
+    embedding = cache.get(key)
+    if embedding is None:
+        embedding = _embed_profile(profile_path)
+        cache.put(key, embedding)
+        logger.debug(f"Profile embedding cached: {key[:12]}")
+    else:
+        logger.debug(f"Profile embedding cache hit: {key[:12]}")
+    
+    return embedding.tolist()
+
+
+def verify_faces(profile_path: str, live_frame_rgb: np.ndarray, pose: Optional[dict] = None) -> dict:
     """
     Compares the profile image with a frame from the video.
     
+    The profile is embedded through the cache, so the detector only runs on
+    it on a cache miss; if it cannot be embedded, DeepFace.verify reports
+    why. The live face is aligned from its liveness landmarks when a pose is
+    given, and the distance is computed in NumPy.
+    
     Args:
         profile_path: Path to the profile image file.
         live_frame_rgb: RGB numpy array of the video frame.
+        pose: Pose record of the frame from liveness details, if known.
         
     Returns:
         Dictionary containing verification result with keys: verified, distance, 
         threshold, model, and optional error message.
     """
-    live_frame_bgr = cv2.cvtColor(live_frame_rgb, cv2.COLOR_RGB2BGR)
+    profile_input = get_profile_embedding(profile_path) or profile_path
+    return _compare_with_live_frame(profile_input, live_frame_rgb, pose)
+
+
+def verify_against_template(template: np.ndarray, live_frame_rgb: np.ndarray, pose: Optional[dict] = None) -> dict:
+    """
+    Compares an enrolled face template with a frame from the video.
     
+    Only the live frame is embedded; the template is used as-is.
+    
+    Args:
+        template: Stored embedding of the enrolled user.
+        live_frame_rgb: RGB numpy array of the video frame.
+        pose: Pose record of the frame from liveness details, if known.
+        
+    Returns:
+        Dictionary with the same keys as verify_faces.
+    """
+    return _compare_with_live_frame([float(x) for x in template], live_frame_rgb, pose)
+
+
+def verify_embeddings(profile_embedding: List[float], live_embedding: np.ndarray) -> dict:
+    """
+    Compares a profile embedding with a live face embedding computed earlier.
+    
+    Used when both embeddings were computed ahead of the decision, e.g.
+    speculatively while a stream was still arriving.
+    
+    Args:
+        profile_embedding: Embedding of the profile image or enrolled template.
+        live_embedding: Embedding of the live face, as from get_face_embedding.
+        
+    Returns:
+        Dictionary with the same keys as verify_faces.
+    """
+    result = _compare_embeddings(profile_embedding, live_embedding)
+    return {**result, "model": settings.face_model}
+
+
+def _compare_embeddings(profile_embedding: List[float], live_embedding: np.ndarray) -> dict:
+    threshold = settings.face_detection_threshold
+    distance = float(compute_distances(
+        np.asarray([profile_embedding], dtype=np.float32),
+        live_embedding,
+        settings.face_distance_metric
+    )[0])
+    return {"verified": distance <= threshold, "distance": distance, "threshold": threshold}
+
+
+def _compare_with_live_frame(profile_input: Union[str, List[float]], live_frame_rgb: np.ndarray, pose: Optional[dict] = None) -> dict:
     try:
-        result = DeepFace.verify(
-            img1_path=profile_path,
-            img2_path=live_frame_bgr,
-            model_name=settings.face_model,
-            detector_backend=settings.face_detector_backend,
-            distance_metric=settings.face_distance_metric,
-            enforce_detection=False,
-            threshold=settings.face_detection_threshold
-        )
+        wait_for_models(*MODELS)
+        if isinstance(profile_input, str):
+            result = DeepFace.verify(
+                img1_path=profile_input,
+                img2_path=cv2.cvtColor(crop_face(live_frame_rgb, pose), cv2.COLOR_RGB2BGR),
+                model_name=settings.face_model,
+                detector_backend=settings.face_detector_backend,
+                distance_metric=settings.face_distance_metric,
+                enforce_detection=False,
+                align=settings.face_alignment,
+                silent=True,
+                threshold=settings.face_detection_threshold
+            )
+        else:
+            result = _compare_embeddings(profile_input, _live_embedding(live_frame_rgb, pose))
         
         logger.info(f"Face verification successful: verified={result['verified']}")
         return {
@@ -53,7 +344,9 @@ def verify_faces(profile_path: str, live_frame_rgb: np.ndarray) -> dict:
             "verified": False,
             "error": str(e),
             "distance": 1.0,
-            "message": "Face validation failed. Ensure face is clear and visible."
+            "threshold": settings.face_detection_threshold,
+            "model": settings.face_model,
+            "message": FACE_VALIDATION_FAILED
         }
     except Exception as e:
         logger.error(f"Unexpected verification error: {e}")
@@ -61,5 +354,90 @@ def verify_faces(profile_path: str, live_frame_rgb: np.ndarray) -> dict:
             "verified": False,
             "error": str(e),
             "distance": 1.0,
+            "threshold": settings.face_detection_threshold,
+            "model": settings.face_model,
             "message": "Verification service error"
         }
+
+
+def get_face_embedding(frame_rgb: np.ndarray, pose: Optional[dict] = None) -> Optional[np.ndarray]:
+    """
+    Computes the embedding of the face in a video frame.
+    
+    With a pose record, the face is aligned from its landmarks instead of
+    running the detector. With inference batching enabled, the forward pass
+    is shared with other requests embedding a face at the same time.
+    
+    Args:
+        frame_rgb: RGB numpy array of the frame.
+        pose: Pose record of the frame from liveness details, if known.
+        
+    Returns:
+        Embedding as a float32 numpy array, or None if it could not be computed.
+    """
+    try:
+        wait_for_models(*MODELS)
+        return _live_embedding(frame_rgb, pose)
+    except Exception as e:
+        logger.error(f"Could not compute face embedding: {e}")
+        return None
+
+
+def identify_face(live_frame_rgb: np.ndarray, gallery: Union[EmbeddingGallery, IVFIndex], top_k: int = None) -> dict:
+    """
+    Finds the enrolled users closest to the face in a video frame.
+    
+    The live frame is embedded once and scored against the whole gallery in a
+    single vectorized operation, using the configured metric and threshold.
+    
+    Args:
+        live_frame_rgb: RGB numpy array of the video frame.
+        gallery: Gallery of enrolled embeddings (exact or ANN backend).
+        top_k: Number of candidates to return. Uses config value if not specified.
+        
+    Returns:
+        Dictionary with keys: identified, user_id, matches, threshold, model,
+        and optional error message.
+    """
+    return match_gallery(get_face_embedding(live_frame_rgb), gallery, top_k)
+
+
+def match_gallery(embedding: Optional[np.ndarray], gallery: Union[EmbeddingGallery, IVFIndex], top_k: int = None) -> dict:
+    """
+    Ranks enrolled users by distance to an already computed live embedding.
+    
+    Args:
+        embedding: Live face embedding, or None if it could not be computed.
+        gallery: Gallery of enrolled embeddings (exact or ANN backend).
+        top_k: Number of candidates to return. Uses config value if not specified.
+        
+    Returns:
+        Dictionary with the same keys as identify_face.
+    """
+    if top_k is None:
+        top_k = settings.identify_top_k
+    threshold = settings.face_detection_threshold
+    
+    if embedding is None:
+        return {
+            "identified": False,
+            "matches": [],
+            "threshold": threshold,
+            "model": settings.face_model,
+            "message": "Face could not be embedded. Ensure face is clear and visible."
+        }
+    
+    matches = [
+        {"user_id": user_id, "distance": distance, "verified": distance <= threshold}
+        for user_id, distance in gallery.search(embedding, top_k, settings.face_distance_metric)
+    ]
+    identified = bool(matches) and matches[0]["verified"]
+    
+    logger.info(f"Identification completed: identified={identified}, candidates={len(matches)}")
+    return {
+        "identified": identified,
+        "user_id": matches[0]["user_id"] if identified else None,
+        "matches": matches,
+        "threshold": threshold,
+        "model": settings.face_model
+    }
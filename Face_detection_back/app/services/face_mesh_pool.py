@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import mediapipe as mp
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.fake_models import FakeFaceMesh
+from app.services.metrics import observe_stage
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def create_face_mesh() -> Any:
+    """Builds a FaceMesh graph configured for single-face still images."""
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=settings.face_detection_confidence
+    )
+
+
+class FaceMeshPool:
+    """
+    Bounded pool of MediaPipe FaceMesh instances.
+
+    A FaceMesh graph must not be used by two threads at once, so each caller
+    checks out its own instance for a batch of frames. Instances are created
+    lazily up to ``size``; once all are in use, callers block until one is
+    returned (or ``timeout`` seconds pass). Time spent blocked is recorded
+    per checkout as the face_mesh_wait stage (0 when an instance was free).
+    """
+
+    def __init__(self, size: int, factory: Callable[[], Any] = None, timeout: Optional[float] = None):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._factory = factory or create_face_mesh
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+    def _acquire(self) -> Tuple[Any, float]:
+        try:
+            return self._idle.get_nowait(), 0.0
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                mesh = self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            logger.debug(f"Created FaceMesh instance {self._created}/{self.size}")
+            return mesh, 0.0
+
+        start = time.perf_counter()
+        try:
+            mesh = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            observe_stage("face_mesh_wait", time.perf_counter() - start)
+            raise TimeoutError(f"No FaceMesh instance available after {self.timeout}s")
+        return mesh, time.perf_counter() - start
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """
+        Borrows a FaceMesh instance for the duration of the block.
+
+        Raises:
+            TimeoutError: If no instance became free within the pool timeout.
+        """
+        mesh, waited = self._acquire()
+        observe_stage("face_mesh_wait", waited)
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield mesh
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(mesh)
+
+    def stats(self) -> dict:
+        """Returns pool occupancy; checkout waits are on /metrics as the face_mesh_wait stage."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use
+            }
+
+
+@lru_cache()
+def get_face_mesh_pool() -> FaceMeshPool:
+    size = settings.face_mesh_pool_size or settings.pipeline_max_workers or os.cpu_count() or 1
+    factory = FakeFaceMesh if settings.fake_models else None
+    return FaceMeshPool(size=size, factory=factory, timeout=settings.face_mesh_pool_timeout)
+
+
+def warm_up_face_mesh() -> None:
+    """Creates the first pooled FaceMesh graph and runs it on a blank frame."""
+    with get_face_mesh_pool().checkout() as mesh:
+        mesh.process(np.zeros((256, 256, 3), dtype=np.uint8))
@@ -0,0 +1,97 @@
+import time
+from types import SimpleNamespace
+from typing import List, Tuple, Union
+
+import cv2
+import numpy as np
+from app.config import get_settings
+
+settings = get_settings()
+
+NUM_LANDMARKS = 478
+EMBEDDING_DIM = 512
+# Normalised x of the nose for a frontal pose and a left turn (yaw ratio 1.0 and 2.0).
+CENTER_NOSE_X = 0.5
+LEFT_NOSE_X = 0.55
+
+
+def simulate_cost(ms: float) -> None:
+    """
+    Stands in for ``ms`` milliseconds of model work.
+
+    FAKE_MODEL_COST=sleep only holds the calling thread; burn keeps a core
+    busy with NumPy matrix products (which, like the real models, release
+    the GIL), so CPU contention between concurrent requests is reproduced.
+    """
+    if ms <= 0:
+        return
+    deadline = time.perf_counter() + ms / 1000
+    if settings.fake_model_cost == "burn":
+        a = np.random.default_rng(0).random((128, 128), dtype=np.float32)
+        while time.perf_counter() < deadline:
+            a = np.tanh(a @ a)
+    else:
+        time.sleep(ms / 1000)
+
+
+def _landmarks(nose_x: float) -> List[SimpleNamespace]:
+    """A face-shaped landmark set: a grid over the face box, with nose, ears and irises placed for the pose."""
+    grid = np.linspace(0.3, 0.7, 22)
+    points = [SimpleNamespace(x=float(x), y=float(y), z=0.0) for y in grid for x in grid][:NUM_LANDMARKS]
+    points += [SimpleNamespace(x=0.5, y=0.5, z=0.0)] * (NUM_LANDMARKS - len(points))
+    points[1] = SimpleNamespace(x=nose_x, y=0.5, z=0.0)       # nose tip
+    points[234] = SimpleNamespace(x=0.35, y=0.45, z=0.0)      # left ear tragion
+    points[454] = SimpleNamespace(x=0.65, y=0.45, z=0.0)      # right ear tragion
+    points[468] = SimpleNamespace(x=0.44, y=0.42, z=0.0)      # right iris centre
+    points[473] = SimpleNamespace(x=0.56, y=0.42, z=0.0)      # left iris centre
+    return points
+
+
+class FakeFaceMesh:
+    """
+    FaceMesh stand-in: costs FAKE_FACE_MESH_MS per frame and alternates a
+    frontal and a left-turned face, so any two consecutive frames pass the
+    liveness check and the rest of the pipeline still runs.
+    """
+
+    def __init__(self):
+        self._calls = 0
+        self._poses = [_landmarks(CENTER_NOSE_X), _landmarks(LEFT_NOSE_X)]
+
+    def process(self, image: np.ndarray) -> SimpleNamespace:
+        simulate_cost(settings.fake_face_mesh_ms)
+        landmarks = self._poses[self._calls % 2]
+        self._calls += 1
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=landmarks)])
+
+    def close(self) -> None:
+        pass
+
+
+class FakeEmbeddingBackend:
+    """
+    Embedding backend stand-in: costs FAKE_EMBEDDING_MS per forward pass and
+    returns a fixed random projection of the downsampled input, so the same
+    face always gets the same embedding.
+    """
+
+    name = "fake"
+
+    def __init__(self, input_shape: Tuple[int, int] = (160, 160)):
+        self.input_shape = input_shape
+        self._projection = np.random.default_rng(0).standard_normal((8 * 8 * 3, EMBEDDING_DIM)).astype(np.float32)
+
+    def embed(self, batch: np.ndarray) -> np.ndarray:
+        """Same contract as TensorFlowBackend.embed."""
+        simulate_cost(settings.fake_embedding_ms)
+        pooled = np.stack([cv2.resize(np.asarray(face, dtype=np.float32), (8, 8), interpolation=cv2.INTER_AREA) for face in batch])
+        return pooled.reshape(len(batch), -1) @ self._projection
+
+
+def fake_prepare_face(img: Union[str, np.ndarray], input_shape: Tuple[int, int]) -> np.ndarray:
+    """Face detector stand-in: costs FAKE_DETECTOR_MS and treats the whole image as the face."""
+    simulate_cost(settings.fake_detector_ms)
+    if isinstance(img, str):
+        img = cv2.imread(img)
+    face = cv2.resize(img, (input_shape[1], input_shape[0])).astype(np.float32) / 255.0
+    return face[np.newaxis]
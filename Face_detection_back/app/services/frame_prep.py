@@ -0,0 +1,82 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def downscale_for_analysis(frame_rgb: np.ndarray, max_side: int = None) -> np.ndarray:
+    """
+    Returns a copy of a frame small enough for landmark detection.
+
+    FaceMesh runs its detector and mesh models at 128-256 px internally, so
+    feeding it a full 1080x1920 frame only adds conversion and resize work.
+    Landmarks come back normalised, so callers can still map them onto the
+    original frame.
+
+    Args:
+        frame_rgb: RGB numpy array of the frame.
+        max_side: Longest side of the analysis copy. Uses config value if not
+            specified; 0 disables downscaling.
+
+    Returns:
+        The downscaled frame, or the input itself if it is already small enough.
+    """
+    if max_side is None:
+        max_side = settings.liveness_analysis_max_side
+    h, w = frame_rgb.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return frame_rgb
+
+    scale = max_side / max(h, w)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(frame_rgb, size, interpolation=cv2.INTER_LINEAR)
+
+
+def crop_face(frame_rgb: np.ndarray, pose: Optional[dict], margin: float = None, max_side: int = None) -> np.ndarray:
+    """
+    Cuts a square face crop out of a full-resolution frame.
+
+    The crop is centred on the FaceMesh face box and padded by ``margin`` of
+    its size on every side, so the embedding detector still sees the whole
+    head but scans a fraction of the pixels.
+
+    Args:
+        frame_rgb: Full-resolution RGB frame.
+        pose: Pose record from estimate_head_pose for this frame.
+        margin: Padding as a fraction of the face box size. Uses config value if not specified.
+        max_side: Longest side of the returned crop. Uses config value if not
+            specified; 0 keeps the crop at full resolution.
+
+    Returns:
+        RGB face crop, or the whole frame if the pose has no face box.
+    """
+    if margin is None:
+        margin = settings.face_crop_margin
+    if max_side is None:
+        max_side = settings.face_crop_max_side
+    if not pose or not pose.get("face_box"):
+        return frame_rgb
+
+    box = pose["face_box"]
+    h, w = frame_rgb.shape[:2]
+    side = max(box["w"], box["h"]) * (1 + 2 * margin)
+    if side <= 0:
+        return frame_rgb
+
+    cx = box["x"] + box["w"] / 2
+    cy = box["y"] + box["h"] / 2
+    x0, x1 = int(max(0, cx - side / 2)), int(min(w, cx + side / 2))
+    y0, y1 = int(max(0, cy - side / 2)), int(min(h, cy + side / 2))
+    if x1 <= x0 or y1 <= y0:
+        return frame_rgb
+
+    crop = frame_rgb[y0:y1, x0:x1]
+    if max_side and max(crop.shape[:2]) > max_side:
+        crop = downscale_for_analysis(crop, max_side)
+    return np.ascontiguousarray(crop)
+
@@ -0,0 +1,223 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+DISTANCE_METRICS = ("cosine", "euclidean", "euclidean_l2")
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def compute_distances(matrix: np.ndarray, query: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Computes the distance from one query embedding to every row of a matrix.
+
+    Uses the same definitions as DeepFace so that the configured threshold
+    keeps its meaning.
+
+    Args:
+        matrix: (N, D) array of embeddings.
+        query: (D,) query embedding.
+        metric: One of "cosine", "euclidean" or "euclidean_l2".
+
+    Returns:
+        (N,) array of distances.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    query = np.asarray(query, dtype=np.float32)
+
+    if metric not in DISTANCE_METRICS:
+        raise ValueError(f"Unsupported distance metric: {metric}")
+
+    # Expanded forms avoid materialising an (N, D) temporary per query.
+    row_norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    if metric == "euclidean":
+        squared = row_norms ** 2 - 2.0 * (matrix @ query) + float(query @ query)
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    cosine = 1.0 - (matrix @ _l2_normalize(query)) / np.maximum(row_norms, 1e-12)
+    if metric == "cosine":
+        return cosine
+    return np.sqrt(np.maximum(2.0 * cosine, 0.0))
+
+
+class EmbeddingGallery:
+    """
+    Enrolled embeddings held as one contiguous (N, D) matrix (float32 by default).
+
+    Rows are kept packed: removing a user moves the last row into the freed
+    slot, so a search is always a single vectorized operation over
+    ``matrix[:N]``. Capacity grows geometrically to keep inserts amortised O(D).
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 64, dtype=np.float32):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._initial_capacity = max(1, initial_capacity)
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only view of the packed embedding rows."""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=self.dtype)
+        view = self._matrix[:len(self._ids)]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def ids(self) -> List[str]:
+        """User ids in row order."""
+        return list(self._ids)
+
+    def _ensure_capacity(self, size: int) -> None:
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, size)
+            self._matrix = np.zeros((capacity, self.dim), dtype=self.dtype)
+        elif size > self._matrix.shape[0]:
+            grown = np.zeros((max(size, self._matrix.shape[0] * 2), self.dim), dtype=self.dtype)
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = grown
+
+    def add(self, user_id: str, embedding: np.ndarray) -> None:
+        """
+        Inserts or replaces the embedding of a user.
+
+        Raises:
+            ValueError: If the embedding dimension does not match the gallery.
+        """
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        with self._lock:
+            if self.dim is None:
+                self.dim = embedding.shape[0]
+            if embedding.shape[0] != self.dim:
+                raise ValueError(f"Expected {self.dim}-d embedding, got {embedding.shape[0]}-d")
+
+            row = self._rows.get(user_id)
+            if row is None:
+                self._ensure_capacity(len(self._ids) + 1)
+                row = len(self._ids)
+                self._ids.append(user_id)
+                self._rows[user_id] = row
+            self._matrix[row] = embedding
+
+    def extend(self, user_ids: List[str], embeddings: np.ndarray) -> None:
+        """
+        Inserts many users at once with a single block copy.
+
+        Args:
+            user_ids: Ids of the users, one per row of embeddings.
+            embeddings: (M, D) array of embeddings.
+        """
+        embeddings = np.asarray(embeddings, dtype=self.dtype).reshape(len(user_ids), -1)
+        with self._lock:
+            pending: Dict[str, int] = {}
+            for i, user_id in enumerate(user_ids):
+                if user_id in self._rows:
+                    self.add(user_id, embeddings[i])
+                else:
+                    pending[user_id] = i
+            if not pending:
+                return
+
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+            if embeddings.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-d embedding, got {embeddings.shape[1]}-d")
+
+            new_ids = list(pending)
+            start = len(self._ids)
+            self._ensure_capacity(start + len(new_ids))
+            self._matrix[start:start + len(new_ids)] = embeddings[list(pending.values())]
+            for offset, user_id in enumerate(new_ids):
+                self._ids.append(user_id)
+                self._rows[user_id] = start + offset
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        """Returns a copy of a user's embedding, or None if not present."""
+        with self._lock:
+            row = self._rows.get(user_id)
+            return None if row is None else self._matrix[row].copy()
+
+    def score(self, user_ids: List[str], query: np.ndarray, metric: str = None) -> np.ndarray:
+        """
+        Computes exact distances from a query to a subset of users.
+
+        Args:
+            user_ids: Ids of users present in the gallery.
+            query: Query embedding.
+            metric: Distance metric. Uses config value if not specified.
+
+        Returns:
+            Array of distances aligned with user_ids.
+        """
+        metric = metric or settings.face_distance_metric
+        with self._lock:
+            rows = [self._rows[user_id] for user_id in user_ids]
+            return compute_distances(self._matrix[rows], query, metric)
+
+    def remove(self, user_id: str) -> bool:
+        """
+        Removes a user from the gallery.
+
+        Returns:
+            True if the user was present.
+        """
+        with self._lock:
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return False
+
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._ids.pop()
+            return True
+
+    def search(self, query: np.ndarray, top_k: int = 5, metric: str = None) -> List[Tuple[str, float]]:
+        """
+        Scores a query embedding against the whole gallery.
+
+        Args:
+            query: Query embedding.
+            top_k: Number of closest users to return.
+            metric: Distance metric. Uses config value if not specified.
+
+        Returns:
+            List of (user_id, distance) sorted by increasing distance.
+        """
+        metric = metric or settings.face_distance_metric
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or top_k <= 0:
+                return []
+            distances = compute_distances(self._matrix[:count], query, metric)
+            ids = list(self._ids)
+
+        k = min(top_k, count)
+        if k < count:
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(count)
+        order = candidates[np.argsort(distances[candidates], kind="stable")]
+        return [(ids[i], float(distances[i])) for i in order]
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.tracing import start_trace
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while JOB_QUEUE_SIZE jobs are already waiting."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobFailed(Exception):
+    """Raised by a job to fail with a client-facing status code and message."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class Job:
+    """One submitted unit of work and, once finished, its result or error."""
+
+    def __init__(
+        self,
+        run: Callable[[], Awaitable[dict]],
+        cleanup: Optional[Callable[[], None]] = None,
+        callback_url: Optional[str] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.callback_url = callback_url
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[dict] = None
+        self.callback: Optional[dict] = None
+        self._run = run
+        self._cleanup = cleanup
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "callback": self.callback
+        }
+
+
+def callback_allowed(url: str) -> bool:
+    """
+    True if a job may report to this URL.
+
+    Only http(s) URLs on the host of JOB_CALLBACK_URL or a host listed in
+    JOB_CALLBACK_ALLOWED_HOSTS are accepted, so clients cannot make the
+    server call arbitrary addresses.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return False
+    allowed = {h.strip().lower() for h in settings.job_callback_allowed_hosts.split(",") if h.strip()}
+    if settings.job_callback_url:
+        allowed.add((urlparse(settings.job_callback_url).hostname or "").lower())
+    return parsed.hostname.lower() in allowed
+
+
+def deliver_callback(url: str, payload: dict, timeout: float, retries: int) -> dict:
+    """
+    POSTs a job's final state as JSON, retrying with exponential backoff.
+
+    Blocking; JobQueue runs it on its callback pool.
+
+    Returns:
+        Dictionary with url, delivered, attempts and the last status_code (or error).
+    """
+    body = json.dumps(payload).encode()
+    outcome = {"url": url, "delivered": False, "attempts": 0, "status_code": None, "error": None}
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        outcome["attempts"] = attempt + 1
+        request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                outcome["status_code"] = response.status
+            outcome["delivered"] = True
+            outcome["error"] = None
+            return outcome
+        except urllib.error.HTTPError as e:
+            outcome["status_code"] = e.code
+            outcome["error"] = f"HTTP {e.code}"
+            if e.code < 500:
+                break
+        except (urllib.error.URLError, OSError) as e:
+            outcome["error"] = str(e)
+    logger.warning(f"Callback to {url} failed after {outcome['attempts']} attempts: {outcome['error']}")
+    return outcome
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue with a fixed pool of asyncio workers.
+
+    At most ``max_queued`` jobs wait at once; further submissions raise
+    QueueFull with a Retry-After estimate. Finished jobs are kept for
+    ``result_ttl`` seconds for polling, then dropped. If a job has a
+    callback URL, its final state is POSTed there once it finishes, from a
+    separate pool of ``callback_workers`` threads: workers only run jobs, so
+    a slow or unreachable callback host never delays the queue. The job's
+    ``callback`` field is set once delivery has finished. Jobs still running
+    at stop() fail with a 503 shutdown error.
+    """
+
+    def __init__(self, workers: int, max_queued: int, result_ttl: float, callback_workers: int = 4):
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.result_ttl = result_ttl
+        self.callback_workers = max(1, callback_workers)
+        self._callback_pool: Optional[ThreadPoolExecutor] = None
+        self._callback_tasks: Set[asyncio.Task] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: Dict[str, Job] = {}
+        self._completed = 0
+        self._failed = 0
+        self._total_run = 0.0
+
+    def start(self) -> None:
+        """Starts the workers on the running event loop (no-op if already running there)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        if self._callback_pool is None:
+            self._callback_pool = ThreadPoolExecutor(max_workers=self.callback_workers, thread_name_prefix="job-callback")
+        self._tasks = [loop.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+        for job in self._jobs.values():
+            if job.status == QUEUED:
+                self._queue.put_nowait(job)
+
+    async def stop(self) -> None:
+        """
+        Cancels the workers and pending callbacks and shuts down the callback pool.
+
+        Jobs still running fail with a 503 shutdown error; queued jobs stay
+        queued until the next start().
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for task in list(self._callback_tasks):
+            task.cancel()
+        await asyncio.gather(*self._callback_tasks, return_exceptions=True)
+        if self._callback_pool is not None:
+            self._callback_pool.shutdown(wait=False, cancel_futures=True)
+            self._callback_pool = None
+
+    def submit(
+        self,
+        run: Callable[[], Awaitable[dict]],
+        cleanup: Optional[Callable[[], None]] = None,
+        callback_url: Optional[str] = None
+    ) -> Job:
+        """
+        Queues a job.
+
+        Args:
+            run: Coroutine function producing the job result. It may raise
+                JobFailed to fail with a status code and message.
+            cleanup: Called once the job finished (or could not be queued).
+            callback_url: Where to POST the final state, if anywhere.
+
+        Raises:
+            QueueFull: If max_queued jobs are already waiting.
+        """
+        self.start()
+        self._purge()
+        if self.queued() >= self.max_queued:
+            if cleanup is not None:
+                cleanup()
+            raise QueueFull(self.retry_after())
+        job = Job(run, cleanup, callback_url)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns a job that is pending or finished less than result_ttl ago."""
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def queued(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up, from the average job run time."""
+        average = self._total_run / (self._completed + self._failed) if self._completed + self._failed else 1.0
+        return max(1, math.ceil(average * self.queued() / self.workers))
+
+    def stats(self) -> dict:
+        """Returns queue depth, running jobs and completion counts."""
+        finished = self._completed + self._failed
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": self.queued(),
+            "running": sum(1 for job in self._jobs.values() if job.status == RUNNING),
+            "completed": self._completed,
+            "failed": self._failed,
+            "callbacks_pending": len(self._callback_tasks),
+            "avg_run_seconds": round(self._total_run / finished, 3) if finished else 0.0
+        }
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job) -> None:
+        trace = start_trace()
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = await job._run()
+            job.status = COMPLETED
+            self._completed += 1
+        except JobFailed as e:
+            job.error = {"status_code": e.status_code, "detail": e.detail}
+            job.status = FAILED
+            self._failed += 1
+        except asyncio.CancelledError:
+            logger.warning(f"Job {job.id} cancelled by shutdown")
+            job.error = {"status_code": 503, "detail": "Server shut down before the job finished"}
+            job.status = FAILED
+            self._failed += 1
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}", exc_info=True)
+            job.error = {"status_code": 500, "detail": str(e)}
+            job.status = FAILED
+            self._failed += 1
+        finally:
+            job.finished_at = time.time()
+            self._total_run += job.finished_at - job.started_at
+            if job._cleanup is not None:
+                try:
+                    job._cleanup()
+                except Exception as e:
+                    logger.warning(f"Job {job.id} cleanup failed: {e}")
+        logger.info(f"job_timing {json.dumps({'job_id': job.id, 'status': job.status, **trace.summary()})}")
+
+        if job.callback_url:
+            task = asyncio.get_running_loop().create_task(self._deliver(job))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    async def _deliver(self, job: Job) -> None:
+        job.callback = await asyncio.get_running_loop().run_in_executor(
+            self._callback_pool,
+            deliver_callback,
+            job.callback_url,
+            job.to_dict(),
+            settings.job_callback_timeout,
+            settings.job_callback_retries
+        )
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    return JobQueue(
+        workers=settings.job_workers,
+        max_queued=settings.job_queue_size,
+        result_ttl=settings.job_result_ttl_seconds,
+        callback_workers=settings.job_callback_workers
+    )
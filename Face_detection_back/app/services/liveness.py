@@ -1,35 +1,53 @@
+import time
 import cv2
-import mediapipe as mp
 import numpy as np
-from typing import Optional, Tuple, List
+from typing import Any, Iterable, Optional, Tuple, List
 from app.config import get_settings
 from app.logger import get_logger
+from app.services.face_mesh_pool import get_face_mesh_pool
+from app.services.frame_prep import downscale_for_analysis, crop_face
+from app.services.metrics import observe_stage, time_stage
+from app.services.tracing import record_count
+from app.services.warmup import wait_for_models
 
 logger = get_logger(__name__)
 settings = get_settings()
 
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=True,
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=settings.face_detection_confidence
-)
 
+NOSE_TIP = 1
+LEFT_EAR_TRAGION = 234
+RIGHT_EAR_TRAGION = 454
+RIGHT_IRIS_CENTER = 468
+LEFT_IRIS_CENTER = 473
 
-def get_head_pose_yaw(frame_rgb: np.ndarray) -> Optional[float]:
+FRONTAL_TOLERANCE = 0.15
+
+
+def estimate_head_pose(frame_rgb: np.ndarray, face_mesh: Any = None) -> Optional[dict]:
     """
-    Estimates head yaw using 2D landmark ratios.
+    Runs FaceMesh once on a frame and derives everything later stages need.
+    
+    FaceMesh sees a downscaled analysis copy; coordinates are reported in
+    pixels of the original frame.
     
     Args:
         frame_rgb: RGB numpy array of the frame.
+        face_mesh: FaceMesh instance checked out by the caller. If not given,
+            one is borrowed from the pool for this frame only.
         
     Returns:
-        Float representing yaw ratio (1.0 = center, >1.5 = left, <0.6 = right),
-        or None if face not detected.
+        Dictionary with yaw_ratio (1.0 = center, >1.5 = left, <0.6 = right),
+        face_box ({x, y, w, h} in pixels) and landmarks (named [x, y] pixel
+        points: nose, left_ear, right_ear and, when refined landmarks are
+        available, left_eye and right_eye), or None if face not detected.
     """
+    if face_mesh is None:
+        with get_face_mesh_pool().checkout() as pooled_mesh:
+            return estimate_head_pose(frame_rgb, pooled_mesh)
+    
     try:
-        results = face_mesh.process(frame_rgb)
+        with time_stage("face_mesh"):
+            results = face_mesh.process(downscale_for_analysis(frame_rgb))
         
         if not results.multi_face_landmarks:
             return None
@@ -37,9 +55,9 @@ def get_head_pose_yaw(frame_rgb: np.ndarray) -> Optional[float]:
         landmarks = results.multi_face_landmarks[0].landmark
         h, w, _ = frame_rgb.shape
         
-        nose = landmarks[1]
-        left_ear_tragion = landmarks[234]
-        right_ear_tragion = landmarks[454]
+        nose = landmarks[NOSE_TIP]
+        left_ear_tragion = landmarks[LEFT_EAR_TRAGION]
+        right_ear_tragion = landmarks[RIGHT_EAR_TRAGION]
         
         nose_x = nose.x * w
         left_ear_x = left_ear_tragion.x * w
@@ -49,58 +67,260 @@ def get_head_pose_yaw(frame_rgb: np.ndarray) -> Optional[float]:
         dist_nose_to_right = abs(right_ear_x - nose_x)
         
         if dist_nose_to_right == 0:
-            return 999.0
+            ratio = 999.0
+        else:
+            ratio = dist_nose_to_left / dist_nose_to_right
+        
+        points = np.array([(lm.x * w, lm.y * h) for lm in landmarks], dtype=np.float32)
+        x_min, y_min = np.clip(points.min(axis=0), 0, [w, h]).astype(int)
+        x_max, y_max = np.clip(points.max(axis=0), 0, [w, h]).astype(int)
+        
+        named = {
+            "nose": NOSE_TIP,
+            "left_ear": LEFT_EAR_TRAGION,
+            "right_ear": RIGHT_EAR_TRAGION
+        }
+        if len(landmarks) > LEFT_IRIS_CENTER:
+            named["left_eye"] = LEFT_IRIS_CENTER
+            named["right_eye"] = RIGHT_IRIS_CENTER
         
-        ratio = dist_nose_to_left / dist_nose_to_right
-        return ratio
+        return {
+            "yaw_ratio": ratio,
+            "face_box": {
+                "x": int(x_min),
+                "y": int(y_min),
+                "w": int(x_max - x_min),
+                "h": int(y_max - y_min)
+            },
+            "landmarks": {
+                name: [round(float(points[i][0]), 1), round(float(points[i][1]), 1)]
+                for name, i in named.items()
+            }
+        }
     except Exception as e:
         logger.debug(f"Error computing head pose: {e}")
         return None
 
 
-def check_liveness_pose(frames: List[np.ndarray]) -> Tuple[bool, str, dict]:
+def get_head_pose_yaw(frame_rgb: np.ndarray, face_mesh: Any = None) -> Optional[float]:
     """
-    Validates liveness by checking for center-to-left head movement.
+    Estimates head yaw using 2D landmark ratios.
+    
+    Args:
+        frame_rgb: RGB numpy array of the frame.
+        face_mesh: FaceMesh instance checked out by the caller. If not given,
+            one is borrowed from the pool for this frame only.
+        
+    Returns:
+        Float representing yaw ratio (1.0 = center, >1.5 = left, <0.6 = right),
+        or None if face not detected.
+    """
+    pose = estimate_head_pose(frame_rgb, face_mesh)
+    return pose["yaw_ratio"] if pose is not None else None
+
+
+def select_best_frame_index(poses: List[Optional[dict]]) -> int:
+    """
+    Picks the most frontal frame (yaw ratio closest to 1.0) from pose records.
     
     Args:
-        frames: List of RGB numpy arrays to analyze.
+        poses: Per-frame pose records as returned in liveness details.
         
     Returns:
-        Tuple of (is_live: bool, message: str, details: dict).
+        Index of the best frame; 0 if no face was detected in any frame.
     """
-    ratios = []
+    best_index = 0
+    best_diff = 999.0
     
-    for frame in frames:
-        r = get_head_pose_yaw(frame)
-        ratios.append(r)
-            
-    valid_ratios = [r for r in ratios if r is not None]
+    for i, pose in enumerate(poses):
+        if pose is None or pose.get("yaw_ratio") is None:
+            continue
+        diff = abs(pose["yaw_ratio"] - 1.0)
+        if diff < best_diff:
+            best_diff = diff
+            best_index = i
+            if diff < FRONTAL_TOLERANCE:
+                break
     
-    if len(valid_ratios) < settings.liveness_min_valid_frames:
-        logger.warning("Insufficient valid frames for liveness detection")
-        return False, "Face not detected clearly. Move slower and ensure good lighting.", {"ratios": ratios}
+    return best_index
+
 
-    logger.debug(f"Detected 2D ratios: {[round(r, 2) for r in valid_ratios]}")
+def select_best_frame(frames: List[np.ndarray], poses: List[Optional[dict]]) -> Tuple[np.ndarray, Optional[dict]]:
+    """
+    Picks the most frontal frame together with its pose record.
     
-    if max(valid_ratios) < settings.liveness_center_ratio_min:
-        logger.warning("Face not in center position for liveness")
-        return False, "Start by looking straight.", {"ratios": ratios}
+    Args:
+        frames: Full-resolution RGB frames passed to liveness.
+        poses: Per-frame pose records from liveness details.
+        
+    Returns:
+        Tuple of (full-resolution frame, pose record or None if no face was found).
+    """
+    index = select_best_frame_index(poses)
+    pose = poses[index] if index < len(poses) else None
+    return frames[index], pose
 
-    min_ratio = min(valid_ratios)
-    max_ratio = max(valid_ratios)
+
+def best_face_crop(frames: List[np.ndarray], poses: List[Optional[dict]]) -> np.ndarray:
+    """
+    Picks the most frontal frame from pose records and crops its face.
     
-    if min_ratio < settings.liveness_left_turn_threshold or max_ratio > settings.liveness_mirror_threshold:
-        logger.info("Liveness check passed")
-        return True, "Liveness verified (Center -> Left).", {
-            "min_ratio": min_ratio,
-            "max_ratio": max_ratio,
-            "ratios": ratios
-        }
-    else:
-        logger.warning(f"Head turn not detected. Range: {round(min_ratio, 2)} to {round(max_ratio, 2)}")
-        return False, f"Head turn LEFT not detected. Range: {round(min_ratio, 2)} to {round(max_ratio, 2)}", {
-            "min_ratio": min_ratio,
-            "max_ratio": max_ratio,
-            "ratios": ratios
-        }
+    Args:
+        frames: Full-resolution RGB frames passed to liveness.
+        poses: Per-frame pose records from liveness details.
+        
+    Returns:
+        Full-resolution face crop of the best frame, or the whole frame if no
+        face box is known.
+    """
+    return crop_face(*select_best_frame(frames, poses))
+
+
+class LivenessSession:
+    """
+    Incremental center-to-left liveness check.
+    
+    Pose records are added one frame at a time. The session tracks only the
+    running count, minimum and maximum of the yaw ratios, and settles as soon
+    as the outcome can no longer change: passed once a center pose and a left
+    turn have both been seen, failed once too few frames remain to reach
+    LIVENESS_MIN_VALID_FRAMES. Because every condition is monotone in the
+    frames seen, an early pass is exactly the verdict all frames would give.
+    """
+    
+    def __init__(self, expected_frames: Optional[int] = None):
+        self.expected_frames = expected_frames
+        self.poses: List[Optional[dict]] = []
+        self.decision: Optional[bool] = None
+        self._valid = 0
+        self._min_ratio = float("inf")
+        self._max_ratio = float("-inf")
+    
+    @property
+    def done(self) -> bool:
+        """True once more frames can no longer change the outcome."""
+        return self.decision is not None
+    
+    def add(self, pose: Optional[dict]) -> Optional[bool]:
+        """
+        Records the pose of the next frame.
+        
+        Args:
+            pose: Pose record from estimate_head_pose, or None if no face was found.
+            
+        Returns:
+            True or False once the outcome is settled, otherwise None.
+        """
+        self.poses.append(pose)
+        if pose is not None and pose.get("yaw_ratio") is not None:
+            ratio = pose["yaw_ratio"]
+            self._valid += 1
+            self._min_ratio = min(self._min_ratio, ratio)
+            self._max_ratio = max(self._max_ratio, ratio)
+        
+        if self._passed():
+            self.decision = True
+        elif self.expected_frames is not None:
+            remaining = self.expected_frames - len(self.poses)
+            if self._valid + remaining < settings.liveness_min_valid_frames:
+                self.decision = False
+        return self.decision
+    
+    def _passed(self) -> bool:
+        return (
+            self._valid >= settings.liveness_min_valid_frames
+            and self._max_ratio >= settings.liveness_center_ratio_min
+            and (
+                self._min_ratio < settings.liveness_left_turn_threshold
+                or self._max_ratio > settings.liveness_mirror_threshold
+            )
+        )
+    
+    def result(self) -> Tuple[bool, str, dict]:
+        """
+        Final verdict over the frames seen so far.
+        
+        Returns:
+            Tuple of (is_live: bool, message: str, details: dict), as returned
+            by check_liveness_pose.
+        """
+        poses = self.poses
+        ratios = [pose["yaw_ratio"] if pose is not None else None for pose in poses]
         
+        if self._valid < settings.liveness_min_valid_frames:
+            logger.warning("Insufficient valid frames for liveness detection")
+            return False, "Face not detected clearly. Move slower and ensure good lighting.", {"ratios": ratios, "poses": poses}
+        
+        logger.debug(f"Detected 2D ratios: {[round(r, 2) for r in ratios if r is not None]}")
+        
+        if self._max_ratio < settings.liveness_center_ratio_min:
+            logger.warning("Face not in center position for liveness")
+            return False, "Start by looking straight.", {"ratios": ratios, "poses": poses}
+        
+        min_ratio = self._min_ratio
+        max_ratio = self._max_ratio
+        
+        if self._passed():
+            logger.info(f"Liveness check passed after {len(poses)} frames")
+            return True, "Liveness verified (Center -> Left).", {
+                "min_ratio": min_ratio,
+                "max_ratio": max_ratio,
+                "ratios": ratios,
+                "poses": poses
+            }
+        else:
+            logger.warning(f"Head turn not detected. Range: {round(min_ratio, 2)} to {round(max_ratio, 2)}")
+            return False, f"Head turn LEFT not detected. Range: {round(min_ratio, 2)} to {round(max_ratio, 2)}", {
+                "min_ratio": min_ratio,
+                "max_ratio": max_ratio,
+                "ratios": ratios,
+                "poses": poses
+            }
+
+
+def check_liveness_pose(frames: Iterable[np.ndarray]) -> Tuple[bool, str, dict]:
+    """
+    Validates liveness by checking for center-to-left head movement.
+    
+    Frames are pulled one at a time and FaceMesh stops as soon as the outcome
+    is settled (see LivenessSession), so with a lazy frame iterator the
+    remaining frames are never decoded either. If the iterator has a
+    ``report`` method (FrameSampler), each frame's yaw ratio is passed back
+    so the sampler can look closer where the pose changed or the face was lost.
+    A FaceMesh instance is checked out per frame, only once the frame is
+    decoded, so other requests can use it while the iterator decodes the
+    next one. The liveness_decision stage records the FaceMesh and decision
+    time summed over the analyzed frames, excluding decode.
+    
+    Args:
+        frames: RGB numpy arrays to analyze, as a list or any iterator
+            (e.g. a decode stream).
+        
+    Returns:
+        Tuple of (is_live: bool, message: str, details: dict). details always
+        carries "poses", one record per analyzed frame (None where no face was
+        found), so callers can pick the best frame without running FaceMesh again.
+    """
+    expected_frames = len(frames) if hasattr(frames, "__len__") else None
+    report = getattr(frames, "report", None)
+    session = LivenessSession(expected_frames)
+    
+    wait_for_models("face_mesh")
+    pool = get_face_mesh_pool()
+    analysis_seconds = 0.0
+    for frame in frames:
+        start = time.perf_counter()
+        with pool.checkout() as face_mesh:
+            pose = estimate_head_pose(frame, face_mesh)
+        record_count("frames_analyzed")
+        session.add(pose)
+        analysis_seconds += time.perf_counter() - start
+        if session.done:
+            break
+        if report is not None:
+            report(pose["yaw_ratio"] if pose is not None else None)
+    
+    start = time.perf_counter()
+    result = session.result()
+    observe_stage("liveness_decision", analysis_seconds + time.perf_counter() - start)
+    return result
@@ -0,0 +1,289 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from app.services.admission import get_admission_controller
+from app.services.executor import pending_tasks
+from app.services.jobs import get_job_queue
+from app.services.tracing import record_span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down.
+
+    With ``function``, the value is read from it at render time instead of
+    being set by inc/dec (labels are not supported then).
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float] = None):
+        super().__init__(name, documentation)
+        self._function = function
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.value())}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (count per bucket, the last one being +Inf; [running sum])
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the wall time of the with-block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[1][0] if series else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "face_verify_stage_seconds",
+    "Time spent in each verification stage (face_mesh is per frame, the rest per request).",
+    labelnames=("stage",)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "face_verify_request_seconds",
+    "Total time to answer a verification request."
+))
+OUTCOME_TOTAL = REGISTRY.register(Counter(
+    "face_verify_outcomes_total",
+    "Verification requests by outcome.",
+    labelnames=("outcome",)
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "face_verify_in_flight_requests",
+    "Verification requests currently being processed."
+))
+EXECUTOR_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "face_verify_executor_queue_depth",
+    "Tasks submitted to the pipeline executor that have not finished.",
+    function=pending_tasks
+))
+ADMISSION_ACTIVE = REGISTRY.register(Gauge(
+    "face_verify_admission_active",
+    "Verification requests holding an admission slot.",
+    function=lambda: get_admission_controller().active()
+))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "face_verify_admission_queued",
+    "Verification requests waiting for an admission slot.",
+    function=lambda: get_admission_controller().queued()
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "face_verify_admission_rejected_total",
+    "Verification requests shed by admission control, by reason.",
+    labelnames=("reason",)
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "face_verify_inference_batch_size",
+    "Items per batched inference call, by batcher.",
+    labelnames=("batcher",),
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64)
+))
+BATCH_QUEUE_DELAY = REGISTRY.register(Histogram(
+    "face_verify_inference_batch_queue_delay_seconds",
+    "Time an item waited in a micro-batcher before its batch ran, by batcher.",
+    labelnames=("batcher",)
+))
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "face_verify_job_queue_depth",
+    "Verification jobs waiting for a job worker.",
+    function=lambda: get_job_queue().queued()
+))
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Records the duration of one verification stage, globally and in the request trace."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    record_span(stage, seconds)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Context manager recording the wall time of a verification stage (see observe_stage)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def observe_batch(batcher: str, delays: Sequence[float]) -> None:
+    """Records the size of one inference batch and how long each of its items was queued."""
+    BATCH_SIZE.observe(len(delays), batcher=batcher)
+    for delay in delays:
+        BATCH_QUEUE_DELAY.observe(delay, batcher=batcher)
+
+
+def record_outcome(outcome: str) -> None:
+    """Counts one finished verification request."""
+    OUTCOME_TOTAL.inc(outcome=outcome)
+
+
+def record_shed(reason: str) -> None:
+    """Counts one request shed by admission control (queue_full, wait_budget or queue_timeout)."""
+    ADMISSION_REJECTED.inc(reason=reason)
+
+
+@contextmanager
+def track_request() -> Iterator[None]:
+    """Counts a verification request as in flight and records its total time."""
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start)
+        IN_FLIGHT.dec()
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    return REGISTRY.render()
@@ -0,0 +1,149 @@
+import asyncio
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.executor import run_in_executor
+from app.services.face_matcher import (
+    get_face_embedding, get_profile_embedding, verify_against_template, verify_embeddings, verify_faces
+)
+from app.services.liveness import FRONTAL_TOLERANCE, LivenessSession, estimate_head_pose
+from app.services.metrics import time_stage
+from app.services.tracing import record_count
+from app.services.warmup import wait_for_models
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def analyze_frame(data: bytes) -> Tuple[Optional[np.ndarray], Optional[dict]]:
+    """
+    Decodes one streamed JPEG frame and runs FaceMesh on it.
+
+    Runs on the pipeline executor, so it must stay a module-level function.
+
+    Args:
+        data: Encoded image bytes (JPEG, PNG or WebP), upright.
+
+    Returns:
+        Tuple of (RGB frame, pose record from estimate_head_pose); the frame
+        is None if the bytes are not an image, the pose if no face was found.
+    """
+    with time_stage("frame_decode"):
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None, None
+    frame = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    wait_for_models("face_mesh")
+    return frame, estimate_head_pose(frame)
+
+
+class StreamingVerification:
+    """
+    Liveness and face matching over frames that arrive while the user records.
+
+    Every frame goes through FaceMesh as it arrives and into a
+    LivenessSession, which passes as soon as a center pose and a left turn
+    have been seen. The first frontal frame (yaw ratio within
+    FRONTAL_TOLERANCE of 1.0) is embedded speculatively in the background,
+    and the profile embedding starts when the stream opens, so once the head
+    turn completes only the distance is left to compute.
+
+    Must be created on the event loop. Only the most frontal frame so far
+    and the speculatively embedded frame are kept, not the whole stream.
+    """
+
+    def __init__(self, profile_path: Optional[str] = None, template: Optional[np.ndarray] = None):
+        if (profile_path is None) == (template is None):
+            raise ValueError("Exactly one of profile_path and template is required")
+        self.profile_path = profile_path
+        self.template = template
+        self.frames_received = 0
+        self.liveness = LivenessSession()
+        self._best: Optional[Tuple[np.ndarray, dict]] = None
+        self._embedded: Optional[Tuple[np.ndarray, dict]] = None
+        self._live_task: Optional[asyncio.Task] = None
+        self._profile_task: Optional[asyncio.Task] = None
+        if profile_path is not None:
+            self._profile_task = asyncio.get_running_loop().create_task(
+                run_in_executor(get_profile_embedding, profile_path)
+            )
+
+    @property
+    def done(self) -> bool:
+        """True once liveness has passed and more frames cannot change the verdict."""
+        return self.liveness.done
+
+    async def add_frame(self, data: bytes) -> dict:
+        """
+        Analyzes the next frame of the stream.
+
+        Args:
+            data: Encoded image bytes.
+
+        Returns:
+            Per-frame event: index, whether a face was found, its yaw ratio
+            and the liveness decision so far (None while undecided).
+        """
+        index = self.frames_received
+        self.frames_received += 1
+        frame, pose = await run_in_executor(analyze_frame, data)
+        record_count("frames_analyzed")
+        self.liveness.add(pose)
+
+        if pose is not None:
+            if self._best is None or abs(pose["yaw_ratio"] - 1.0) < abs(self._best[1]["yaw_ratio"] - 1.0):
+                self._best = (frame, pose)
+            if self._live_task is None and abs(pose["yaw_ratio"] - 1.0) < FRONTAL_TOLERANCE:
+                logger.debug(f"Embedding frontal frame {index} speculatively")
+                self._embed(frame, pose)
+
+        return {
+            "type": "frame",
+            "index": index,
+            "decoded": frame is not None,
+            "face": pose is not None,
+            "yaw_ratio": round(pose["yaw_ratio"], 3) if pose is not None else None,
+            "live": self.liveness.decision
+        }
+
+    async def finish(self) -> Tuple[Tuple[bool, str, dict], Optional[dict]]:
+        """
+        Settles the verdict over the frames received so far.
+
+        If no frame was frontal enough to be embedded early, the most frontal
+        one is embedded now.
+
+        Returns:
+            Tuple of (liveness result as from check_liveness_pose, face match
+            result as from verify_faces, or None if liveness failed).
+        """
+        is_live, message, details = self.liveness.result()
+        if not is_live:
+            self.close()
+            return (is_live, message, details), None
+
+        if self._live_task is None:
+            self._embed(*self._best)
+        live_embedding = await self._live_task
+        profile_embedding = await self._profile_task if self._profile_task is not None else [float(x) for x in self.template]
+
+        if live_embedding is not None and profile_embedding is not None:
+            match_result = verify_embeddings(profile_embedding, live_embedding)
+        elif self.template is not None:
+            match_result = await run_in_executor(verify_against_template, self.template, *self._embedded)
+        else:
+            match_result = await run_in_executor(verify_faces, self.profile_path, *self._embedded)
+        return (is_live, message, details), match_result
+
+    def close(self) -> None:
+        """Stops waiting for speculative work that is no longer needed."""
+        for task in (self._live_task, self._profile_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+    def _embed(self, frame: np.ndarray, pose: dict) -> None:
+        self._embedded = (frame, pose)
+        self._live_task = asyncio.get_running_loop().create_task(run_in_executor(get_face_embedding, frame, pose))
@@ -0,0 +1,136 @@
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.embedding_backend import model_tag
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def is_valid_user_id(user_id: str) -> bool:
+    """Checks that a user id is safe to use as a file name."""
+    return bool(user_id) and bool(USER_ID_PATTERN.match(user_id)) and user_id not in (".", "..")
+
+
+class TemplateStore:
+    """
+    Enrolled face templates keyed by user id.
+
+    Templates are held in memory and, if a directory is configured, persisted
+    as one ``<user_id>.npz`` file each so they survive restarts. Each file is
+    tagged with the embedding model tag (model, backend and exported model
+    digest, see model_tag); templates from any other embedding space are not
+    loaded and their users must re-enroll.
+    """
+
+    def __init__(self, storage_dir: Optional[str] = None, model_name: str = None):
+        self.storage_dir = storage_dir
+        self.model_name = model_name or model_tag()
+        self._templates: Dict[str, np.ndarray] = {}
+        self._stale: Set[str] = set()
+        self._lock = threading.Lock()
+
+        if self.storage_dir:
+            os.makedirs(self.storage_dir, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._templates
+
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{user_id}.npz")
+
+    def _load(self) -> None:
+        for filename in sorted(os.listdir(self.storage_dir)):
+            user_id, ext = os.path.splitext(filename)
+            if ext != ".npz" or not is_valid_user_id(user_id):
+                continue
+            try:
+                with np.load(os.path.join(self.storage_dir, filename)) as data:
+                    model_name = str(data["model"])
+                    if model_name != self.model_name:
+                        logger.warning(f"Skipping template for {user_id}: built with {model_name}, re-enrollment required")
+                        self._stale.add(user_id)
+                        continue
+                    self._templates[user_id] = data["embedding"].astype(np.float32)
+            except Exception as e:
+                logger.warning(f"Could not load template {filename}: {e}")
+        logger.info(f"Loaded {len(self._templates)} enrolled templates")
+        if self._stale:
+            logger.warning(f"{len(self._stale)} users must re-enroll for model {self.model_name}")
+
+    def enroll(self, user_id: str, embedding: List[float]) -> None:
+        """
+        Stores (or replaces) the template for a user.
+
+        Args:
+            user_id: Identifier of the enrolled user.
+            embedding: Face embedding computed with the configured model.
+
+        Raises:
+            ValueError: If the user id is not valid.
+        """
+        if not is_valid_user_id(user_id):
+            raise ValueError(f"Invalid user id: {user_id!r}")
+
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self.storage_dir:
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(delete=False, dir=self.storage_dir, suffix=".tmp") as tmp_file:
+                    tmp_path = tmp_file.name
+                    np.savez(tmp_file, embedding=embedding, model=np.array(self.model_name))
+                os.replace(tmp_path, self._path(user_id))
+            finally:
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        with self._lock:
+            self._templates[user_id] = embedding
+            self._stale.discard(user_id)
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        """Returns the template for a user, or None if not enrolled (or enrolled with another model)."""
+        return self._templates.get(user_id)
+
+    def needs_reenrollment(self, user_id: str) -> bool:
+        """True if the user's stored template was built with a different embedding model."""
+        return user_id in self._stale
+
+    def delete(self, user_id: str) -> bool:
+        """
+        Removes a user's template.
+
+        Returns:
+            True if a template was removed, False if the user was not enrolled.
+        """
+        with self._lock:
+            removed = self._templates.pop(user_id, None) is not None
+            if user_id in self._stale:
+                self._stale.discard(user_id)
+                removed = True
+
+        if removed and self.storage_dir and os.path.exists(self._path(user_id)):
+            os.remove(self._path(user_id))
+        return removed
+
+    def user_ids(self) -> List[str]:
+        """Returns the ids of all enrolled users."""
+        return list(self._templates)
+
+
+@lru_cache()
+def get_template_store() -> TemplateStore:
+    return TemplateStore(storage_dir=settings.face_template_dir)
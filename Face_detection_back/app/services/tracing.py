@@ -0,0 +1,90 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """
+    Stage timings and frame counts of one request.
+
+    Spans with the same name (e.g. FaceMesh on every frame) are summed and
+    counted. The trace is shared by reference with the executor threads that
+    run the request's blocking work, so recording is locked.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._spans: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            span = self._spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def add_count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    @property
+    def empty(self) -> bool:
+        with self._lock:
+            return not self._spans and not self._counts
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            Dictionary with total_ms (so far), spans ({name: {ms, count}}) and
+            counts ({name: n}), in the order they were first recorded.
+        """
+        with self._lock:
+            spans = {name: {"ms": round(seconds * 1000, 2), "count": count} for name, (seconds, count) in self._spans.items()}
+            counts = dict(self._counts)
+        return {"total_ms": round(self.elapsed_ms(), 2), "spans": spans, "counts": counts}
+
+    def server_timing(self) -> str:
+        """Formats the trace as a Server-Timing header value."""
+        summary = self.summary()
+        entries = []
+        for name, span in summary["spans"].items():
+            entry = f"{name};dur={span['ms']}"
+            if span["count"] > 1:
+                entry += f';desc="x{span["count"]}"'
+            entries.append(entry)
+        entries.extend(f'{name};desc="{count}"' for name, count in summary["counts"].items())
+        entries.append(f"total;dur={summary['total_ms']}")
+        return ", ".join(entries)
+
+
+def start_trace() -> RequestTrace:
+    """Starts a trace for the current request context and returns it."""
+    trace = RequestTrace()
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Adds a span to the current request's trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(name, seconds)
+
+
+def record_count(name: str, amount: int = 1) -> None:
+    """Adds to a count (e.g. frames decoded) in the current request's trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_count(name, amount)
@@ -0,0 +1,165 @@
+import time
+from typing import BinaryIO, Callable, Optional
+
+import cv2
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from app.config import get_settings
+from app.logger import get_logger
+from app.services.metrics import observe_stage
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class UploadRejected(Exception):
+    """Raised when an upload breaks a size, container or stream limit."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(status_code, message)
+        self.status_code = status_code
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def sniff_video_container(header: bytes) -> Optional[str]:
+    """
+    Identifies a video container from its first bytes.
+
+    Args:
+        header: Leading bytes of the file (at least 12).
+
+    Returns:
+        "mp4" (MP4/MOV/3GP), "matroska" (MKV/WebM), "avi", or None if unknown.
+    """
+    if header[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip"):
+        return "mp4"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"
+    if header[:4] == b"RIFF" and header[8:12] == b"AVI ":
+        return "avi"
+    return None
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """
+    Identifies a still image format from its first bytes.
+
+    Returns:
+        "jpeg", "png", "webp", or None if unknown.
+    """
+    if header[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+async def read_frame_upload(upload: UploadFile) -> bytes:
+    """
+    Reads one uploaded still frame into memory.
+
+    Raises:
+        UploadRejected: 413 if it exceeds UPLOAD_MAX_FRAME_BYTES, 415 if it is
+            not a JPEG, PNG or WebP image.
+    """
+    data = await upload.read(settings.upload_max_frame_bytes + 1)
+    if len(data) > settings.upload_max_frame_bytes:
+        raise UploadRejected(413, f"Frame exceeds the {settings.upload_max_frame_bytes} byte limit")
+    if sniff_image_format(data) is None:
+        raise UploadRejected(415, "Frames must be JPEG, PNG or WebP images")
+    return data
+
+
+def check_video_header(header: bytes) -> None:
+    """
+    Rejects a video upload whose first chunk is not a known container.
+
+    Raises:
+        UploadRejected: 415 if the container is not recognised.
+    """
+    if settings.video_check_container and sniff_video_container(header) is None:
+        raise UploadRejected(415, "Unsupported video container")
+
+
+def check_video_stream(cap: cv2.VideoCapture) -> None:
+    """
+    Rejects an opened video whose codec, resolution or duration is out of bounds.
+
+    Runs on the container metadata only, before any frame is sampled. A
+    missing frame count or frame rate skips the duration check.
+
+    Raises:
+        UploadRejected: 415 for a disallowed codec, 422 for resolution or duration.
+    """
+    allowed = [c.strip().lower() for c in settings.video_allowed_codecs.split(",") if c.strip()]
+    if allowed:
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip("\x00 ").lower()
+        if codec not in allowed:
+            raise UploadRejected(415, f"Unsupported video codec: {codec or 'unknown'}")
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if max(width, height) > settings.video_max_dimension:
+        raise UploadRejected(422, f"Video resolution {width}x{height} exceeds {settings.video_max_dimension}px")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    if fps > 0 and frame_count > 0:
+        duration = frame_count / fps
+        if duration > settings.video_max_duration_seconds:
+            raise UploadRejected(422, f"Video duration {duration:.1f}s exceeds {settings.video_max_duration_seconds}s")
+
+
+async def copy_upload(
+    upload: UploadFile,
+    destination: BinaryIO,
+    max_bytes: int,
+    check_header: Callable[[bytes], None] = None
+) -> int:
+    """
+    Streams an upload into a binary file in fixed-size chunks.
+
+    At most one chunk (UPLOAD_CHUNK_SIZE) is held in memory at a time, and the
+    copy stops as soon as the size limit is crossed. Time spent reading the
+    request body and writing the file is recorded as the upload_read and
+    temp_write stages.
+
+    Args:
+        upload: FastAPI UploadFile to read.
+        destination: Writable binary file object.
+        max_bytes: Maximum accepted upload size.
+        check_header: Optional validator called with the first chunk.
+
+    Returns:
+        Number of bytes written.
+
+    Raises:
+        UploadRejected: 413 if the upload exceeds max_bytes, or whatever check_header raises.
+    """
+    total = 0
+    read_seconds = write_seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            chunk = await upload.read(settings.upload_chunk_size)
+            read_seconds += time.perf_counter() - start
+            if not chunk:
+                break
+            if total == 0 and check_header is not None:
+                check_header(chunk)
+            total += len(chunk)
+            if total > max_bytes:
+                raise UploadRejected(413, f"Upload exceeds the {max_bytes} byte limit")
+            start = time.perf_counter()
+            await run_in_threadpool(destination.write, chunk)
+            write_seconds += time.perf_counter() - start
+        return total
+    finally:
+        observe_stage("upload_read", read_seconds)
+        observe_stage("temp_write", write_seconds)
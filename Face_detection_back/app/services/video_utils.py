@@ -2,10 +2,15 @@ import cv2
 import numpy as np
 import os
 import tempfile
+import time
 from fastapi import UploadFile
-from typing import List
+from typing import Any, Callable, Iterator, List, Optional, Tuple
 from app.config import get_settings
 from app.logger import get_logger
+from app.services.executor import run_in_executor
+from app.services.metrics import observe_stage, time_stage
+from app.services.tracing import record_count
+from app.services.uploads import UploadRejected, check_video_header, check_video_stream, copy_upload, read_frame_upload
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -21,52 +26,484 @@ async def extract_frames_from_video(video_file: UploadFile, num_frames: int = No
         
     Returns:
         List of RGB numpy arrays, or empty list if extraction fails.
+        
+    Raises:
+        UploadRejected: If the upload breaks a size, container or stream limit.
+    """
+    frames, _ = await analyze_video(video_file, None, num_frames)
+    return frames
+
+
+async def analyze_video(
+    video_file: UploadFile,
+    consumer: Callable[[Iterator[np.ndarray]], Any] = None,
+    num_frames: int = None
+) -> Tuple[List[np.ndarray], Any]:
+    """
+    Decodes an uploaded video and streams its sampled frames into a consumer.
+    
+    Frames are decoded lazily, so a consumer that stops iterating early (e.g.
+    the liveness check once its outcome is settled) also stops decoding.
+    The upload is decoded from an anonymous in-memory file when the platform
+    supports it (VIDEO_IN_MEMORY), so no bytes touch the disk. If that is not
+    available or OpenCV cannot read it, the video goes through a temp file.
+    
+    Args:
+        video_file: FastAPI UploadFile object.
+        consumer: Blocking callable taking an iterator of RGB frames. Runs on
+            the pipeline executor, so it must be picklable with the process pool.
+            If not given, every sampled frame is decoded.
+        num_frames: Number of frames to sample. Uses config value if not specified.
+        
+    Returns:
+        Tuple of (frames decoded, consumer result), or ([], None) if extraction fails.
+        
+    Raises:
+        UploadRejected: If the upload breaks a size, container or stream limit.
     """
     if num_frames is None:
         num_frames = settings.video_num_frames
     
     temp_path = None
     try:
+        memory_fd = _create_memory_file()
+        if memory_fd is not None:
+            try:
+                with os.fdopen(memory_fd, "wb", closefd=False) as memory_file:
+                    await _copy_video(video_file, memory_file)
+                frames, result = await run_in_executor(consume_frames, memory_file_path(memory_fd), num_frames, consumer)
+            finally:
+                os.close(memory_fd)
+            if frames:
+                logger.info(f"Decoded {len(frames)} frames from video (in memory)")
+                return frames, result
+            logger.warning("In-memory decode returned no frames, retrying from a temp file")
+            await video_file.seek(0)
+
         with tempfile.NamedTemporaryFile(delete=False, suffix=settings.video_temp_suffix) as temp_file:
             temp_path = temp_file.name
-            contents = await video_file.read()
-            temp_file.write(contents)
-        
-        cap = cv2.VideoCapture(temp_path)
-        
-        if not cap.isOpened():
-            logger.error("Could not open video file")
-            return []
-
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames <= 0:
-            logger.error("Video has no frames or is unreadable")
-            return []
-
-        frames = []
-        indices = np.linspace(0, total_frames - 2, num_frames, dtype=int)
+            await _copy_video(video_file, temp_file)
         
-        for i in indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
-            if ret:
-                h, w = frame.shape[:2]
-                if w > h:
-                    frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frames.append(frame_rgb)
+        frames, result = await run_in_executor(consume_frames, temp_path, num_frames, consumer)
         
-        logger.info(f"Extracted {len(frames)} frames from video")
-        cap.release()
-        return frames
+        logger.info(f"Decoded {len(frames)} frames from video")
+        return frames, result
 
+    except UploadRejected as e:
+        logger.warning(f"Video upload rejected: {e}")
+        raise
     except Exception as e:
         logger.error(f"Error processing video: {e}")
-        return []
+        return [], None
     finally:
         if temp_path and os.path.exists(temp_path):
             try:
                 os.remove(temp_path)
             except Exception as e:
                 logger.warning(f"Could not delete temp file: {e}")
+
+
+async def analyze_frame_uploads(
+    images: List[UploadFile],
+    consumer: Callable[[Iterator[np.ndarray]], Any] = None
+) -> Tuple[List[np.ndarray], Any]:
+    """
+    Decodes uploaded still frames and streams them into a consumer.
+    
+    The alternative to analyze_video for clients that capture frames
+    themselves: there is no temp file, container demux or video decode, only
+    one image decode per frame, with the same upright rotation and RGB
+    conversion as video frames. Frames are decoded lazily in upload order,
+    so a consumer that stops early also stops decoding.
+    
+    Args:
+        images: Uploaded JPEG, PNG or WebP frames, in capture order.
+        consumer: Blocking callable taking an iterator of RGB frames; runs on
+            the pipeline executor. If not given, every frame is decoded.
+        
+    Returns:
+        Tuple of (frames decoded, consumer result).
+        
+    Raises:
+        UploadRejected: If there are more than UPLOAD_MAX_FRAMES frames, or one
+            is too large, not an image, or cannot be decoded.
+    """
+    if len(images) > settings.upload_max_frames:
+        raise UploadRejected(413, f"At most {settings.upload_max_frames} frames are accepted")
+    
+    with time_stage("upload_read"):
+        data = [await read_frame_upload(image) for image in images]
+    
+    frames, result = await run_in_executor(consume_images, data, consumer)
+    logger.info(f"Decoded {len(frames)} of {len(data)} uploaded frames")
+    return frames, result
+
+
+def consume_images(
+    images: List[bytes],
+    consumer: Callable[[Iterator[np.ndarray]], Any] = None
+) -> Tuple[List[np.ndarray], Any]:
+    """
+    Feeds encoded still frames to a consumer as they are decoded.
+    
+    Blocking; analyze_frame_uploads runs it on the pipeline executor. Decode
+    time is recorded as the frame_decode stage.
+    
+    Returns:
+        Tuple of (frames the consumer pulled, consumer result).
+        
+    Raises:
+        UploadRejected: 422 if a frame cannot be decoded.
+    """
+    frames: List[np.ndarray] = []
+    decode_seconds = 0.0
+    
+    def decoded() -> Iterator[np.ndarray]:
+        nonlocal decode_seconds
+        for i, data in enumerate(images):
+            start = time.perf_counter()
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise UploadRejected(422, f"Frame {i} could not be decoded")
+            frame = _to_upright_rgb(image)
+            decode_seconds += time.perf_counter() - start
+            frames.append(frame)
+            yield frame
+    
+    try:
+        if consumer is None:
+            return list(decoded()), None
+        return frames, consumer(decoded())
+    finally:
+        observe_stage("frame_decode", decode_seconds)
+        record_count("frames_decoded", len(frames))
+
+
+def _create_memory_file() -> Optional[int]:
+    """Returns the descriptor of a new anonymous RAM-backed file, or None if unsupported."""
+    if not settings.video_in_memory or not hasattr(os, "memfd_create"):
+        return None
+    try:
+        return os.memfd_create("video-upload")
+    except OSError as e:
+        logger.warning(f"memfd_create failed, using temp files: {e}")
+        return None
+
+
+def memory_file_path(fd: int) -> str:
+    """
+    Path under which OpenCV can open an in-memory file.
+    
+    Uses the owning process id rather than /proc/self so the path stays
+    valid inside process-pool workers.
+    """
+    return f"/proc/{os.getpid()}/fd/{fd}"
+
+
+async def _copy_video(video_file: UploadFile, destination) -> None:
+    await copy_upload(video_file, destination, settings.upload_max_video_bytes, check_header=check_video_header)
+
+
+def consume_frames(
+    video_path: str,
+    num_frames: int,
+    consumer: Callable[[Iterator[np.ndarray]], Any] = None
+) -> Tuple[List[np.ndarray], Any]:
+    """
+    Feeds the frames of a video file to a consumer as they are decoded.
+    
+    Blocking; analyze_video runs it on the pipeline executor. The consumer
+    receives a FrameSampler; if it reports what it saw in each frame (see
+    FrameSampler.report), ambiguous videos are sampled more densely, up to
+    VIDEO_MAX_FRAMES. The decoder is closed as soon as the consumer returns,
+    whether or not it read every frame.
+    
+    Args:
+        video_path: Path to the video file.
+        num_frames: Number of frames in the first, evenly spaced pass.
+        consumer: Callable taking an iterator of RGB frames. If not given,
+            every frame of the first pass is decoded.
+        
+    Returns:
+        Tuple of (frames the consumer pulled, in the order it pulled them,
+        consumer result).
+    """
+    if consumer is None:
+        return read_frames(video_path, num_frames), None
+    
+    sampler = FrameSampler(video_path, num_frames, max_frames=settings.video_max_frames)
+    try:
+        return sampler.frames, consumer(sampler)
+    finally:
+        sampler.close()
+
+
+def read_frames(video_path: str, num_frames: int) -> List[np.ndarray]:
+    """
+    Decodes evenly spaced frames from a video file.
+    
+    Args:
+        video_path: Path to the video file.
+        num_frames: Number of frames to extract.
+        
+    Returns:
+        List of RGB numpy arrays, or empty list if the video is unreadable.
+        
+    Raises:
+        UploadRejected: If the stream's codec, resolution or duration is out of bounds.
+    """
+    return list(iter_frames(video_path, num_frames))
+
+
+def iter_frames(video_path: str, num_frames: int) -> Iterator[np.ndarray]:
+    """
+    Lazily decodes evenly spaced frames from a video file, in timeline order.
+    
+    Closing the generator releases the decoder.
+    
+    Args:
+        video_path: Path to the video file.
+        num_frames: Number of frames to sample.
+        
+    Yields:
+        RGB numpy arrays.
+        
+    Raises:
+        UploadRejected: If the stream's codec, resolution or duration is out of bounds.
+    """
+    sampler = FrameSampler(video_path, num_frames)
+    try:
+        yield from sampler
+    finally:
+        sampler.close()
+
+
+class FrameSampler:
+    """
+    Coarse-to-fine frame sampler over a video file.
+    
+    Iterating first yields ``num_frames`` evenly spaced frames in timeline
+    order. The first pass is read in one forward pass unless the samples are
+    far enough apart that seeking is cheaper (see choose_read_strategy). When
+    the container's frame count is missing, or the stream ends before it,
+    the remaining frames are sampled while decoding instead.
+    
+    If the caller reports a yaw ratio (or None for no face) for every frame
+    it pulled, further rounds sample the midpoints of the gaps where the
+    ratio changed the most or the face was lost, VIDEO_REFINE_FRAMES at a
+    time, until ``max_frames`` frames were decoded or no gap qualifies.
+    Clean videos therefore cost no more than the first pass, and ambiguous
+    ones get a closer look instead of a retry.
+    """
+    
+    def __init__(self, video_path: str, num_frames: int, max_frames: int = None):
+        self.video_path = video_path
+        self.num_frames = num_frames
+        self.max_frames = max(num_frames, max_frames or 0)
+        self.frames: List[np.ndarray] = []
+        self.indices: List[int] = []
+        self._reports: List[Optional[float]] = []
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._position = 0
+        self._refinable = False
+        self._stream: Optional[Iterator[np.ndarray]] = None
+        self.decode_seconds = 0.0
+        self._closed = False
+    
+    def report(self, yaw_ratio: Optional[float]) -> None:
+        """Records what the caller saw in the next frame it pulled (None = no face)."""
+        self._reports.append(yaw_ratio)
+    
+    def close(self) -> None:
+        """Stops sampling, releases the decoder and records the video_decode stage."""
+        if not self._closed:
+            self._closed = True
+            observe_stage("video_decode", self.decode_seconds)
+            record_count("frames_decoded", len(self.frames))
+        if self._stream is not None:
+            self._stream.close()
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+    
+    def __iter__(self) -> "FrameSampler":
+        return self
+    
+    def __next__(self) -> np.ndarray:
+        if self._stream is None:
+            self._stream = self._sample()
+        start = time.perf_counter()
+        try:
+            return next(self._stream)
+        finally:
+            self.decode_seconds += time.perf_counter() - start
+    
+    def _sample(self) -> Iterator[np.ndarray]:
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            logger.error("Could not open video file")
+            return
+        self._cap = cap
+        
+        check_video_stream(self._cap)
+        total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        if total_frames > 0:
+            indices = np.linspace(0, max(total_frames - 2, 0), self.num_frames, dtype=int)
+            yield from self._read(indices)
+            if len(self.frames) < self.num_frames:
+                logger.warning(f"Stream ended before reported {total_frames} frames, resampling")
+                # Seeking back after EOF is unreliable across backends; reopen instead.
+                self._cap.release()
+                self._cap = cv2.VideoCapture(self.video_path)
+            else:
+                self._refinable = True
+        else:
+            logger.warning("Frame count unavailable, sampling while decoding")
+        
+        if len(self.frames) < self.num_frames and self._cap.isOpened():
+            start = self.indices[-1] + 1 if self.indices else 0
+            for index, frame in _read_unknown_length(self._cap, self.num_frames - len(self.frames), start=start):
+                yield self._record(index, frame)
+        
+        if not self.frames:
+            logger.error("Video has no frames or is unreadable")
+            return
+        
+        while self._refinable and len(self.frames) < self.max_frames:
+            indices = self._refinement_indices()
+            if not indices:
+                break
+            logger.debug(f"Refining frame sampling at {indices}")
+            yield from self._read(np.array(indices))
+    
+    def _record(self, index: int, frame: np.ndarray) -> np.ndarray:
+        rgb = _to_upright_rgb(frame)
+        self.indices.append(int(index))
+        self.frames.append(rgb)
+        self._position = int(index) + 1
+        return rgb
+    
+    def _read(self, indices: np.ndarray) -> Iterator[np.ndarray]:
+        if indices[0] < self._position or choose_read_strategy(indices, self._position) == "seek":
+            reader = _read_by_seeking(self._cap, indices)
+        else:
+            reader = _read_sequentially(self._cap, indices, start=self._position)
+        for index, frame in reader:
+            yield self._record(index, frame)
+    
+    def _refinement_indices(self) -> List[int]:
+        """Midpoints of the gaps with the largest yaw change or a lost face."""
+        if len(self._reports) < len(self.frames):
+            return []
+        
+        timeline = sorted(zip(self.indices, self._reports))
+        gaps = []
+        for (start, a), (end, b) in zip(timeline, timeline[1:]):
+            if end - start < 2:
+                continue
+            if a is None or b is None:
+                score = float("inf")
+            else:
+                score = abs(a - b)
+            if score >= settings.video_refine_min_change:
+                gaps.append((score, start, end))
+        
+        budget = min(settings.video_refine_frames, self.max_frames - len(self.frames))
+        gaps.sort(key=lambda gap: (-gap[0], gap[1]))
+        return sorted((start + end) // 2 for _, start, end in gaps[:budget])
+
+
+def choose_read_strategy(indices: np.ndarray, position: int = 0) -> str:
+    """
+    Decides between seeking to each index and decoding the stream forward.
+    
+    Every seek lands on the previous keyframe and re-decodes forward, so
+    seeking only pays off when samples are further apart than a few GOPs.
+    
+    Args:
+        indices: Sorted frame indices to sample.
+        position: Index of the next frame the decoder would return.
+        
+    Returns:
+        "seek" or "sequential".
+    """
+    gaps = np.diff(np.concatenate(([position], indices)))
+    if position == 0:
+        gaps = gaps[1:]
+    if len(gaps) == 0:
+        return "sequential"
+    return "seek" if int(np.max(gaps)) > settings.video_seek_min_gap else "sequential"
+
+
+def _read_by_seeking(cap: cv2.VideoCapture, indices: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    for i in indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(i))
+        ret, frame = cap.read()
+        if ret:
+            yield int(i), frame
+
+
+def _read_sequentially(cap: cv2.VideoCapture, indices: np.ndarray, start: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+    """Walks the stream forward from ``start``: grab() skips frames, read() only the wanted ones."""
+    position = start
+    last = None
+    
+    for target in indices:
+        if last is not None and target < position:
+            yield int(target), last
+            continue
+        while position < target:
+            if not cap.grab():
+                return
+            position += 1
+        ret, frame = cap.read()
+        if not ret:
+            return
+        last = frame
+        yield int(target), frame
+        position += 1
+
+
+def _read_unknown_length(cap: cv2.VideoCapture, num_frames: int, start: int = 0) -> List[Tuple[int, np.ndarray]]:
+    """
+    Samples evenly across a stream of unknown length in a single pass.
+    
+    Skips the first ``start`` frames, then keeps at most 2 * num_frames
+    decoded frames: whenever the buffer fills, every other frame is dropped
+    and the sampling stride doubles.
+    
+    Returns:
+        List of (frame index, frame) pairs in timeline order.
+    """
+    for _ in range(start):
+        if not cap.grab():
+            return []
+    
+    kept: List[Tuple[int, np.ndarray]] = []
+    stride = 1
+    
+    for offset in range(settings.video_max_scan_frames):
+        if offset % stride:
+            if not cap.grab():
+                break
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        kept.append((start + offset, frame))
+        if len(kept) >= 2 * num_frames:
+            kept = kept[::2]
+            stride *= 2
+    
+    if len(kept) <= num_frames:
+        return kept
+    picks = np.linspace(0, len(kept) - 1, num_frames, dtype=int)
+    return [kept[i] for i in picks]
+
+
+def _to_upright_rgb(frame: np.ndarray) -> np.ndarray:
+    h, w = frame.shape[:2]
+    if w > h:
+        frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
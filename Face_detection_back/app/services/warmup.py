@@ -0,0 +1,120 @@
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from app.config import get_settings
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelWarmup:
+    """
+    Loads models in background threads and lets requests wait for them.
+
+    Each registered loader builds its model and runs one dummy inference, so
+    the first real request does not pay for graph tracing or weight loading.
+    A caller that needs a model while it is still loading blocks until it
+    is ready; if the model was never scheduled (or failed), the caller gets
+    no wait and falls back to loading it lazily as before.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], None]] = {}
+        self._states: Dict[str, str] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], None]) -> None:
+        """Adds a model loader; it runs on the next start()."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._states[name] = PENDING
+            self._events[name] = threading.Event()
+
+    def start(self) -> None:
+        """Starts loading every pending or failed model in its own thread."""
+        with self._lock:
+            names = [name for name, state in self._states.items() if state in (PENDING, FAILED)]
+            for name in names:
+                self._states[name] = LOADING
+                self._events[name].clear()
+        for name in names:
+            threading.Thread(target=self._load, args=(name,), name=f"warmup-{name}", daemon=True).start()
+
+    def _load(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            self._loaders[name]()
+            state, error = READY, None
+            logger.info(f"Model {name} ready in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            state, error = FAILED, str(e)
+            logger.error(f"Model {name} failed to load: {e}")
+        with self._lock:
+            self._states[name] = state
+            self._seconds[name] = round(time.perf_counter() - start, 3)
+            if error:
+                self._errors[name] = error
+            else:
+                self._errors.pop(name, None)
+            self._events[name].set()
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> None:
+        """
+        Blocks while the named model is loading.
+
+        Raises:
+            TimeoutError: If the model is still loading after ``timeout`` seconds.
+        """
+        with self._lock:
+            if self._states.get(name) != LOADING:
+                return
+            event = self._events[name]
+        if not event.wait(timeout):
+            raise TimeoutError(f"Model {name} still loading after {timeout}s")
+
+    def is_ready(self) -> bool:
+        """True once every registered model has loaded."""
+        with self._lock:
+            return all(state == READY for state in self._states.values())
+
+    def status(self) -> dict:
+        """Returns per-model state, load time in seconds and last error."""
+        with self._lock:
+            return {
+                name: {
+                    "state": state,
+                    "seconds": self._seconds.get(name),
+                    "error": self._errors.get(name)
+                }
+                for name, state in self._states.items()
+            }
+
+
+@lru_cache()
+def get_model_warmup() -> ModelWarmup:
+    from app.services.face_matcher import warm_up_detector, warm_up_embedding
+    from app.services.face_mesh_pool import warm_up_face_mesh
+
+    warmup = ModelWarmup()
+    warmup.register("face_embedding", warm_up_embedding)
+    warmup.register("face_detector", warm_up_detector)
+    warmup.register("face_mesh", warm_up_face_mesh)
+    return warmup
+
+
+def wait_for_models(*names: str) -> None:
+    """Blocks until the named models are no longer loading (see ModelWarmup.wait)."""
+    warmup = get_model_warmup()
+    for name in names:
+        warmup.wait(name, settings.model_warmup_timeout)
@@ -18,6 +18,7 @@ deepface_class_mock.verify.return_value = {
 deepface_mock.DeepFace = deepface_class_mock
 sys.modules["deepface"] = deepface_mock
 sys.modules["deepface.DeepFace"] = deepface_class_mock
+sys.modules["deepface.modules"] = deepface_mock.modules
 
 # 2. Mock TensorFlow and Keras
 mock_tf = MagicMock()
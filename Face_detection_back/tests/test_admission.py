@@ -0,0 +1,112 @@
+"""Tests for admission control."""
+import asyncio
+
+import pytest
+
+from app.services.admission import (
+    QUEUE_FULL, QUEUE_TIMEOUT, WAIT_BUDGET, AdmissionController, Overloaded
+)
+
+
+class TestAdmissionController:
+    """Test slots, the wait queue and load shedding."""
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_limit(self):
+        """Test that free slots are taken without waiting."""
+        controller = AdmissionController(max_concurrent=2, max_queued=4, max_wait=5)
+
+        assert await controller.acquire() == 0.0
+        assert await controller.acquire() == 0.0
+        assert controller.active() == 2
+
+        controller.release(0.1)
+        controller.release(0.1)
+        assert controller.active() == 0
+        assert controller.stats()["admitted"] == 2
+
+    @pytest.mark.asyncio
+    async def test_waiters_admitted_in_order(self):
+        """Test that a released slot goes to the oldest waiter."""
+        controller = AdmissionController(max_concurrent=1, max_queued=4, max_wait=5)
+        await controller.acquire()
+        order = []
+
+        async def request(name):
+            await controller.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(request(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        assert controller.queued() == 2
+
+        controller.release(0.01)
+        await asyncio.sleep(0)
+        controller.release(0.01)
+        await asyncio.gather(*tasks)
+
+        assert order == ["a", "b"]
+        assert controller.active() == 1
+        assert controller.queued() == 0
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_queue_full(self):
+        """Test that requests beyond the queue bound are refused at once."""
+        controller = AdmissionController(max_concurrent=1, max_queued=1, max_wait=5)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Overloaded) as exc:
+            await controller.acquire()
+
+        assert exc.value.reason == QUEUE_FULL
+        assert exc.value.retry_after >= 1
+        controller.release()
+        await waiting
+
+    @pytest.mark.asyncio
+    async def test_sheds_over_wait_budget(self):
+        """Test that a request is refused when its estimated wait exceeds the budget."""
+        controller = AdmissionController(max_concurrent=1, max_queued=10, max_wait=1.0)
+        await controller.acquire()
+        controller.release(3.0)
+        await controller.acquire()
+
+        assert controller.estimated_wait() == pytest.approx(3.0)
+        with pytest.raises(Overloaded) as exc:
+            controller.check()
+
+        assert exc.value.reason == WAIT_BUDGET
+        assert exc.value.retry_after == 3
+        assert controller.stats()["rejected"][WAIT_BUDGET] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test that a request waiting longer than the budget is shed and leaves the queue."""
+        controller = AdmissionController(max_concurrent=1, max_queued=4, max_wait=0.05)
+        await controller.acquire()
+
+        with pytest.raises(Overloaded) as exc:
+            await controller.acquire()
+
+        assert exc.value.reason == QUEUE_TIMEOUT
+        assert controller.queued() == 0
+        controller.release()
+        assert controller.active() == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a client disconnecting while queued does not keep a place or a slot."""
+        controller = AdmissionController(max_concurrent=1, max_queued=4, max_wait=5)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert controller.queued() == 0
+        controller.release()
+        assert controller.active() == 0
@@ -0,0 +1,208 @@
+"""Unit tests for the approximate nearest neighbour index."""
+import threading
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services import ann_index
+from app.services.ann_index import IVFIndex, build_gallery, train_centroids
+from app.services.gallery import EmbeddingGallery
+
+
+def make_embeddings(count, dim=32, clusters=16, seed=0):
+    """Clustered random embeddings, loosely shaped like face templates."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(count, dim))
+    return [f"user{i}" for i in range(count)], vectors.astype(np.float32)
+
+
+class TestTrainCentroids:
+    """Test cases for coarse quantizer training."""
+
+    def test_centroids_normalized(self):
+        """Test that trained centroids have unit norm."""
+        _, vectors = make_embeddings(200)
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        centroids = train_centroids(unit, nlist=8, iterations=5)
+        
+        assert centroids.shape == (8, 32)
+        assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+    def test_nlist_capped_by_sample_size(self):
+        """Test that there are never more centroids than vectors."""
+        _, vectors = make_embeddings(5)
+        
+        assert train_centroids(vectors, nlist=50).shape[0] == 5
+
+
+class TestIVFIndex:
+    """Test cases for IVFIndex."""
+
+    def test_untrained_index_is_exact(self):
+        """Test that small galleries use brute-force search."""
+        ids, vectors = make_embeddings(50)
+        index = IVFIndex(min_train_size=1000)
+        index.extend(ids, vectors)
+        exact = EmbeddingGallery()
+        exact.extend(ids, vectors)
+        
+        assert not index.is_trained
+        assert index.search(vectors[3], top_k=5, metric="cosine") == exact.search(vectors[3], top_k=5, metric="cosine")
+
+    def test_full_probe_matches_brute_force(self):
+        """Test that probing every list returns the exact result."""
+        ids, vectors = make_embeddings(500)
+        index = IVFIndex(nlist=10, nprobe=10, rerank_k=500, min_train_size=100)
+        index.extend(ids, vectors)
+        exact = EmbeddingGallery()
+        exact.extend(ids, vectors)
+        
+        query = vectors[7] + 0.01
+        approx = index.search(query, top_k=5, metric="cosine")
+        expected = exact.search(query, top_k=5, metric="cosine")
+        
+        assert index.is_trained
+        assert [user_id for user_id, _ in approx] == [user_id for user_id, _ in expected]
+        assert np.allclose([d for _, d in approx], [d for _, d in expected], atol=1e-5)
+
+    def test_recall_with_partial_probe(self):
+        """Test that a small nprobe still finds the true nearest neighbour."""
+        ids, vectors = make_embeddings(2000)
+        index = IVFIndex(nlist=32, nprobe=4, rerank_k=50, min_train_size=100)
+        index.extend(ids, vectors)
+        
+        hits = sum(index.search(vectors[i], top_k=1, metric="cosine")[0][0] == ids[i] for i in range(0, 2000, 20))
+        
+        assert hits / 100 >= 0.95
+
+    def test_distances_are_exact_after_rerank(self):
+        """Test that returned distances use the configured metric on float32 vectors."""
+        ids, vectors = make_embeddings(300)
+        index = IVFIndex(nlist=8, nprobe=2, min_train_size=100)
+        index.extend(ids, vectors)
+        
+        user_id, distance = index.search(vectors[0], top_k=1, metric="euclidean")[0]
+        
+        assert user_id == "user0"
+        assert distance == pytest.approx(0.0, abs=1e-4)
+
+    def test_incremental_add_and_remove(self):
+        """Test inserts and deletes after training."""
+        ids, vectors = make_embeddings(300)
+        index = IVFIndex(nlist=8, nprobe=8, min_train_size=100)
+        index.extend(ids, vectors)
+        
+        new_vector = vectors[0] * -1
+        index.add("newcomer", new_vector)
+        assert index.search(new_vector, top_k=1, metric="cosine")[0][0] == "newcomer"
+        
+        assert index.remove("newcomer") is True
+        assert index.remove("newcomer") is False
+        assert "newcomer" not in index
+        assert index.search(new_vector, top_k=1, metric="cosine")[0][0] != "newcomer"
+
+    def test_trains_once_gallery_is_large_enough(self):
+        """Test that the index trains itself at min_train_size."""
+        ids, vectors = make_embeddings(20)
+        index = IVFIndex(nlist=4, min_train_size=20)
+        for user_id, vector in zip(ids[:19], vectors[:19]):
+            index.add(user_id, vector)
+        assert not index.is_trained
+        
+        index.add(ids[19], vectors[19])
+        
+        assert index.is_trained
+
+    def test_persistence_round_trip(self, tmp_path):
+        """Test that a saved index reloads with the same centroids."""
+        path = str(tmp_path / "index" / "ivf.npz")
+        ids, vectors = make_embeddings(400)
+        index = IVFIndex(nlist=8, nprobe=2, min_train_size=100, index_path=path, model_name="Facenet512")
+        index.extend(ids, vectors)
+        
+        reloaded = IVFIndex(nlist=8, nprobe=2, min_train_size=100, index_path=path, model_name="Facenet512")
+        assert reloaded.load() is True
+        reloaded.extend(ids[:-1], vectors[:-1])
+        
+        assert np.allclose(reloaded._centroids, index._centroids)
+        assert len(reloaded) == 399
+        assert reloaded.search(vectors[5], top_k=3, metric="cosine") == index.search(vectors[5], top_k=3, metric="cosine")
+
+    def test_index_from_other_model_ignored(self, tmp_path):
+        """Test that an index built for another model is not loaded."""
+        path = str(tmp_path / "ivf.npz")
+        ids, vectors = make_embeddings(200)
+        IVFIndex(nlist=4, min_train_size=100, index_path=path, model_name="ArcFace").extend(ids, vectors)
+        
+        assert IVFIndex(index_path=path, model_name="Facenet512").load() is False
+
+    def test_default_tag_is_model_tag(self):
+        """Test that the persisted index is tagged with the embedding model tag by default."""
+        with patch('app.services.ann_index.model_tag', return_value="Facenet512@onnx:abc"):
+            assert IVFIndex().model_name == "Facenet512@onnx:abc"
+
+
+class TestBackgroundTraining:
+    """Test cases for retraining off the request path."""
+
+    def test_add_does_not_wait_for_training(self):
+        """Test that the insert reaching min_train_size returns before k-means finishes."""
+        ids, vectors = make_embeddings(30)
+        index = IVFIndex(nlist=4, nprobe=4, min_train_size=20, background_training=True)
+        for user_id, vector in zip(ids[:19], vectors[:19]):
+            index.add(user_id, vector)
+        
+        release = threading.Event()
+        original = ann_index.train_centroids
+        def slow_train(*args, **kwargs):
+            release.wait(5)
+            return original(*args, **kwargs)
+        
+        with patch('app.services.ann_index.train_centroids', side_effect=slow_train):
+            index.add(ids[19], vectors[19])
+            assert not index.is_trained
+            for user_id, vector in zip(ids[20:], vectors[20:]):
+                index.add(user_id, vector)
+            index.remove(ids[0])
+            release.set()
+            index.wait_for_training(5)
+        
+        assert index.is_trained
+        assert len(index) == 29
+        assert ids[0] not in index._assignments
+        assert index.search(vectors[25], top_k=1, metric="cosine")[0][0] == ids[25]
+
+    def test_configured_ivf_trains_in_background(self):
+        """Test that the configured gallery retrains in the background."""
+        ids, vectors = make_embeddings(10)
+        
+        assert build_gallery("ivf", ids, vectors).background_training is True
+
+
+class TestBuildGallery:
+    """Test cases for backend selection."""
+
+    def test_exact_backend(self):
+        """Test building the brute-force gallery."""
+        ids, vectors = make_embeddings(10)
+        
+        gallery = build_gallery("exact", ids, vectors)
+        
+        assert isinstance(gallery, EmbeddingGallery)
+        assert len(gallery) == 10
+
+    def test_ivf_backend(self):
+        """Test building the ANN index."""
+        ids, vectors = make_embeddings(10)
+        
+        gallery = build_gallery("ivf", ids, vectors)
+        
+        assert isinstance(gallery, IVFIndex)
+        assert len(gallery) == 10
+
+    def test_unknown_backend(self):
+        """Test that unknown backends are rejected."""
+        with pytest.raises(ValueError):
+            build_gallery("hnsw", [], np.empty((0, 2)))
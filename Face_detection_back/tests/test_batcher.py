@@ -0,0 +1,173 @@
+"""Unit tests for the inference micro-batcher."""
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from app.services.batcher import MicroBatcher, _Request
+from app.services.metrics import BATCH_QUEUE_DELAY, BATCH_SIZE, render_metrics
+
+
+def _double(items):
+    return [2 * x for x in items]
+
+
+class TestMicroBatcher:
+    """Test cases for MicroBatcher."""
+
+    def test_single_item_returns_own_output(self):
+        """Test that a lone item is dispatched after the wait expires."""
+        batcher = MicroBatcher(_double, max_batch_size=4, max_wait_ms=1, name="single")
+        before = BATCH_SIZE.count(batcher="single")
+        try:
+            assert batcher.infer(21, timeout=2) == 42
+            assert BATCH_SIZE.count(batcher="single") == before + 1
+        finally:
+            batcher.close()
+
+    def test_concurrent_items_share_one_batch(self):
+        """Test that items queued together run in one call and get their own outputs."""
+        calls = []
+
+        def record(items):
+            calls.append(list(items))
+            return _double(items)
+
+        batcher = MicroBatcher(record, max_batch_size=4, max_wait_ms=500)
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda x: batcher.infer(x, timeout=2), [1, 2, 3, 4]))
+
+            assert results == [2, 4, 6, 8]
+            assert len(calls) == 1
+            assert sorted(calls[0]) == [1, 2, 3, 4]
+        finally:
+            batcher.close()
+
+    def test_batch_size_capped(self):
+        """Test that batches never exceed max_batch_size."""
+        sizes = []
+        gate = threading.Event()
+
+        def slow(items):
+            gate.wait(2)
+            sizes.append(len(items))
+            return _double(items)
+
+        batcher = MicroBatcher(slow, max_batch_size=2, max_wait_ms=0)
+        try:
+            futures = [batcher.submit(x) for x in range(5)]
+            gate.set()
+
+            assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6, 8]
+            assert max(sizes) <= 2
+            assert sum(sizes) == 5
+        finally:
+            batcher.close()
+
+    def test_batch_closes_after_max_wait(self):
+        """Test that a partial batch is dispatched once the oldest item has waited long enough."""
+        batcher = MicroBatcher(_double, max_batch_size=8, max_wait_ms=50, name="max_wait")
+        before = BATCH_QUEUE_DELAY.sum(batcher="max_wait")
+        try:
+            start = time.perf_counter()
+            batcher.infer(1, timeout=2)
+            elapsed = time.perf_counter() - start
+
+            assert 0.04 <= elapsed < 1.0
+            assert BATCH_QUEUE_DELAY.sum(batcher="max_wait") - before >= 0.04
+        finally:
+            batcher.close()
+
+    def test_exception_reaches_every_caller(self):
+        """Test that a failing batch fails each waiting future."""
+        def fail(items):
+            raise RuntimeError("model error")
+
+        batcher = MicroBatcher(fail, max_batch_size=2, max_wait_ms=100)
+        try:
+            futures = [batcher.submit(x) for x in range(2)]
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result(timeout=2)
+        finally:
+            batcher.close()
+
+    def test_output_count_mismatch_rejected(self):
+        """Test that a batch function dropping outputs is reported as an error."""
+        batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=1, max_wait_ms=0)
+        try:
+            with pytest.raises(RuntimeError):
+                batcher.infer(1, timeout=2)
+        finally:
+            batcher.close()
+
+    def test_stats(self):
+        """Test that batch size and queue delay are exported on /metrics and summarized by stats()."""
+        batcher = MicroBatcher(_double, max_batch_size=4, max_wait_ms=0, name="stats")
+        try:
+            for x in range(3):
+                batcher.infer(x, timeout=2)
+            stats = batcher.stats()
+
+            assert stats["batches"] == 3
+            assert stats["items"] == 3
+            assert stats["avg_batch_size"] == 1.0
+            assert stats["avg_queue_delay_ms"] >= 0.0
+            body = render_metrics()
+            assert 'face_verify_inference_batch_size_bucket{batcher="stats",le="1"} 3' in body
+            assert 'face_verify_inference_batch_queue_delay_seconds_count{batcher="stats"} 3' in body
+        finally:
+            batcher.close()
+
+    def test_closed_batcher_rejects_items(self):
+        """Test that submitting after close raises."""
+        batcher = MicroBatcher(_double)
+        batcher.close()
+
+        with pytest.raises(RuntimeError):
+            batcher.submit(1)
+
+    def test_close_runs_queued_items_and_rejects_new_ones(self):
+        """Test that close finishes queued items while refusing new ones."""
+        gate = threading.Event()
+
+        def slow(items):
+            gate.wait(2)
+            return _double(items)
+
+        batcher = MicroBatcher(slow, max_batch_size=1, max_wait_ms=0)
+        futures = [batcher.submit(x) for x in range(3)]
+        closer = threading.Thread(target=batcher.close)
+        closer.start()
+        while not batcher._closed:
+            time.sleep(0.001)
+
+        with pytest.raises(RuntimeError):
+            batcher.infer(9, timeout=1)
+        gate.set()
+        closer.join(2)
+
+        assert [f.result(timeout=2) for f in futures] == [0, 2, 4]
+
+    def test_stranded_items_are_failed(self):
+        """Test that items still queued once the worker has stopped get an error."""
+        batcher = MicroBatcher(_double)
+        batcher.close()
+        stranded = _Request(1)
+        batcher._queue.put(stranded)
+
+        batcher._fail_queued()
+
+        with pytest.raises(RuntimeError):
+            stranded.future.result(timeout=1)
+
+    def test_infer_timeout_bounds_wait(self):
+        """Test that a caller stops waiting after its timeout when the batch is stuck."""
+        gate = threading.Event()
+        batcher = MicroBatcher(lambda items: gate.wait(2) and _double(items), max_batch_size=1, max_wait_ms=0)
+        try:
+            with pytest.raises(TimeoutError):
+                batcher.infer(1, timeout=0.05)
+        finally:
+            gate.set()
+            batcher.close()
@@ -0,0 +1,67 @@
+"""Tests for the pipeline benchmark tool and its synthetic media."""
+import pytest
+from tools.benchmark_pipeline import compare, summarize
+from tools.synthetic_media import head_turn_schedule, parse_resolution, write_video
+from app.services.liveness import check_liveness_pose
+from app.services.video_utils import read_frames
+
+
+class TestSyntheticMedia:
+    """Test cases for generated benchmark media."""
+
+    def test_parse_resolution(self):
+        """Test WIDTHxHEIGHT parsing."""
+        assert parse_resolution("720x1280") == (720, 1280)
+
+    def test_head_turn_schedule(self):
+        """Test that clips start frontal and end turned."""
+        turns = head_turn_schedule(10)
+
+        assert turns[0] == 0.0
+        assert turns[-1] > 0.0
+        assert len(turns) == 10
+
+    @pytest.mark.parametrize("width, height", [(360, 640), (640, 360)])
+    def test_video_passes_liveness(self, tmp_path, width, height):
+        """Test that FaceMesh sees the synthetic head turn, in portrait and rotated landscape."""
+        path = write_video(str(tmp_path / "clip.mp4"), width, height, num_frames=20)
+        frames = read_frames(path, 4)
+
+        is_live, _, details = check_liveness_pose(frames)
+
+        assert frames[0].shape[0] > frames[0].shape[1]
+        assert is_live is True
+        assert details["poses"][0] is not None
+
+
+class TestSummaries:
+    """Test cases for result aggregation and comparison."""
+
+    def test_summarize(self):
+        """Test latency percentiles, throughput and mean stage times."""
+        traces = [
+            {"spans": {"video_decode": {"ms": 10.0, "count": 1}}, "counts": {"frames_decoded": 4}},
+            {"spans": {"video_decode": {"ms": 30.0, "count": 1}}, "counts": {"frames_decoded": 4}}
+        ]
+
+        summary = summarize([10.0, 30.0], 0.5, traces)
+
+        assert summary["calls"] == 2
+        assert summary["latency_ms"]["p50"] == 20.0
+        assert summary["latency_ms"]["max"] == 30.0
+        assert summary["throughput_per_s"] == 4.0
+        assert summary["stages_ms"] == {"video_decode": 20.0}
+        assert summary["counts"] == {"frames_decoded": 4.0}
+
+    def test_compare_matches_configurations(self):
+        """Test that only matching configurations are compared."""
+        def result(p50, concurrency=1):
+            return {
+                "benchmark": "liveness", "resolution": "360x640", "frames": 4, "concurrency": concurrency,
+                "latency_ms": {"p50": p50}, "throughput_per_s": 1000 / p50
+            }
+
+        lines = compare({"results": [result(20.0)]}, {"results": [result(10.0), result(10.0, concurrency=4)]})
+
+        assert len(lines) == 1
+        assert "(-50.0%)" in lines[0]
@@ -25,6 +25,15 @@ class TestSettings:
         assert 0.0 <= settings.face_detection_threshold <= 1.0
         assert 0.0 <= settings.face_detection_confidence <= 1.0
 
+    def test_embedding_cache_configuration(self):
+        """Test profile embedding cache configuration."""
+        settings = Settings()
+        
+        assert settings.face_alignment is True
+        assert settings.face_embedding_cache_enabled is True
+        assert settings.face_embedding_cache_size == 1024
+        assert settings.face_embedding_cache_dir is None
+
     def test_liveness_configuration(self):
         """Test liveness detection configuration."""
         settings = Settings()
@@ -35,14 +44,161 @@ class TestSettings:
         assert settings.liveness_left_turn_threshold == 0.50
         assert settings.liveness_mirror_threshold == 1.5
 
+    def test_ann_configuration(self):
+        """Test approximate nearest neighbour index configuration."""
+        settings = Settings()
+        
+        assert settings.ann_backend == "exact"
+        assert settings.ann_nlist == 0
+        assert settings.ann_nprobe == 16
+        assert settings.ann_rerank_k == 100
+        assert settings.ann_min_train_size == 10000
+        assert settings.ann_train_iterations == 10
+        assert settings.ann_index_path == "face_index/ivf_index.npz"
+
+    def test_pipeline_executor_configuration(self):
+        """Test pipeline executor configuration."""
+        settings = Settings()
+        
+        assert settings.pipeline_executor == "thread"
+        assert settings.pipeline_max_workers == 0
+
+    def test_model_warmup_configuration(self):
+        """Test background model warmup configuration."""
+        settings = Settings()
+        
+        assert settings.model_warmup_enabled is True
+        assert settings.model_warmup_timeout == 120.0
+
+    def test_template_store_configuration(self):
+        """Test enrolled template storage configuration."""
+        settings = Settings()
+        
+        assert settings.face_template_dir == "face_templates"
+
+    def test_identification_configuration(self):
+        """Test 1:N identification configuration."""
+        settings = Settings()
+        
+        assert settings.identify_top_k == 5
+
+    def test_face_mesh_pool_configuration(self):
+        """Test FaceMesh pool configuration."""
+        settings = Settings()
+        
+        assert settings.face_mesh_pool_size == 0
+        assert settings.face_mesh_pool_timeout == 30.0
+
+    def test_frame_prep_configuration(self):
+        """Test analysis downscale and face crop configuration."""
+        settings = Settings()
+        
+        assert settings.liveness_analysis_max_side == 640
+        assert settings.face_crop_margin == 0.3
+        assert settings.face_crop_max_side == 480
+
+    def test_inference_batching_configuration(self):
+        """Test embedding micro-batching configuration."""
+        settings = Settings()
+        
+        assert settings.inference_batching_enabled is False
+        assert settings.inference_batch_max_size == 8
+        assert settings.inference_batch_max_wait_ms == 5.0
+        assert settings.inference_batch_timeout_seconds == 30.0
+
+    def test_live_alignment_configuration(self):
+        """Test live face alignment configuration."""
+        settings = Settings()
+        
+        assert settings.face_live_alignment == "detector"
+
+    def test_embedding_backend_configuration(self):
+        """Test embedding backend configuration."""
+        settings = Settings()
+        
+        assert settings.embedding_backend == "tensorflow"
+        assert settings.embedding_model_path is None
+        assert settings.embedding_num_threads == 0
+
+    def test_metrics_configuration(self):
+        """Test metrics endpoint configuration."""
+        settings = Settings()
+        
+        assert settings.metrics_enabled is True
+
+    def test_server_timing_configuration(self):
+        """Test Server-Timing header configuration."""
+        settings = Settings()
+        
+        assert settings.server_timing_enabled is True
+
+    def test_fake_models_configuration(self):
+        """Test load-testing stand-in model configuration."""
+        settings = Settings()
+        
+        assert settings.fake_models is False
+        assert settings.fake_model_cost == "sleep"
+
+    def test_job_queue_configuration(self):
+        """Test asynchronous job queue and callback configuration."""
+        settings = Settings()
+        
+        assert settings.job_workers == 2
+        assert settings.job_queue_size == 16
+        assert settings.job_result_ttl_seconds == 600.0
+        assert settings.job_callback_url is None
+        assert settings.job_callback_allowed_hosts == ""
+        assert settings.job_callback_timeout == 5.0
+        assert settings.job_callback_retries == 3
+        assert settings.job_callback_workers == 4
+
+    def test_admission_configuration(self):
+        """Test admission control configuration."""
+        settings = Settings()
+        
+        assert settings.admission_enabled is True
+        assert settings.admission_max_concurrent == 0
+        assert settings.admission_queue_size == 16
+        assert settings.admission_max_wait_seconds == 10.0
+        assert settings.admission_reject_status == 503
+
+    def test_stream_configuration(self):
+        """Test streaming verification limits."""
+        settings = Settings()
+        
+        assert settings.stream_max_frames == 120
+        assert settings.stream_max_frame_bytes == 2097152
+        assert settings.stream_idle_timeout_seconds == 10.0
+        assert settings.stream_max_seconds == 60.0
+
     def test_video_configuration(self):
         """Test video processing configuration."""
         settings = Settings()
         
         assert settings.video_num_frames == 4
         assert settings.video_temp_suffix == ".mp4"
+        assert settings.video_in_memory is True
+        assert settings.video_max_frames == 10
+        assert settings.video_refine_frames == 2
+        assert settings.video_refine_min_change == 0.3
+        assert settings.video_seek_min_gap == 120
+        assert settings.video_max_scan_frames == 3000
+        assert settings.video_check_container is True
+        assert settings.video_allowed_codecs == ""
+        assert settings.video_max_dimension == 3840
+        assert settings.video_max_duration_seconds == 30.0
         assert settings.video_num_frames > 0
 
+    def test_upload_limits(self):
+        """Test upload streaming configuration."""
+        settings = Settings()
+        
+        assert settings.upload_chunk_size == 1048576
+        assert settings.upload_max_image_bytes == 10485760
+        assert settings.upload_max_video_bytes == 52428800
+        assert settings.upload_max_frames == 16
+        assert settings.upload_max_frame_bytes == 2097152
+
     def test_debug_configuration(self):
         """Test debug mode configuration."""
         settings = Settings()
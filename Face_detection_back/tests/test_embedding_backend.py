@@ -0,0 +1,149 @@
+"""Unit tests for the pluggable embedding backends."""
+import sys
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services import embedding_backend
+from app.services.embedding_backend import (
+    OnnxBackend,
+    TFLiteBackend,
+    compare_embeddings,
+    get_embedding_backend,
+    model_tag
+)
+
+
+@pytest.fixture
+def fresh_backend():
+    get_embedding_backend.cache_clear()
+    yield
+    get_embedding_backend.cache_clear()
+
+
+class TestCompareEmbeddings:
+    """Test cases for reference-vs-export comparison."""
+
+    def test_identical_embeddings(self):
+        """Test that identical embeddings have zero distance."""
+        reference = np.random.default_rng(0).random((4, 8))
+
+        stats = compare_embeddings(reference, reference.copy())
+
+        assert stats["max_abs_diff"] == 0.0
+        assert stats["max_cosine_distance"] == pytest.approx(0.0, abs=1e-12)
+
+    def test_reports_worst_row(self):
+        """Test that the largest per-row cosine distance is reported."""
+        reference = np.array([[1.0, 0.0], [0.0, 1.0]])
+        candidate = np.array([[1.0, 0.0], [1.0, 0.0]])
+
+        stats = compare_embeddings(reference, candidate)
+
+        assert stats["max_cosine_distance"] == pytest.approx(1.0)
+        assert stats["mean_cosine_distance"] == pytest.approx(0.5)
+
+    def test_shape_mismatch(self):
+        """Test that embeddings of different shapes are rejected."""
+        with pytest.raises(ValueError):
+            compare_embeddings(np.zeros((2, 4)), np.zeros((2, 5)))
+
+
+class TestBackendSelection:
+    """Test cases for get_embedding_backend and model_tag."""
+
+    def test_unknown_backend(self, fresh_backend):
+        """Test that unknown backends are rejected."""
+        with patch.object(embedding_backend.settings, 'embedding_backend', 'torch'):
+            with pytest.raises(ValueError):
+                get_embedding_backend()
+
+    def test_exported_backend_requires_path(self, fresh_backend):
+        """Test that ONNX/TFLite need a model path."""
+        with patch.object(embedding_backend.settings, 'embedding_backend', 'onnx'), \
+             patch.object(embedding_backend.settings, 'embedding_model_path', None):
+            with pytest.raises(ValueError):
+                get_embedding_backend()
+
+    def test_tensorflow_tag_is_model_name(self):
+        """Test that the default backend keeps existing cache keys valid."""
+        assert model_tag() == "Facenet512"
+
+    def test_exported_tag_tracks_file_content(self, tmp_path):
+        """Test that a re-exported model file changes the cache tag."""
+        model_file = tmp_path / "model.onnx"
+        model_file.write_bytes(b"first export")
+
+        with patch.object(embedding_backend.settings, 'embedding_backend', 'onnx'), \
+             patch.object(embedding_backend.settings, 'embedding_model_path', str(model_file)):
+            first = model_tag()
+            embedding_backend._file_digest.cache_clear()
+            model_file.write_bytes(b"second export")
+            second = model_tag()
+
+        assert first.startswith("Facenet512@onnx:")
+        assert first != second
+
+
+class TestOnnxBackend:
+    """Test cases for the ONNX Runtime backend."""
+
+    def _session(self, input_type):
+        model_input = MagicMock()
+        model_input.name = "input"
+        model_input.type = input_type
+        model_input.shape = ["N", 160, 160, 3]
+        session = MagicMock()
+        session.get_inputs.return_value = [model_input]
+        session.run.side_effect = lambda outputs, feeds: [np.ones((feeds["input"].shape[0], 512), dtype=np.float16)]
+        return session
+
+    def test_embeds_batch(self):
+        """Test that a batch runs in one session call and comes back as float32."""
+        ort = MagicMock()
+        ort.InferenceSession.return_value = self._session("tensor(float)")
+
+        with patch.dict(sys.modules, {"onnxruntime": ort}):
+            backend = OnnxBackend("model.onnx", num_threads=2)
+        out = backend.embed(np.zeros((3, 160, 160, 3), dtype=np.float32))
+
+        assert backend.input_shape == (160, 160)
+        assert ort.SessionOptions.return_value.intra_op_num_threads == 2
+        assert out.shape == (3, 512)
+        assert out.dtype == np.float32
+
+    def test_float16_inputs(self):
+        """Test that float16 exports are fed float16 tensors."""
+        ort = MagicMock()
+        session = self._session("tensor(float16)")
+        ort.InferenceSession.return_value = session
+
+        with patch.dict(sys.modules, {"onnxruntime": ort}):
+            backend = OnnxBackend("model.onnx")
+        backend.embed(np.zeros((1, 160, 160, 3), dtype=np.float32))
+
+        assert session.run.call_args.args[1]["input"].dtype == np.float16
+
+
+class TestTFLiteBackend:
+    """Test cases for the TFLite backend."""
+
+    def test_resizes_for_batch_and_dequantizes(self):
+        """Test that the input tensor is resized to the batch and int8 outputs are dequantized."""
+        state = {"shape": np.array([1, 160, 160, 3])}
+        interpreter = MagicMock()
+        interpreter.get_input_details.side_effect = lambda: [{
+            "index": 0, "shape": state["shape"], "dtype": np.float32, "quantization": (0.0, 0)
+        }]
+        interpreter.get_output_details.return_value = [{"index": 1, "dtype": np.int8, "quantization": (0.5, 2)}]
+        interpreter.resize_tensor_input.side_effect = lambda index, shape: state.update(shape=np.array(shape))
+        interpreter.get_tensor.side_effect = lambda index: np.full((int(state["shape"][0]), 4), 4, dtype=np.int8)
+        runtime = MagicMock()
+        runtime.Interpreter.return_value = interpreter
+
+        with patch.dict(sys.modules, {"tflite_runtime": MagicMock(), "tflite_runtime.interpreter": runtime}):
+            backend = TFLiteBackend("model.tflite")
+        out = backend.embed(np.zeros((2, 160, 160, 3), dtype=np.float32))
+
+        interpreter.resize_tensor_input.assert_called_once_with(0, (2, 160, 160, 3))
+        assert out.shape == (2, 4)
+        assert np.all(out == 1.0)
@@ -0,0 +1,94 @@
+"""Unit tests for the profile embedding cache."""
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache, make_cache_key
+
+
+class TestMakeCacheKey:
+    """Test cases for cache key construction."""
+
+    def test_same_inputs_same_key(self):
+        """Test that identical bytes and settings produce the same key."""
+        key1 = make_cache_key(b"image", "Facenet512", "opencv", True)
+        key2 = make_cache_key(b"image", "Facenet512", "opencv", True)
+        
+        assert key1 == key2
+
+    def test_different_bytes_different_key(self):
+        """Test that different image bytes produce different keys."""
+        key1 = make_cache_key(b"image-a", "Facenet512", "opencv", True)
+        key2 = make_cache_key(b"image-b", "Facenet512", "opencv", True)
+        
+        assert key1 != key2
+
+    def test_settings_are_part_of_key(self):
+        """Test that model, detector and alignment change the key."""
+        base = make_cache_key(b"image", "Facenet512", "opencv", True)
+        
+        assert make_cache_key(b"image", "ArcFace", "opencv", True) != base
+        assert make_cache_key(b"image", "Facenet512", "mtcnn", True) != base
+        assert make_cache_key(b"image", "Facenet512", "opencv", False) != base
+
+
+class TestEmbeddingCache:
+    """Test cases for the LRU embedding cache."""
+
+    def test_get_missing_returns_none(self):
+        """Test lookup of an unknown key."""
+        cache = EmbeddingCache(max_size=2)
+        
+        assert cache.get("missing") is None
+        assert cache.misses == 1
+
+    def test_put_then_get(self):
+        """Test that stored embeddings are returned."""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("a", [0.1, 0.2, 0.3])
+        
+        result = cache.get("a")
+        
+        assert isinstance(result, np.ndarray)
+        assert result.dtype == np.float32
+        assert np.allclose(result, [0.1, 0.2, 0.3])
+        assert cache.hits == 1
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+        
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_disk_store_survives_eviction(self, tmp_path):
+        """Test that evicted entries are reloaded from disk."""
+        cache = EmbeddingCache(max_size=1, disk_dir=str(tmp_path))
+        cache.put("a", [1.0, 2.0])
+        cache.put("b", [3.0, 4.0])
+        
+        result = cache.get("a")
+        
+        assert result is not None
+        assert np.allclose(result, [1.0, 2.0])
+        assert (tmp_path / "a.npy").exists()
+
+    def test_disk_store_shared_between_instances(self, tmp_path):
+        """Test that a new cache instance reads the existing disk store."""
+        EmbeddingCache(max_size=4, disk_dir=str(tmp_path)).put("a", [5.0])
+        
+        result = EmbeddingCache(max_size=4, disk_dir=str(tmp_path)).get("a")
+        
+        assert np.allclose(result, [5.0])
+
+    def test_clear(self):
+        """Test clearing in-memory entries."""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("a", [1.0])
+        cache.clear()
+        
+        assert len(cache) == 0
+        assert cache.get("a") is None
@@ -0,0 +1,117 @@
+"""Tests for enrollment router."""
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.main import app
+from app.services.template_store import TemplateStore
+from app.services.gallery import EmbeddingGallery
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def gallery():
+    """Empty gallery used in place of the configured one."""
+    gallery = EmbeddingGallery()
+    with patch('app.routers.enroll.get_gallery', return_value=gallery):
+        yield gallery
+
+
+@pytest.fixture
+def store(gallery):
+    """In-memory template store used in place of the configured one."""
+    store = TemplateStore(model_name="Facenet512")
+    with patch('app.routers.enroll.get_template_store', return_value=store):
+        yield store
+
+
+class TestEnrollRouter:
+    """Test cases for enrollment endpoints."""
+
+    @patch('app.routers.enroll.get_profile_embedding')
+    def test_enroll_success(self, mock_embedding, store):
+        """Test enrolling a new user."""
+        mock_embedding.return_value = [0.1] * 512
+        
+        response = client.post(
+            "/enroll",
+            data={"user_id": "alice"},
+            files={"profile_image": ("profile.jpg", b"fake image", "image/jpeg")}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "enrolled"
+        assert data["user_id"] == "alice"
+        assert data["model"] == "Facenet512"
+        assert "alice" in store
+
+    @patch('app.routers.enroll.get_profile_embedding')
+    def test_enroll_adds_to_gallery(self, mock_embedding, store, gallery):
+        """Test that enrollment makes the user identifiable."""
+        mock_embedding.return_value = [0.1] * 512
+        
+        client.post(
+            "/enroll",
+            data={"user_id": "alice"},
+            files={"profile_image": ("profile.jpg", b"fake image", "image/jpeg")}
+        )
+        
+        assert "alice" in gallery
+
+    @patch('app.routers.enroll.get_profile_embedding')
+    def test_enroll_replaces_template(self, mock_embedding, store):
+        """Test re-enrolling an existing user."""
+        store.enroll("alice", [0.5] * 512)
+        mock_embedding.return_value = [0.1] * 512
+        
+        response = client.post(
+            "/enroll",
+            data={"user_id": "alice"},
+            files={"profile_image": ("profile.jpg", b"fake image", "image/jpeg")}
+        )
+        
+        assert response.json()["message"] == "Template replaced"
+        assert store.get("alice")[0] == pytest.approx(0.1)
+
+    @patch('app.routers.enroll.get_profile_embedding')
+    def test_enroll_no_face(self, mock_embedding, store):
+        """Test enrollment when no template can be computed."""
+        mock_embedding.return_value = None
+        
+        response = client.post(
+            "/enroll",
+            data={"user_id": "alice"},
+            files={"profile_image": ("profile.jpg", b"fake image", "image/jpeg")}
+        )
+        
+        assert response.status_code == 422
+        assert "alice" not in store
+
+    def test_enroll_invalid_user_id(self, store):
+        """Test enrollment with an unsafe user id."""
+        response = client.post(
+            "/enroll",
+            data={"user_id": "../alice"},
+            files={"profile_image": ("profile.jpg", b"fake image", "image/jpeg")}
+        )
+        
+        assert response.status_code == 400
+
+    def test_unenroll(self, store, gallery):
+        """Test removing an enrolled user."""
+        store.enroll("alice", [0.1] * 512)
+        gallery.add("alice", [0.1] * 512)
+        
+        response = client.delete("/enroll/alice")
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "removed"
+        assert "alice" not in store
+        assert "alice" not in gallery
+
+    def test_unenroll_unknown_user(self, store):
+        """Test removing a user that is not enrolled."""
+        response = client.delete("/enroll/bob")
+        
+        assert response.status_code == 404
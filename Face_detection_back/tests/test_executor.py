@@ -0,0 +1,100 @@
+"""Tests for the pipeline executor."""
+import asyncio
+import threading
+import pytest
+import httpx
+from unittest.mock import patch, MagicMock
+from app.main import app
+from app.services import executor
+from app.services.executor import run_in_executor, pending_tasks, get_executor
+
+
+def _current_thread_name():
+    return threading.current_thread().name
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+class TestRunInExecutor:
+    """Test cases for run_in_executor."""
+
+    async def test_runs_off_event_loop_thread(self):
+        """Test that work runs on a pool thread."""
+        name = await run_in_executor(_current_thread_name)
+        
+        assert name.startswith("pipeline")
+        assert name != threading.current_thread().name
+
+    async def test_passes_arguments(self):
+        """Test positional and keyword arguments are forwarded."""
+        result = await run_in_executor(divmod, 7, 2)
+        
+        assert result == (3, 1)
+
+    async def test_exception_propagates(self):
+        """Test that exceptions raised in the pool reach the caller."""
+        with pytest.raises(RuntimeError):
+            await run_in_executor(_fail)
+        
+        assert pending_tasks() == 0
+
+    async def test_health_responsive_while_pipeline_busy(self):
+        """Test that /health answers while a verification is blocked in the pool."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_liveness(frames):
+            started.set()
+            release.wait(5)
+            return False, "No movement detected", {}
+
+        async def analyze_in_pool(video_file, consumer=None, num_frames=None):
+            frames = [MagicMock()]
+            return frames, await run_in_executor(consumer, iter(frames))
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with patch('app.routers.verify.analyze_video', side_effect=analyze_in_pool), \
+                 patch('app.routers.verify.check_liveness_pose', side_effect=slow_liveness):
+                files = {
+                    "profile_image": ("profile.jpg", b"fake image", "image/jpeg"),
+                    "live_video": ("video.mp4", b"fake video", "video/mp4")
+                }
+                verify_task = asyncio.create_task(client.post("/verify_identity", files=files))
+                while not started.is_set():
+                    await asyncio.sleep(0.01)
+                
+                health = await asyncio.wait_for(client.get("/health"), timeout=2)
+                
+                assert health.status_code == 200
+                assert not verify_task.done()
+                release.set()
+                response = await verify_task
+                assert response.json()["status"] == "failed"
+
+
+class TestGetExecutor:
+    """Test cases for executor selection."""
+
+    def test_unsupported_executor(self):
+        """Test that unknown executor kinds are rejected."""
+        get_executor.cache_clear()
+        try:
+            with patch.object(executor.settings, 'pipeline_executor', 'fibers'):
+                with pytest.raises(ValueError):
+                    get_executor()
+        finally:
+            get_executor.cache_clear()
+
+    def test_pool_size_from_config(self):
+        """Test that max workers follows configuration."""
+        get_executor.cache_clear()
+        try:
+            with patch.object(executor.settings, 'pipeline_max_workers', 3):
+                assert get_executor()._max_workers == 3
+        finally:
+            get_executor().shutdown(wait=False)
+            get_executor.cache_clear()
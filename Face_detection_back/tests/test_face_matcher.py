@@ -2,7 +2,10 @@
 import numpy as np
 from unittest.mock import patch, MagicMock
 import pytest
-from app.services.face_matcher import verify_faces
+from app.services import face_matcher
+from app.services.face_matcher import verify_faces, get_profile_embedding, verify_against_template, identify_face, get_face_embedding
+from app.services.gallery import EmbeddingGallery
+from app.services.embedding_cache import get_embedding_cache
 
 
 class TestFaceMatcher:
@@ -140,3 +143,317 @@ class TestFaceMatcher:
             )
             
             assert result['model'] == 'Facenet512'
+
+
+class TestProfileEmbeddingCache:
+    """Test cases for cached profile embeddings."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        get_embedding_cache().clear()
+        yield
+        get_embedding_cache().clear()
+
+    def test_profile_embedded_once_across_retries(self, tmp_path):
+        """Test that repeated verifications reuse the profile embedding."""
+        profile = tmp_path / "profile.jpg"
+        profile.write_bytes(b"profile-bytes")
+        
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent, \
+             patch('app.services.face_matcher.DeepFace.verify') as mock_verify:
+            mock_represent.return_value = [{"embedding": [0.1] * 512}]
+            mock_verify.return_value = {'verified': True, 'distance': 0.2, 'threshold': 0.5}
+            
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            first = verify_faces(str(profile), frame)
+            second = verify_faces(str(profile), frame)
+            
+            profile_calls = [c for c in mock_represent.call_args_list if isinstance(c.kwargs["img_path"], str)]
+            assert len(profile_calls) == 1
+            mock_verify.assert_not_called()
+            assert first['verified'] is True and second['verified'] is True
+            assert first['distance'] == pytest.approx(0.0, abs=1e-6)
+
+    def test_changed_profile_bytes_recomputed(self, tmp_path):
+        """Test that a different profile image misses the cache."""
+        profile = tmp_path / "profile.jpg"
+        
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            mock_represent.return_value = [{"embedding": [0.1] * 512}]
+            
+            profile.write_bytes(b"first")
+            get_profile_embedding(str(profile))
+            profile.write_bytes(b"second")
+            get_profile_embedding(str(profile))
+            
+            assert mock_represent.call_count == 2
+
+    def test_exported_backend_embeds_profile_without_deepface_model(self, tmp_path):
+        """Test that ONNX/TFLite backends embed the profile themselves, under a backend-specific key."""
+        profile = tmp_path / "profile.jpg"
+        profile.write_bytes(b"profile-bytes")
+        
+        with patch.object(face_matcher.settings, 'embedding_backend', 'onnx'), \
+             patch('app.services.face_matcher.model_tag', return_value="Facenet512@onnx:abc"), \
+             patch('app.services.face_matcher.prepare_face', return_value=np.zeros((1, 160, 160, 3))), \
+             patch('app.services.face_matcher.embed_face_batch', return_value=np.ones((1, 4), dtype=np.float32)), \
+             patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            embedding = get_profile_embedding(str(profile))
+            
+            mock_represent.assert_not_called()
+            assert embedding == [1.0] * 4
+            assert len(get_embedding_cache()) == 1
+
+    def test_cache_disabled_embeds_every_call(self, tmp_path):
+        """Test that a disabled cache still yields an embedding but stores nothing."""
+        profile = tmp_path / "profile.jpg"
+        profile.write_bytes(b"profile-bytes")
+        
+        with patch.object(face_matcher.settings, 'face_embedding_cache_enabled', False), \
+             patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            mock_represent.return_value = [{"embedding": [0.1] * 512}]
+            
+            get_profile_embedding(str(profile))
+            get_profile_embedding(str(profile))
+            
+            assert mock_represent.call_count == 2
+            assert len(get_embedding_cache()) == 0
+
+    def test_unreadable_profile_falls_back_to_path(self):
+        """Test that verification still runs when the profile cannot be cached."""
+        with patch('app.services.face_matcher.DeepFace.verify') as mock_verify:
+            mock_verify.return_value = {'verified': True, 'distance': 0.2, 'threshold': 0.5}
+            
+            verify_faces('missing.jpg', np.zeros((480, 640, 3), dtype=np.uint8))
+            
+            assert mock_verify.call_args.kwargs["img1_path"] == 'missing.jpg'
+
+
+class TestVerifyAgainstTemplate:
+    """Test cases for verification against stored templates."""
+
+    def test_template_compared_in_numpy(self):
+        """Test that only the live frame is embedded and the distance is computed locally."""
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent, \
+             patch('app.services.face_matcher.DeepFace.verify') as mock_verify:
+            mock_represent.return_value = [{"embedding": [0.0, 1.0]}]
+            
+            template = np.array([0.0, 1.0], dtype=np.float32)
+            result = verify_against_template(template, np.zeros((480, 640, 3), dtype=np.uint8))
+            
+            mock_verify.assert_not_called()
+            mock_represent.assert_called_once()
+            assert result['verified'] is True
+            assert result['distance'] == pytest.approx(0.0, abs=1e-6)
+            assert result['model'] == 'Facenet512'
+
+
+class TestIdentifyFace:
+    """Test cases for 1:N identification."""
+
+    def test_identify_best_match(self):
+        """Test that the closest user under threshold is identified."""
+        gallery = EmbeddingGallery()
+        gallery.add("alice", [1.0, 0.0])
+        gallery.add("bob", [0.0, 1.0])
+        
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            mock_represent.return_value = [{"embedding": [0.9, 0.1]}]
+            
+            result = identify_face(np.zeros((480, 640, 3), dtype=np.uint8), gallery, top_k=2)
+            
+            assert result['identified'] is True
+            assert result['user_id'] == "alice"
+            assert [m['user_id'] for m in result['matches']] == ["alice", "bob"]
+            assert result['matches'][1]['verified'] is False
+
+    def test_identify_no_match_under_threshold(self):
+        """Test that nobody is identified when all distances exceed threshold."""
+        gallery = EmbeddingGallery()
+        gallery.add("bob", [0.0, 1.0])
+        
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            mock_represent.return_value = [{"embedding": [1.0, 0.0]}]
+            
+            result = identify_face(np.zeros((480, 640, 3), dtype=np.uint8), gallery)
+            
+            assert result['identified'] is False
+            assert result['user_id'] is None
+            assert len(result['matches']) == 1
+
+    def test_identify_embedding_failure(self):
+        """Test identification when the live face cannot be embedded."""
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            mock_represent.side_effect = ValueError("Face not detected")
+            
+            result = identify_face(np.zeros((480, 640, 3), dtype=np.uint8), EmbeddingGallery())
+            
+            assert result['identified'] is False
+            assert result['matches'] == []
+            assert 'message' in result
+
+
+class TestBatchedInference:
+    """Test cases for live embeddings computed through the micro-batcher."""
+
+    @pytest.fixture(autouse=True)
+    def batching_enabled(self):
+        with patch.object(face_matcher.settings, 'inference_batching_enabled', True):
+            yield
+
+    def test_template_compared_without_deepface_verify(self):
+        """Test that the live embedding comes from the batcher and distance is computed locally."""
+        batcher = MagicMock()
+        batcher.infer.return_value = np.array([1.0, 0.0], dtype=np.float32)
+        
+        with patch('app.services.face_matcher.prepare_face', return_value=np.zeros((1, 160, 160, 3))), \
+             patch('app.services.face_matcher.get_embedding_batcher', return_value=batcher), \
+             patch('app.services.face_matcher.DeepFace.verify') as mock_verify:
+            result = verify_against_template(np.array([0.9, 0.1]), np.zeros((480, 640, 3), dtype=np.uint8))
+            
+            mock_verify.assert_not_called()
+            batcher.infer.assert_called_once()
+            assert batcher.infer.call_args.kwargs["timeout"] == 30.0
+            assert result['verified'] is True
+            assert result['distance'] < 0.05
+            assert result['threshold'] == 0.5
+            assert result['model'] == 'Facenet512'
+
+    def test_no_face_reported_as_validation_error(self):
+        """Test that a frame without a face fails like DeepFace validation errors."""
+        with patch('app.services.face_matcher.prepare_face', return_value=None):
+            result = verify_against_template(np.array([1.0, 0.0]), np.zeros((480, 640, 3), dtype=np.uint8))
+            
+            assert result['verified'] is False
+            assert 'Face validation failed' in result['message']
+
+    def test_profile_path_still_uses_deepface_verify(self):
+        """Test that an uncached profile image keeps the unbatched path."""
+        with patch('app.services.face_matcher.DeepFace.verify') as mock_verify:
+            mock_verify.return_value = {'verified': True, 'distance': 0.2, 'threshold': 0.5}
+            
+            verify_faces('missing.jpg', np.zeros((480, 640, 3), dtype=np.uint8))
+            
+            mock_verify.assert_called_once()
+
+    def test_get_face_embedding_batched(self):
+        """Test that identification embeddings go through the batcher."""
+        batcher = MagicMock()
+        batcher.infer.return_value = np.array([0.5, 0.5], dtype=np.float32)
+        
+        with patch('app.services.face_matcher.prepare_face', return_value=np.zeros((1, 160, 160, 3))), \
+             patch('app.services.face_matcher.get_embedding_batcher', return_value=batcher), \
+             patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            embedding = get_face_embedding(np.zeros((480, 640, 3), dtype=np.uint8))
+            
+            mock_represent.assert_not_called()
+            assert embedding.tolist() == [0.5, 0.5]
+
+    def test_embed_face_batch_single_forward_pass(self):
+        """Test that prepared faces are stacked into one backend call."""
+        backend = MagicMock()
+        backend.embed.side_effect = lambda batch: np.ones((batch.shape[0], 4), dtype=np.float32)
+        
+        with patch('app.services.face_matcher.get_embedding_backend', return_value=backend):
+            out = face_matcher.embed_face_batch([np.zeros((1, 160, 160, 3))] * 3)
+            
+            assert backend.embed.call_count == 1
+            assert backend.embed.call_args.args[0].shape == (3, 160, 160, 3)
+            assert out.shape == (3, 4)
+
+
+def landmark_pose(left_eye, right_eye):
+    """Builds a pose record with a face box and refined eye landmarks."""
+    return {
+        "yaw_ratio": 1.0,
+        "face_box": {"x": 200, "y": 100, "w": 200, "h": 240},
+        "landmarks": {"left_eye": left_eye, "right_eye": right_eye}
+    }
+
+
+class TestLandmarkAlignment:
+    """Test cases for live faces aligned from liveness landmarks."""
+
+    @pytest.fixture(autouse=True)
+    def backend(self):
+        backend = MagicMock()
+        backend.input_shape = (160, 160)
+        with patch('app.services.face_matcher.get_embedding_backend', return_value=backend), \
+             patch.object(face_matcher.settings, 'face_live_alignment', 'landmarks'):
+            yield backend
+
+    def test_align_face_shape_and_channels(self):
+        """Test that the face box is resampled to model input in BGR, scaled to [0, 1]."""
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        frame[:, :, 0] = 255
+        
+        face = face_matcher.align_face(frame, landmark_pose([350, 180], [250, 180]))
+        
+        assert face.shape == (1, 160, 160, 3)
+        assert face.dtype == np.float32
+        assert face[0, 80, 80, 2] == pytest.approx(1.0)
+        assert face[0, 80, 80, 0] == pytest.approx(0.0)
+
+    def test_align_face_levels_eyes(self):
+        """Test that a tilted head is rotated so the eye line is horizontal."""
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        left, right = (250, 170), (350, 230)
+        for x, y in (left, right):
+            frame[y - 3:y + 4, x - 3:x + 4] = 255
+        
+        face = face_matcher.align_face(frame, landmark_pose(list(right), list(left)))
+        
+        ys, xs = np.nonzero(face[0, :, :, 0] > 0.5)
+        left_blob, right_blob = ys[xs < 80], ys[xs >= 80]
+        assert abs(left_blob.mean() - right_blob.mean()) < 2
+
+    def test_align_face_requires_eyes(self):
+        """Test that poses without refined eye landmarks are not aligned."""
+        pose = landmark_pose([1, 1], [2, 2])
+        pose["landmarks"] = {"nose": [300, 200]}
+        
+        assert face_matcher.align_face(np.zeros((480, 640, 3), dtype=np.uint8), pose) is None
+        assert face_matcher.align_face(np.zeros((480, 640, 3), dtype=np.uint8), None) is None
+
+    def test_verify_skips_live_detector(self, backend):
+        """Test that a known pose embeds the live face without detection."""
+        backend.embed.side_effect = lambda batch: np.tile([0.0, 1.0], (batch.shape[0], 1))
+        
+        with patch('app.services.face_matcher.DeepFace.represent') as mock_represent, \
+             patch('app.services.face_matcher.DeepFace.extract_faces') as mock_extract:
+            result = verify_against_template(
+                np.array([0.0, 1.0]),
+                np.zeros((480, 640, 3), dtype=np.uint8),
+                landmark_pose([350, 180], [250, 180])
+            )
+            
+            mock_represent.assert_not_called()
+            mock_extract.assert_not_called()
+            assert backend.embed.call_count == 1
+            assert result['verified'] is True
+
+    def test_detector_alignment_setting(self):
+        """Test that FACE_LIVE_ALIGNMENT=detector ignores landmarks."""
+        with patch.object(face_matcher.settings, 'face_live_alignment', 'detector'), \
+             patch('app.services.face_matcher.DeepFace.represent') as mock_represent:
+            mock_represent.return_value = [{"embedding": [0.0, 1.0]}]
+            
+            embedding = get_face_embedding(np.zeros((480, 640, 3), dtype=np.uint8), landmark_pose([350, 180], [250, 180]))
+            
+            mock_represent.assert_called_once()
+            assert mock_represent.call_args.kwargs["img_path"].shape[0] < 480
+            assert embedding.tolist() == [0.0, 1.0]
+
+
+class TestWarmUp:
+    """Test cases for embedding model warm-up."""
+
+    def test_warm_up_embedding_runs_dummy_inference(self):
+        """Test that warm-up builds the backend and runs one forward pass of the input shape."""
+        backend = MagicMock()
+        backend.input_shape = (160, 160)
+        
+        with patch('app.services.face_matcher.get_embedding_backend', return_value=backend):
+            face_matcher.warm_up_embedding()
+        
+        assert backend.embed.call_args.args[0].shape == (1, 160, 160, 3)
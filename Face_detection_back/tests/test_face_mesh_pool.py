@@ -0,0 +1,89 @@
+"""Unit tests for the FaceMesh instance pool."""
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.services.face_mesh_pool import FaceMeshPool
+from app.services.metrics import STAGE_SECONDS
+
+
+class TestFaceMeshPool:
+    """Test cases for FaceMeshPool."""
+
+    def test_instances_created_lazily(self):
+        """Test that no instance is built until first checkout."""
+        factory = MagicMock(side_effect=lambda: object())
+        pool = FaceMeshPool(size=2, factory=factory)
+        
+        assert factory.call_count == 0
+        with pool.checkout():
+            pass
+        
+        assert factory.call_count == 1
+
+    def test_instance_reused_after_release(self):
+        """Test that sequential checkouts share one instance."""
+        pool = FaceMeshPool(size=2, factory=object)
+        
+        with pool.checkout() as first:
+            pass
+        with pool.checkout() as second:
+            pass
+        
+        assert first is second
+        assert pool.stats()["created"] == 1
+
+    def test_concurrent_checkouts_get_distinct_instances(self):
+        """Test that nested checkouts never share graph state."""
+        pool = FaceMeshPool(size=2, factory=object)
+        
+        with pool.checkout() as first, pool.checkout() as second:
+            assert first is not second
+            assert pool.stats()["in_use"] == 2
+        
+        assert pool.stats()["in_use"] == 0
+
+    def test_waits_when_exhausted(self):
+        """Test that callers block when all instances are in use and wait time is recorded."""
+        pool = FaceMeshPool(size=1, factory=object)
+        acquired = threading.Event()
+        checkouts = STAGE_SECONDS.count(stage="face_mesh_wait")
+        waited = STAGE_SECONDS.sum(stage="face_mesh_wait")
+
+        def hold():
+            with pool.checkout():
+                acquired.set()
+                time.sleep(0.05)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        acquired.wait(1)
+        with pool.checkout():
+            pass
+        holder.join()
+        
+        assert pool.stats()["created"] == 1
+        assert STAGE_SECONDS.count(stage="face_mesh_wait") == checkouts + 2
+        assert STAGE_SECONDS.sum(stage="face_mesh_wait") - waited > 0
+
+    def test_timeout(self):
+        """Test that checkout gives up after the pool timeout."""
+        pool = FaceMeshPool(size=1, factory=object, timeout=0.01)
+        
+        with pool.checkout():
+            with pytest.raises(TimeoutError):
+                with pool.checkout():
+                    pass
+
+    def test_failed_creation_frees_slot(self):
+        """Test that a factory error does not consume pool capacity."""
+        factory = MagicMock(side_effect=[RuntimeError("graph error"), object()])
+        pool = FaceMeshPool(size=1, factory=factory)
+        
+        with pytest.raises(RuntimeError):
+            with pool.checkout():
+                pass
+        with pool.checkout() as mesh:
+            assert mesh is not None
+        
+        assert pool.stats()["created"] == 1
@@ -0,0 +1,81 @@
+"""Unit tests for the load-testing model stand-ins."""
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services import fake_models
+from app.services.embedding_backend import get_embedding_backend, model_tag
+from app.services.fake_models import FakeEmbeddingBackend, FakeFaceMesh, fake_prepare_face, simulate_cost
+from app.services.liveness import LivenessSession, estimate_head_pose
+
+
+@pytest.fixture
+def no_cost():
+    with patch.object(fake_models.settings, 'fake_face_mesh_ms', 0), \
+         patch.object(fake_models.settings, 'fake_embedding_ms', 0), \
+         patch.object(fake_models.settings, 'fake_detector_ms', 0):
+        yield
+
+
+class TestFakeFaceMesh:
+    """Test cases for FakeFaceMesh."""
+
+    def test_consecutive_frames_pass_liveness(self, no_cost):
+        """Test that the alternating poses settle liveness as passed."""
+        mesh = FakeFaceMesh()
+        frame = np.zeros((640, 360, 3), dtype=np.uint8)
+        session = LivenessSession()
+
+        for _ in range(2):
+            session.add(estimate_head_pose(frame, mesh))
+
+        assert session.decision is True
+        assert [round(p["yaw_ratio"], 2) for p in session.poses] == [1.0, 2.0]
+
+    def test_pose_has_alignment_landmarks(self, no_cost):
+        """Test that the fake pose carries a face box and eye landmarks."""
+        pose = estimate_head_pose(np.zeros((640, 360, 3), dtype=np.uint8), FakeFaceMesh())
+
+        assert pose["face_box"]["w"] > 0
+        assert "left_eye" in pose["landmarks"]
+
+
+class TestFakeEmbedding:
+    """Test cases for the fake embedding backend and detector."""
+
+    def test_deterministic_embeddings(self, no_cost):
+        """Test that the same face always gets the same embedding."""
+        backend = FakeEmbeddingBackend()
+        faces = np.random.default_rng(1).random((2, 160, 160, 3), dtype=np.float32)
+
+        first = backend.embed(faces)
+
+        assert first.shape == (2, 512)
+        assert np.array_equal(first, backend.embed(faces))
+        assert not np.array_equal(first[0], first[1])
+
+    def test_prepare_face_shape(self, no_cost):
+        """Test that the fake detector returns model input."""
+        face = fake_prepare_face(np.zeros((640, 480, 3), dtype=np.uint8), (160, 160))
+
+        assert face.shape == (1, 160, 160, 3)
+
+    def test_selected_by_setting(self):
+        """Test that FAKE_MODELS swaps the backend and the cache tag."""
+        get_embedding_backend.cache_clear()
+        try:
+            with patch.object(fake_models.settings, 'fake_models', True):
+                assert isinstance(get_embedding_backend(), FakeEmbeddingBackend)
+                assert model_tag().endswith("@fake")
+        finally:
+            get_embedding_backend.cache_clear()
+
+    @pytest.mark.parametrize("mode", ["sleep", "burn"])
+    def test_simulated_cost(self, mode):
+        """Test that both cost modes take about the configured time."""
+        with patch.object(fake_models.settings, 'fake_model_cost', mode):
+            start = time.perf_counter()
+            simulate_cost(20)
+            elapsed = time.perf_counter() - start
+
+        assert 0.015 <= elapsed < 1.0
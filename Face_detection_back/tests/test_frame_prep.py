@@ -0,0 +1,84 @@
+"""Tests for frame preparation stages."""
+import numpy as np
+from unittest.mock import patch
+from app.services.frame_prep import downscale_for_analysis, crop_face
+
+
+def face_pose(x, y, w, h):
+    return {"yaw_ratio": 1.0, "face_box": {"x": x, "y": y, "w": w, "h": h}, "landmarks": {}}
+
+
+class TestDownscaleForAnalysis:
+    """Test cases for the analysis copy."""
+
+    def test_downscales_long_side(self):
+        """Test a portrait 1080x1920 frame is reduced to the target long side."""
+        frame = np.zeros((1920, 1080, 3), dtype=np.uint8)
+
+        small = downscale_for_analysis(frame, max_side=640)
+
+        assert small.shape == (640, 360, 3)
+
+    def test_keeps_small_frames(self):
+        """Test frames already under the target are returned as-is."""
+        frame = np.zeros((480, 360, 3), dtype=np.uint8)
+
+        assert downscale_for_analysis(frame, max_side=640) is frame
+
+    def test_disabled(self):
+        """Test a target of 0 disables downscaling."""
+        frame = np.zeros((1920, 1080, 3), dtype=np.uint8)
+
+        assert downscale_for_analysis(frame, max_side=0) is frame
+
+    def test_uses_config_default(self):
+        """Test the configured target is used when none is given."""
+        frame = np.zeros((1000, 500, 3), dtype=np.uint8)
+
+        with patch('app.services.frame_prep.settings.liveness_analysis_max_side', 100):
+            assert downscale_for_analysis(frame).shape == (100, 50, 3)
+
+
+class TestCropFace:
+    """Test cases for full-resolution face crops."""
+
+    def test_square_crop_with_margin(self):
+        """Test the crop is centred on the face box and padded."""
+        frame = np.zeros((1920, 1080, 3), dtype=np.uint8)
+
+        crop = crop_face(frame, face_pose(400, 800, 200, 200), margin=0.5, max_side=0)
+
+        assert crop.shape == (400, 400, 3)
+
+    def test_crop_content_comes_from_face_region(self):
+        """Test the crop is taken from the face box location."""
+        frame = np.zeros((100, 100, 3), dtype=np.uint8)
+        frame[40:60, 40:60] = 255
+
+        crop = crop_face(frame, face_pose(40, 40, 20, 20), margin=0.0, max_side=0)
+
+        assert crop.shape == (20, 20, 3)
+        assert np.all(crop == 255)
+
+    def test_crop_clipped_to_frame(self):
+        """Test a face near the edge yields a crop inside the frame."""
+        frame = np.zeros((200, 100, 3), dtype=np.uint8)
+
+        crop = crop_face(frame, face_pose(0, 0, 50, 50), margin=0.5, max_side=0)
+
+        assert crop.shape == (75, 75, 3)
+
+    def test_large_crop_is_downscaled(self):
+        """Test a crop larger than max_side is resized."""
+        frame = np.zeros((1920, 1080, 3), dtype=np.uint8)
+
+        crop = crop_face(frame, face_pose(140, 560, 800, 800), margin=0.0, max_side=400)
+
+        assert crop.shape == (400, 400, 3)
+
+    def test_without_face_box(self):
+        """Test the whole frame is returned when no face box is known."""
+        frame = np.zeros((100, 100, 3), dtype=np.uint8)
+
+        assert crop_face(frame, None) is frame
+        assert crop_face(frame, {"yaw_ratio": 1.0}) is frame
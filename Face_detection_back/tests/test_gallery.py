@@ -0,0 +1,97 @@
+"""Unit tests for the vectorized embedding gallery."""
+import numpy as np
+import pytest
+from app.services.gallery import EmbeddingGallery, compute_distances
+
+
+class TestComputeDistances:
+    """Test cases for vectorized distance computation."""
+
+    def test_cosine(self):
+        """Test cosine distance against each row."""
+        matrix = np.array([[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0]])
+        
+        distances = compute_distances(matrix, np.array([1.0, 0.0]), "cosine")
+        
+        assert np.allclose(distances, [0.0, 1.0, 2.0])
+
+    def test_euclidean(self):
+        """Test euclidean distance against each row."""
+        matrix = np.array([[0.0, 0.0], [3.0, 4.0]])
+        
+        distances = compute_distances(matrix, np.array([0.0, 0.0]), "euclidean")
+        
+        assert np.allclose(distances, [0.0, 5.0])
+
+    def test_euclidean_l2(self):
+        """Test euclidean distance between normalized vectors."""
+        matrix = np.array([[2.0, 0.0], [0.0, 5.0]])
+        
+        distances = compute_distances(matrix, np.array([1.0, 0.0]), "euclidean_l2")
+        
+        assert np.allclose(distances, [0.0, np.sqrt(2.0)])
+
+    def test_unknown_metric(self):
+        """Test that unsupported metrics are rejected."""
+        with pytest.raises(ValueError):
+            compute_distances(np.ones((1, 2)), np.ones(2), "manhattan")
+
+
+class TestEmbeddingGallery:
+    """Test cases for EmbeddingGallery."""
+
+    def test_search_returns_sorted_top_k(self):
+        """Test that search ranks users by distance."""
+        gallery = EmbeddingGallery()
+        gallery.add("far", [0.0, 1.0])
+        gallery.add("near", [1.0, 0.1])
+        gallery.add("exact", [1.0, 0.0])
+        
+        results = gallery.search(np.array([1.0, 0.0]), top_k=2, metric="cosine")
+        
+        assert [user_id for user_id, _ in results] == ["exact", "near"]
+        assert results[0][1] == pytest.approx(0.0, abs=1e-6)
+
+    def test_search_empty_gallery(self):
+        """Test search with no enrolled users."""
+        assert EmbeddingGallery().search(np.array([1.0, 0.0]), top_k=3) == []
+
+    def test_matrix_is_contiguous(self):
+        """Test that embeddings are packed into one matrix."""
+        gallery = EmbeddingGallery(initial_capacity=1)
+        for i in range(5):
+            gallery.add(f"user{i}", [float(i), 1.0])
+        
+        assert gallery.matrix.shape == (5, 2)
+        assert gallery.matrix.flags["C_CONTIGUOUS"]
+
+    def test_add_replaces_existing_user(self):
+        """Test re-adding a user overwrites the row."""
+        gallery = EmbeddingGallery()
+        gallery.add("alice", [1.0, 0.0])
+        gallery.add("alice", [0.0, 1.0])
+        
+        assert len(gallery) == 1
+        assert np.allclose(gallery.matrix[0], [0.0, 1.0])
+
+    def test_remove_keeps_rows_packed(self):
+        """Test removal moves the last row into the freed slot."""
+        gallery = EmbeddingGallery()
+        gallery.add("a", [1.0, 0.0])
+        gallery.add("b", [0.0, 1.0])
+        gallery.add("c", [1.0, 1.0])
+        
+        assert gallery.remove("a") is True
+        assert gallery.remove("a") is False
+        assert len(gallery) == 2
+        results = dict(gallery.search(np.array([1.0, 1.0]), top_k=2, metric="cosine"))
+        assert results["c"] == pytest.approx(0.0, abs=1e-6)
+        assert "b" in results
+
+    def test_dimension_mismatch(self):
+        """Test that embeddings of a different size are rejected."""
+        gallery = EmbeddingGallery()
+        gallery.add("a", [1.0, 0.0])
+        
+        with pytest.raises(ValueError):
+            gallery.add("b", [1.0, 0.0, 0.0])
@@ -0,0 +1,276 @@
+"""Tests for the in-process job queue and callback delivery."""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.jobs import (
+    COMPLETED, FAILED, QUEUED, JobFailed, JobQueue, QueueFull, callback_allowed, deliver_callback
+)
+
+
+class CallbackStub:
+    """Local HTTP server recording the JSON bodies POSTed to it."""
+
+    def __init__(self, status_code: int = 200):
+        self.received = []
+        self.status_code = status_code
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.received.append(json.loads(body))
+                self.send_response(stub.status_code)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/callback"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def callback_stub():
+    stub = CallbackStub()
+    yield stub
+    stub.close()
+
+
+async def wait_finished(queue: JobQueue, job_id: str, timeout: float = 5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        job = queue.get(job_id)
+        if job.status in (COMPLETED, FAILED) and (job.callback_url is None or job.callback is not None):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobQueue:
+    """Test job execution, bounding and result expiry."""
+
+    @pytest.mark.asyncio
+    async def test_job_completes_and_cleans_up(self):
+        """Test that a job's result is stored and its cleanup runs."""
+        queue = JobQueue(workers=1, max_queued=4, result_ttl=60)
+        cleanup = MagicMock()
+
+        async def run():
+            return {"status": "success"}
+
+        job = queue.submit(run, cleanup=cleanup)
+        assert job.status == QUEUED
+
+        job = await wait_finished(queue, job.id)
+        await queue.stop()
+
+        assert job.status == COMPLETED
+        assert job.result == {"status": "success"}
+        assert job.started_at >= job.submitted_at
+        cleanup.assert_called_once()
+        assert queue.stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_job_failures(self):
+        """Test that JobFailed keeps its status code and other errors become 500."""
+        queue = JobQueue(workers=2, max_queued=4, result_ttl=60)
+
+        async def rejected():
+            raise JobFailed(400, "Could not extract frames from video")
+
+        async def crashed():
+            raise RuntimeError("boom")
+
+        first = await wait_finished(queue, queue.submit(rejected).id)
+        second = await wait_finished(queue, queue.submit(crashed).id)
+        await queue.stop()
+
+        assert first.status == FAILED
+        assert first.error == {"status_code": 400, "detail": "Could not extract frames from video"}
+        assert second.error == {"status_code": 500, "detail": "boom"}
+        assert queue.stats()["failed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_queue_full(self):
+        """Test that submissions beyond max_queued are refused and cleaned up."""
+        queue = JobQueue(workers=1, max_queued=1, result_ttl=60)
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+            return {}
+
+        running = queue.submit(blocked)
+        await asyncio.sleep(0.01)
+        queue.submit(blocked)
+        cleanup = MagicMock()
+
+        with pytest.raises(QueueFull) as exc:
+            queue.submit(blocked, cleanup=cleanup)
+
+        assert exc.value.retry_after >= 1
+        cleanup.assert_called_once()
+        assert queue.stats()["queued"] == 1
+        assert queue.stats()["running"] == 1
+
+        release.set()
+        await wait_finished(queue, running.id)
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_results_expire(self):
+        """Test that finished jobs are dropped after result_ttl."""
+        queue = JobQueue(workers=1, max_queued=4, result_ttl=60)
+
+        async def run():
+            return {}
+
+        job = await wait_finished(queue, queue.submit(run).id)
+        await queue.stop()
+        job.finished_at -= 61
+
+        assert queue.get(job.id) is None
+
+    @pytest.mark.asyncio
+    async def test_callback_delivered(self, callback_stub):
+        """Test that the finished job is POSTed to its callback URL."""
+        queue = JobQueue(workers=1, max_queued=4, result_ttl=60)
+
+        async def run():
+            return {"status": "success"}
+
+        job = await wait_finished(queue, queue.submit(run, callback_url=callback_stub.url).id)
+        await queue.stop()
+
+        assert job.callback["delivered"] is True
+        assert job.callback["status_code"] == 200
+        assert callback_stub.received[0]["job_id"] == job.id
+        assert callback_stub.received[0]["status"] == COMPLETED
+        assert callback_stub.received[0]["result"] == {"status": "success"}
+
+
+    @pytest.mark.asyncio
+    async def test_slow_callback_does_not_hold_worker(self):
+        """Test that the worker takes the next job while a callback is still being delivered."""
+        queue = JobQueue(workers=1, max_queued=4, result_ttl=60)
+        delivering = threading.Event()
+        release = threading.Event()
+
+        def slow_delivery(url, payload, timeout, retries):
+            delivering.set()
+            release.wait(5)
+            return {"url": url, "delivered": True, "attempts": 1, "status_code": 200, "error": None}
+
+        async def run():
+            return {"status": "success"}
+
+        with patch('app.services.jobs.deliver_callback', side_effect=slow_delivery):
+            first = queue.submit(run, callback_url="http://hooks.example.com/cb")
+            second = await wait_finished(queue, queue.submit(run).id)
+
+            assert second.status == COMPLETED
+            assert first.status == COMPLETED
+            assert first.callback is None
+            assert queue.stats()["callbacks_pending"] == 1
+
+            release.set()
+            first = await wait_finished(queue, first.id)
+        await queue.stop()
+
+        assert delivering.is_set()
+        assert first.callback["delivered"] is True
+        assert queue.stats()["callbacks_pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_fails_running_jobs(self):
+        """Test that stop() fails in-flight jobs and a restarted queue still runs jobs."""
+        queue = JobQueue(workers=1, max_queued=4, result_ttl=60)
+        cleanup = MagicMock()
+
+        async def blocked():
+            await asyncio.Event().wait()
+
+        async def run():
+            return {"status": "success"}
+
+        job = queue.submit(blocked, cleanup=cleanup)
+        await asyncio.sleep(0.01)
+        await queue.stop()
+
+        assert job.status == FAILED
+        assert job.error == {"status_code": 503, "detail": "Server shut down before the job finished"}
+        assert job.finished_at is not None
+        cleanup.assert_called_once()
+        assert queue.stats()["running"] == 0
+        assert queue.stats()["failed"] == 1
+        assert queue._callback_pool is None
+
+        job = await wait_finished(queue, queue.submit(run).id)
+        await queue.stop()
+
+        assert job.status == COMPLETED
+
+
+class TestCallbacks:
+    """Test callback URL checks and delivery retries."""
+
+    def test_callback_allowed(self):
+        """Test that only http(s) URLs on allowed hosts are accepted."""
+        with patch('app.services.jobs.settings.job_callback_allowed_hosts', "hooks.example.com, 127.0.0.1"), \
+             patch('app.services.jobs.settings.job_callback_url', "https://results.example.com/done"):
+            assert callback_allowed("https://hooks.example.com/verify")
+            assert callback_allowed("http://127.0.0.1:9000/cb")
+            assert callback_allowed("https://results.example.com/other")
+            assert not callback_allowed("https://evil.example.com/cb")
+            assert not callback_allowed("file:///etc/passwd")
+            assert not callback_allowed("not a url")
+
+    def test_server_errors_are_retried(self):
+        """Test that 5xx answers are retried and reported as undelivered."""
+        stub = CallbackStub(status_code=503)
+        try:
+            with patch('app.services.jobs.time.sleep'):
+                outcome = deliver_callback(stub.url, {"job_id": "x"}, timeout=2, retries=2)
+        finally:
+            stub.close()
+
+        assert outcome["delivered"] is False
+        assert outcome["attempts"] == 3
+        assert outcome["status_code"] == 503
+        assert len(stub.received) == 3
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 4xx answer stops delivery."""
+        stub = CallbackStub(status_code=404)
+        try:
+            outcome = deliver_callback(stub.url, {"job_id": "x"}, timeout=2, retries=2)
+        finally:
+            stub.close()
+
+        assert outcome["attempts"] == 1
+        assert outcome["error"] == "HTTP 404"
+
+    def test_unreachable_url(self):
+        """Test that connection errors are reported, not raised."""
+        stub = CallbackStub()
+        url = stub.url
+        stub.close()
+
+        with patch('app.services.jobs.time.sleep'):
+            outcome = deliver_callback(url, {"job_id": "x"}, timeout=1, retries=1)
+
+        assert outcome["delivered"] is False
+        assert outcome["attempts"] == 2
+        assert outcome["error"]
@@ -0,0 +1,147 @@
+"""Tests for the asynchronous verification job endpoints."""
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.jobs import JobQueue
+from tests.test_jobs import CallbackStub
+
+MP4_HEADER = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00"
+VERIFIED = {
+    "status": "success",
+    "liveness": {"passed": True, "message": "Liveness verified", "details": {}},
+    "verification": {"verified": True, "distance": 0.3, "threshold": 0.5, "model": "Facenet512"}
+}
+
+
+def upload_files(video: bytes = MP4_HEADER + b"fake video"):
+    return {
+        "profile_image": ("profile.jpg", b"fake image", "image/jpeg"),
+        "live_video": ("video.mp4", video, "video/mp4")
+    }
+
+
+def poll(client, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(workers=1, max_queued=2, result_ttl=60)
+
+
+@pytest.fixture
+def client(queue):
+    with patch('app.main.settings.model_warmup_enabled', False), \
+         patch('app.routers.jobs.get_job_queue', return_value=queue), \
+         TestClient(app) as test_client:
+        yield test_client
+
+
+class TestJobsRouter:
+    """Test submitting and polling verification jobs."""
+
+    def test_submit_and_poll(self, client):
+        """Test that a submission returns 202 at once and the result can be polled."""
+        seen = {}
+
+        async def verify_profile(profile_path, live_video):
+            seen["profile"] = open(profile_path, "rb").read()
+            seen["video"] = await live_video.read()
+            seen["paths"] = profile_path
+            return VERIFIED
+
+        with patch('app.routers.jobs.verify_profile', side_effect=verify_profile):
+            response = client.post("/jobs/verify_identity", files=upload_files())
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+            assert response.json()["status"] == "queued"
+            assert response.headers["location"] == f"/jobs/{job_id}"
+
+            job = poll(client, job_id)
+
+        assert job["status"] == "completed"
+        assert job["result"]["verification"]["verified"] is True
+        assert job["error"] is None
+        assert seen["profile"] == b"fake image"
+        assert seen["video"].startswith(MP4_HEADER)
+        assert not os.path.exists(seen["paths"])
+
+    def test_failed_job_reports_error(self, client):
+        """Test that a pipeline rejection is stored as the job error."""
+        async def verify_profile(profile_path, live_video):
+            raise HTTPException(status_code=400, detail="Could not extract frames from video")
+
+        with patch('app.routers.jobs.verify_profile', side_effect=verify_profile):
+            job_id = client.post("/jobs/verify_identity", files=upload_files()).json()["job_id"]
+            job = poll(client, job_id)
+
+        assert job["status"] == "failed"
+        assert job["error"] == {"status_code": 400, "detail": "Could not extract frames from video"}
+
+    def test_callback_posted(self, client):
+        """Test that the finished job is POSTed to the requested callback URL."""
+        stub = CallbackStub()
+        try:
+            with patch('app.routers.jobs.verify_profile', return_value=VERIFIED), \
+                 patch('app.services.jobs.settings.job_callback_allowed_hosts', "127.0.0.1"):
+                response = client.post("/jobs/verify_identity", files=upload_files(), data={"callback_url": stub.url})
+                job_id = response.json()["job_id"]
+                deadline = time.monotonic() + 5
+                while not stub.received and time.monotonic() < deadline:
+                    time.sleep(0.02)
+        finally:
+            stub.close()
+
+        assert stub.received[0]["job_id"] == job_id
+        assert stub.received[0]["status"] == "completed"
+        assert stub.received[0]["result"]["status"] == "success"
+
+    def test_disallowed_callback(self, client):
+        """Test that callbacks to hosts that are not allowed are refused."""
+        response = client.post(
+            "/jobs/verify_identity", files=upload_files(), data={"callback_url": "http://169.254.169.254/latest"}
+        )
+
+        assert response.status_code == 400
+
+    def test_upload_checked_at_submit(self, client):
+        """Test that an unknown video container is rejected before queueing."""
+        response = client.post("/jobs/verify_identity", files=upload_files(video=b"not a video at all"))
+
+        assert response.status_code == 415
+
+    def test_queue_full(self, client, queue):
+        """Test that a full queue answers 503 with Retry-After."""
+        release = asyncio.Event()
+
+        async def verify_profile(profile_path, live_video):
+            await release.wait()
+            return VERIFIED
+
+        with patch('app.routers.jobs.verify_profile', side_effect=verify_profile):
+            accepted = [client.post("/jobs/verify_identity", files=upload_files()) for _ in range(3)]
+            rejected = client.post("/jobs/verify_identity", files=upload_files())
+            client.portal.call(release.set)
+            jobs = [poll(client, r.json()["job_id"]) for r in accepted]
+
+        assert [r.status_code for r in accepted] == [202, 202, 202]
+        assert rejected.status_code == 503
+        assert int(rejected.headers["retry-after"]) >= 1
+        assert [job["status"] for job in jobs] == ["completed"] * 3
+
+    def test_unknown_job(self, client):
+        """Test that unknown or expired job ids answer 404."""
+        assert client.get("/jobs/does-not-exist").status_code == 404
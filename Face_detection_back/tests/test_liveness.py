@@ -1,8 +1,35 @@
 """Unit tests for liveness detection service."""
 import numpy as np
+from contextlib import contextmanager
 from unittest.mock import patch, MagicMock
 import pytest
-from app.services.liveness import get_head_pose_yaw, check_liveness_pose
+from app.services.liveness import (
+    get_head_pose_yaw,
+    check_liveness_pose,
+    estimate_head_pose,
+    select_best_frame_index,
+    best_face_crop,
+    select_best_frame,
+    LivenessSession
+)
+from app.services.face_mesh_pool import FaceMeshPool
+from app.services.metrics import STAGE_SECONDS
+
+
+def pose(ratio):
+    """Builds a pose record as returned by estimate_head_pose."""
+    if ratio is None:
+        return None
+    return {"yaw_ratio": ratio, "face_box": {"x": 0, "y": 0, "w": 10, "h": 10}, "landmarks": {}}
+
+
+@contextmanager
+def patch_face_mesh():
+    """Serves a mock FaceMesh from the pool and yields its process method."""
+    mesh = MagicMock()
+    pool = FaceMeshPool(size=1, factory=lambda: mesh)
+    with patch('app.services.liveness.get_face_mesh_pool', return_value=pool):
+        yield mesh.process
 
 
 class TestLiveness:
@@ -11,7 +38,7 @@ class TestLiveness:
     def test_get_head_pose_yaw_with_valid_face(self):
         """Test head pose detection with valid face detection."""
         # Create a mock face mesh result
-        with patch('app.services.liveness.face_mesh.process') as mock_process:
+        with patch_face_mesh() as mock_process:
             mock_result = MagicMock()
             mock_landmark = MagicMock()
             
@@ -28,7 +55,7 @@ class TestLiveness:
             right_ear_landmark.x = 0.7
             right_ear_landmark.y = 0.5
             
-            landmarks = [None] * 455
+            landmarks = [MagicMock(x=0.5, y=0.5) for _ in range(455)]
             landmarks[1] = nose_landmark
             landmarks[234] = left_ear_landmark
             landmarks[454] = right_ear_landmark
@@ -45,7 +72,7 @@ class TestLiveness:
 
     def test_get_head_pose_yaw_no_face(self):
         """Test head pose when no face is detected."""
-        with patch('app.services.liveness.face_mesh.process') as mock_process:
+        with patch_face_mesh() as mock_process:
             mock_result = MagicMock()
             mock_result.multi_face_landmarks = None
             mock_process.return_value = mock_result
@@ -57,7 +84,7 @@ class TestLiveness:
 
     def test_get_head_pose_yaw_empty_landmarks(self):
         """Test head pose with empty face landmarks."""
-        with patch('app.services.liveness.face_mesh.process') as mock_process:
+        with patch_face_mesh() as mock_process:
             mock_result = MagicMock()
             mock_result.multi_face_landmarks = []
             mock_process.return_value = mock_result
@@ -71,8 +98,8 @@ class TestLiveness:
         """Test that check_liveness_pose returns a tuple."""
         frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
         
-        with patch('app.services.liveness.get_head_pose_yaw') as mock_yaw:
-            mock_yaw.side_effect = [1.0, 0.8, 0.3, 0.2]
+        with patch('app.services.liveness.estimate_head_pose') as mock_yaw:
+            mock_yaw.side_effect = [pose(1.0), pose(0.8), pose(0.3), pose(0.2)]
             
             result = check_liveness_pose(frames)
             
@@ -87,9 +114,9 @@ class TestLiveness:
         """Test liveness check with insufficient valid frames."""
         frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
         
-        with patch('app.services.liveness.get_head_pose_yaw') as mock_yaw:
+        with patch('app.services.liveness.estimate_head_pose') as mock_yaw:
             # Return only 1 valid frame
-            mock_yaw.side_effect = [None, None, 1.0, None]
+            mock_yaw.side_effect = [pose(None), pose(None), pose(1.0), pose(None)]
             
             is_live, message, details = check_liveness_pose(frames)
             
@@ -100,9 +127,9 @@ class TestLiveness:
         """Test liveness check with valid head movement."""
         frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
         
-        with patch('app.services.liveness.get_head_pose_yaw') as mock_yaw:
+        with patch('app.services.liveness.estimate_head_pose') as mock_yaw:
             # Simulate center (1.0) to left (<0.5) movement
-            mock_yaw.side_effect = [1.0, 0.9, 0.3, 0.2]
+            mock_yaw.side_effect = [pose(1.0), pose(0.9), pose(0.3), pose(0.2)]
             
             is_live, message, details = check_liveness_pose(frames)
             
@@ -114,9 +141,9 @@ class TestLiveness:
         """Test liveness check when face never in center."""
         frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
         
-        with patch('app.services.liveness.get_head_pose_yaw') as mock_yaw:
+        with patch('app.services.liveness.estimate_head_pose') as mock_yaw:
             # All ratios are too low (face not centered)
-            mock_yaw.side_effect = [0.3, 0.2, 0.4, 0.3]
+            mock_yaw.side_effect = [pose(0.3), pose(0.2), pose(0.4), pose(0.3)]
             
             is_live, message, details = check_liveness_pose(frames)
             
@@ -127,8 +154,8 @@ class TestLiveness:
         """Test liveness check when all frames return None."""
         frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
         
-        with patch('app.services.liveness.get_head_pose_yaw') as mock_yaw:
-            mock_yaw.side_effect = [None, None, None, None]
+        with patch('app.services.liveness.estimate_head_pose') as mock_yaw:
+            mock_yaw.side_effect = [pose(None), pose(None), pose(None), pose(None)]
             
             is_live, message, details = check_liveness_pose(frames)
             
@@ -139,10 +166,246 @@ class TestLiveness:
         """Test that liveness details contain ratio information."""
         frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
         
-        with patch('app.services.liveness.get_head_pose_yaw') as mock_yaw:
-            mock_yaw.side_effect = [1.0, 0.8, 0.3, 0.2]
+        with patch('app.services.liveness.estimate_head_pose') as mock_yaw:
+            mock_yaw.side_effect = [pose(1.0), pose(0.8), pose(0.3), pose(0.2)]
             
             is_live, message, details = check_liveness_pose(frames)
             
             assert "ratios" in details
             assert isinstance(details["ratios"], list)
+
+    def test_check_liveness_pose_checkout_per_frame(self):
+        """Test that FaceMesh is checked out per frame and reused from the pool."""
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(4)]
+        pool = FaceMeshPool(size=2, factory=MagicMock)
+        checkouts = STAGE_SECONDS.count(stage="face_mesh_wait")
+        
+        with patch('app.services.liveness.get_face_mesh_pool', return_value=pool), \
+             patch('app.services.liveness.estimate_head_pose') as mock_yaw:
+            mock_yaw.side_effect = [pose(1.0), pose(0.8), pose(0.3), pose(0.2)]
+            
+            check_liveness_pose(frames)
+            
+            meshes = {id(call.args[1]) for call in mock_yaw.call_args_list}
+            assert len(meshes) == 1
+            assert STAGE_SECONDS.count(stage="face_mesh_wait") == checkouts + mock_yaw.call_count
+
+    def test_check_liveness_pose_releases_face_mesh_during_decode(self):
+        """Test that no FaceMesh instance is held while the next frame is decoded."""
+        pool = FaceMeshPool(size=1, factory=MagicMock)
+        in_use = []
+        
+        def decode():
+            for _ in range(4):
+                in_use.append(pool.stats()["in_use"])
+                yield np.zeros((480, 640, 3), dtype=np.uint8)
+        
+        with patch('app.services.liveness.get_face_mesh_pool', return_value=pool), \
+             patch('app.services.liveness.estimate_head_pose') as mock_yaw:
+            mock_yaw.side_effect = [pose(1.0), pose(0.8), pose(0.3), pose(0.2)]
+            
+            check_liveness_pose(decode())
+            
+            assert in_use and set(in_use) == {0}
+
+
+class TestPoseRecords:
+    """Test cases for per-frame pose records."""
+
+    def _mock_result(self, count=478):
+        landmarks = [MagicMock(x=0.4 + 0.2 * (i % 2), y=0.3 + 0.4 * (i % 3 == 0)) for i in range(count)]
+        landmarks[1] = MagicMock(x=0.5, y=0.5)
+        landmarks[234] = MagicMock(x=0.3, y=0.5)
+        landmarks[454] = MagicMock(x=0.7, y=0.5)
+        result = MagicMock()
+        result.multi_face_landmarks = [MagicMock(landmark=landmarks)]
+        return result
+
+    def test_estimate_head_pose_record(self):
+        """Test that one FaceMesh pass yields yaw, face box and landmarks."""
+        with patch_face_mesh() as mock_process:
+            mock_process.return_value = self._mock_result()
+            
+            record = estimate_head_pose(np.zeros((100, 200, 3), dtype=np.uint8))
+            
+            assert record["yaw_ratio"] == pytest.approx(1.0)
+            assert record["face_box"] == {"x": 60, "y": 30, "w": 80, "h": 40}
+            assert record["landmarks"]["nose"] == [100.0, 50.0]
+            assert set(record["landmarks"]) == {"nose", "left_ear", "right_ear", "left_eye", "right_eye"}
+            assert mock_process.call_count == 1
+
+    def test_estimate_head_pose_on_analysis_copy(self):
+        """Test that FaceMesh sees a downscaled copy but coordinates stay in full resolution."""
+        with patch_face_mesh() as mock_process:
+            mock_process.return_value = self._mock_result()
+            
+            with patch('app.services.frame_prep.settings.liveness_analysis_max_side', 100):
+                record = estimate_head_pose(np.zeros((1000, 2000, 3), dtype=np.uint8))
+            
+            assert mock_process.call_args.args[0].shape == (50, 100, 3)
+            assert record["face_box"] == {"x": 600, "y": 300, "w": 800, "h": 400}
+            assert record["landmarks"]["nose"] == [1000.0, 500.0]
+            assert record["yaw_ratio"] == pytest.approx(1.0)
+
+    def test_estimate_head_pose_without_refined_landmarks(self):
+        """Test that eye points are omitted when iris landmarks are missing."""
+        with patch_face_mesh() as mock_process:
+            mock_process.return_value = self._mock_result(count=468)
+            
+            record = estimate_head_pose(np.zeros((100, 200, 3), dtype=np.uint8))
+            
+            assert "left_eye" not in record["landmarks"]
+
+    def test_check_liveness_pose_exposes_poses(self):
+        """Test that liveness details carry one pose record per frame."""
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(3)]
+        
+        with patch('app.services.liveness.estimate_head_pose') as mock_pose:
+            mock_pose.side_effect = [pose(1.0), None, pose(0.3)]
+            
+            is_live, message, details = check_liveness_pose(frames)
+            
+            assert len(details["poses"]) == 3
+            assert details["poses"][1] is None
+            assert details["ratios"] == [1.0, None, 0.3]
+            assert mock_pose.call_count == 3
+
+    def test_select_best_frame_index(self):
+        """Test picking the frame closest to a frontal pose."""
+        assert select_best_frame_index([pose(0.3), pose(1.3), pose(0.9), None]) == 2
+
+    def test_select_best_frame_index_stops_at_frontal(self):
+        """Test that the first clearly frontal frame wins."""
+        assert select_best_frame_index([pose(1.1), pose(1.0)]) == 0
+
+    def test_select_best_frame_index_no_faces(self):
+        """Test that the first frame is used when no face was found."""
+        assert select_best_frame_index([None, None]) == 0
+        assert select_best_frame_index([]) == 0
+
+    def test_best_face_crop(self):
+        """Test that the best frame is cropped around its face box."""
+        frames = [np.zeros((400, 300, 3), dtype=np.uint8) for _ in range(2)]
+        frames[1][:] = 7
+        poses = [pose(0.3), {"yaw_ratio": 1.0, "face_box": {"x": 100, "y": 100, "w": 50, "h": 60}, "landmarks": {}}]
+        
+        crop = best_face_crop(frames, poses)
+        
+        assert crop.shape[0] < 400 and crop.shape[1] < 300
+        assert crop.shape[0] >= 60 and crop.shape[1] >= 60
+        assert np.all(crop == 7)
+
+    def test_select_best_frame_returns_full_frame_and_pose(self):
+        """Test that the best frame is returned uncropped with its pose."""
+        frames = [np.zeros((40, 30, 3), dtype=np.uint8) for _ in range(2)]
+        poses = [pose(0.3), pose(1.0)]
+        
+        frame, best = select_best_frame(frames, poses)
+        
+        assert frame is frames[1]
+        assert best is poses[1]
+        assert select_best_frame(frames, []) == (frames[0], None)
+
+    def test_best_face_crop_without_poses(self):
+        """Test that the first whole frame is used when no face was found."""
+        frames = [np.zeros((40, 30, 3), dtype=np.uint8)]
+        
+        assert best_face_crop(frames, []) is frames[0]
+
+
+class TestLivenessSession:
+    """Test cases for incremental liveness evaluation."""
+
+    def test_passes_as_soon_as_turn_is_seen(self):
+        """Test the session settles on the first frame that completes the challenge."""
+        session = LivenessSession(expected_frames=4)
+        
+        assert session.add(pose(1.0)) is None
+        assert session.add(pose(0.3)) is True
+        assert session.done
+        
+        is_live, message, details = session.result()
+        assert is_live is True
+        assert details["ratios"] == [1.0, 0.3]
+
+    def test_fails_when_too_few_frames_remain(self):
+        """Test the session gives up once the minimum valid frames is out of reach."""
+        session = LivenessSession(expected_frames=4)
+        
+        assert session.add(None) is None
+        assert session.add(None) is None
+        assert session.add(None) is False
+        assert session.result()[0] is False
+
+    def test_unknown_length_never_fails_early(self):
+        """Test a session without a frame budget only settles on a pass."""
+        session = LivenessSession()
+        
+        for _ in range(10):
+            assert session.add(None) is None
+        assert session.result()[0] is False
+
+    def test_early_verdict_matches_full_evaluation(self):
+        """Test stopping early never changes the verdict or message."""
+        rng = np.random.default_rng(0)
+        choices = [None, 0.2, 0.45, 0.55, 0.9, 1.0, 1.2, 1.6, 2.5]
+        
+        for _ in range(300):
+            ratios = [choices[i] for i in rng.integers(0, len(choices), size=4)]
+            
+            full = LivenessSession()
+            for r in ratios:
+                full.add(pose(r))
+            
+            early = LivenessSession(expected_frames=len(ratios))
+            for r in ratios:
+                if early.add(pose(r)) is not None:
+                    break
+            
+            assert early.result()[0] == full.result()[0]
+            if early.result()[0]:
+                assert early.result()[1] == full.result()[1]
+
+    def test_check_liveness_stops_pulling_frames(self):
+        """Test that frames after a settled outcome are never pulled from the iterator."""
+        pulled = []
+        
+        def stream():
+            for i in range(4):
+                pulled.append(i)
+                yield np.zeros((8, 8, 3), dtype=np.uint8)
+        
+        with patch('app.services.liveness.estimate_head_pose') as mock_pose:
+            mock_pose.side_effect = [pose(1.0), pose(0.3), pose(1.0), pose(1.0)]
+            
+            is_live, message, details = check_liveness_pose(stream())
+        
+        assert is_live is True
+        assert pulled == [0, 1]
+        assert mock_pose.call_count == 2
+        assert len(details["poses"]) == 2
+
+    def test_check_liveness_reports_ratios_to_sampler(self):
+        """Test yaw ratios are passed back to a sampler until the outcome is settled."""
+        class Sampler:
+            def __init__(self):
+                self.frames = iter([np.zeros((8, 8, 3), dtype=np.uint8)] * 3)
+                self.reports = []
+
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                return next(self.frames)
+
+            def report(self, ratio):
+                self.reports.append(ratio)
+        
+        sampler = Sampler()
+        with patch('app.services.liveness.estimate_head_pose') as mock_pose:
+            mock_pose.side_effect = [pose(1.0), None, pose(0.3)]
+            
+            is_live, message, details = check_liveness_pose(sampler)
+        
+        assert is_live is True
+        assert sampler.reports == [1.0, None]
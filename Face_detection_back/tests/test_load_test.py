@@ -0,0 +1,100 @@
+"""Tests for the load-test tool."""
+import argparse
+import httpx
+import pytest
+from fastapi import FastAPI, File, Response, UploadFile
+from tools.load_test import calibration, load_corpus, parse_server_timing, report, run
+
+
+def build_app():
+    app = FastAPI()
+    calls = {"n": 0}
+
+    @app.post("/verify_identity")
+    async def verify(response: Response, profile_image: UploadFile = File(...), live_video: UploadFile = File(...)):
+        calls["n"] += 1
+        response.headers["server-timing"] = 'embedding;dur=80.0, frames_decoded;desc="4", total;dur=120.5'
+        if calls["n"] % 4 == 0:
+            response.status_code = 500
+            return {"status": "error"}
+        return {"status": "success"}
+
+    return app
+
+
+class TestHelpers:
+    """Test cases for corpus loading, header parsing and calibration."""
+
+    def test_load_corpus_pairs_by_name(self, tmp_path):
+        """Test that videos pair with a same-named image, falling back to profile.jpg."""
+        for name in ("alice.mp4", "alice.jpg", "bob.mov", "profile.jpg", "notes.txt"):
+            (tmp_path / name).write_bytes(b"x")
+
+        pairs = load_corpus(str(tmp_path))
+
+        assert [tuple(p.rsplit("/", 1)[1] for p in pair) for pair in pairs] == [
+            ("alice.jpg", "alice.mp4"),
+            ("profile.jpg", "bob.mov")
+        ]
+
+    def test_load_corpus_missing_profile(self, tmp_path):
+        """Test that an unpaired video is reported."""
+        (tmp_path / "alice.mp4").write_bytes(b"x")
+
+        with pytest.raises(ValueError):
+            load_corpus(str(tmp_path))
+
+    def test_parse_server_timing(self):
+        """Test that durations are read and desc-only entries skipped."""
+        timings = parse_server_timing('video_decode;dur=41.2, face_mesh;dur=12.8;desc="x5", frames_decoded;desc="6"')
+
+        assert timings == {"video_decode": 41.2, "face_mesh": 12.8}
+
+    def test_calibration(self):
+        """Test that fake model costs are derived from single-caller benchmark stages."""
+        bench = {"results": [
+            {"benchmark": "liveness", "concurrency": 1, "stages_ms": {"face_mesh": 20.0}, "counts": {"frames_analyzed": 4}},
+            {"benchmark": "verify_faces", "concurrency": 1, "stages_ms": {"embedding": 90.0, "profile_embedding": 120.0}, "counts": {}}
+        ]}
+
+        assert calibration(bench) == {"FAKE_FACE_MESH_MS": 5.0, "FAKE_EMBEDDING_MS": 90.0, "FAKE_DETECTOR_MS": 30.0}
+
+
+class TestReport:
+    """Test cases for load-test reporting."""
+
+    def test_error_rate_and_percentiles(self):
+        """Test that transport errors and non-2xx responses count as errors."""
+        records = [
+            {"status_code": 200, "status": "success", "error": None, "latency_ms": 100.0, "server_timing": {"total": 90.0}},
+            {"status_code": 200, "status": "failed", "error": None, "latency_ms": 200.0, "server_timing": {"total": 190.0}},
+            {"status_code": 503, "status": None, "error": None, "latency_ms": 5.0, "server_timing": {}},
+            {"status_code": None, "status": None, "error": "ReadTimeout", "latency_ms": 1000.0, "server_timing": {}}
+        ]
+
+        summary = report(records, 2.0)
+
+        assert summary["error_rate"] == 0.5
+        assert summary["throughput_per_s"] == 1.0
+        assert summary["latency_ms"]["max"] == 200.0
+        assert summary["status_codes"] == {"200": 2, "503": 1}
+        assert summary["outcomes"] == {"success": 1, "failed": 1}
+        assert summary["transport_errors"] == {"ReadTimeout": 1}
+        assert summary["server_timing_ms"] == {"total": 140.0}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("rps", [None, 50.0])
+    async def test_run_against_app(self, rps):
+        """Test closed- and open-loop runs against an in-process server."""
+        args = argparse.Namespace(
+            url="http://test", path="/verify_identity", corpus=None, resolution="64x96",
+            concurrency=2, rps=rps, poisson=False, duration=5.0, requests=8, timeout=10.0
+        )
+
+        summary = await run(args, transport=httpx.ASGITransport(app=build_app()))
+
+        assert summary["requests"] == 8
+        assert summary["status_codes"] == {"200": 6, "500": 2}
+        assert summary["error_rate"] == 0.25
+        assert summary["server_timing_ms"]["embedding"] == 80.0
+        assert summary["config"]["mode"] == ("open" if rps else "closed")
@@ -1,7 +1,10 @@
 """Tests for main FastAPI application."""
+import threading
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services.warmup import ModelWarmup
 
 
 @pytest.fixture
@@ -62,3 +65,75 @@ class TestHealthEndpoints:
         
         assert root_response["version"] == health_response["version"]
         assert root_response["status"] == health_response["status"]
+
+
+class TestReadinessEndpoint:
+    """Test the model readiness endpoint."""
+
+    def test_not_ready_while_loading(self, client):
+        """Test that /ready answers 503 with per-model state while warm-up runs."""
+        release = threading.Event()
+        warmup = ModelWarmup()
+        warmup.register("face_embedding", lambda: release.wait(5))
+        warmup.start()
+        
+        try:
+            with patch('app.main.get_model_warmup', return_value=warmup):
+                response = client.get("/ready")
+                health = client.get("/health")
+        finally:
+            release.set()
+        
+        assert response.status_code == 503
+        assert response.json()["status"] == "loading"
+        assert response.json()["models"]["face_embedding"]["state"] == "loading"
+        assert health.status_code == 200
+
+    def test_ready_after_warmup(self, client):
+        """Test that /ready answers 200 once every model is loaded."""
+        warmup = ModelWarmup()
+        warmup.register("face_mesh", lambda: None)
+        warmup.start()
+        warmup.wait("face_mesh", timeout=5)
+        
+        with patch('app.main.get_model_warmup', return_value=warmup):
+            response = client.get("/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["models"]["face_mesh"]["state"] == "ready"
+
+    def test_ready_when_warmup_disabled(self, client):
+        """Test that lazy loading mode always reports ready."""
+        warmup = ModelWarmup()
+        warmup.register("face_mesh", lambda: None)
+        
+        with patch('app.main.get_model_warmup', return_value=warmup), \
+             patch('app.main.settings.model_warmup_enabled', False):
+            response = client.get("/ready")
+        
+        assert response.status_code == 200
+
+
+class TestMetricsEndpoint:
+    """Test the Prometheus metrics endpoint."""
+
+    def test_metrics_text_format(self, client):
+        """Test that stage, outcome and gauge metrics are exposed as plain text."""
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE face_verify_stage_seconds histogram" in response.text
+        assert "# TYPE face_verify_outcomes_total counter" in response.text
+        assert "face_verify_in_flight_requests " in response.text
+        assert "face_verify_executor_queue_depth " in response.text
+        assert "face_verify_job_queue_depth " in response.text
+        assert "face_verify_admission_queued " in response.text
+
+    def test_metrics_disabled(self, client):
+        """Test that the endpoint can be turned off."""
+        with patch('app.main.settings.metrics_enabled', False):
+            response = client.get("/metrics")
+        
+        assert response.status_code == 404
@@ -0,0 +1,111 @@
+"""Unit tests for the Prometheus-style metrics."""
+import pytest
+from app.services.metrics import Counter, Gauge, Histogram, MetricsRegistry, track_request, REQUEST_SECONDS, IN_FLIGHT
+
+
+class TestHistogram:
+    """Test cases for Histogram."""
+
+    def test_buckets_are_cumulative(self):
+        """Test that each bucket counts every observation at or below its bound."""
+        histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        lines = histogram.render().splitlines()
+
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_sum 3.65" in lines
+        assert "latency_seconds_count 4" in lines
+
+    def test_labelled_series(self):
+        """Test that each label value gets its own series."""
+        histogram = Histogram("stage_seconds", "Stages.", labelnames=("stage",), buckets=(1.0,))
+        histogram.observe(0.5, stage="decode")
+        histogram.observe(0.5, stage="embedding")
+        histogram.observe(2.0, stage="embedding")
+
+        assert histogram.count(stage="decode") == 1
+        assert histogram.count(stage="embedding") == 2
+        assert 'stage_seconds_bucket{stage="embedding",le="1"} 1' in histogram.render()
+
+    def test_wrong_labels_rejected(self):
+        """Test that observing with missing or unknown labels raises."""
+        histogram = Histogram("stage_seconds", "Stages.", labelnames=("stage",))
+
+        with pytest.raises(ValueError):
+            histogram.observe(1.0)
+
+    def test_time_records_on_exception(self):
+        """Test that a failing block is still timed."""
+        histogram = Histogram("block_seconds", "Blocks.")
+
+        with pytest.raises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError("boom")
+
+        assert histogram.count() == 1
+
+
+class TestCounterAndGauge:
+    """Test cases for Counter and Gauge."""
+
+    def test_counter_by_label(self):
+        """Test that counters accumulate per label value."""
+        counter = Counter("outcomes_total", "Outcomes.", labelnames=("outcome",))
+        counter.inc(outcome="verified")
+        counter.inc(outcome="verified")
+        counter.inc(outcome="error")
+
+        assert counter.value(outcome="verified") == 2
+        assert 'outcomes_total{outcome="error"} 1' in counter.render()
+
+    def test_callback_gauge_read_at_render(self):
+        """Test that a function gauge reports the current value."""
+        depth = [3]
+        gauge = Gauge("queue_depth", "Depth.", function=lambda: depth[0])
+        depth[0] = 5
+
+        assert "queue_depth 5" in gauge.render().splitlines()
+
+    def test_label_values_escaped(self):
+        """Test that quotes in label values do not break the format."""
+        counter = Counter("odd_total", "Odd.", labelnames=("name",))
+        counter.inc(name='a"b')
+
+        assert 'odd_total{name="a\\"b"} 1' in counter.render()
+
+
+class TestRegistry:
+    """Test cases for MetricsRegistry and request tracking."""
+
+    def test_render_has_help_and_type(self):
+        """Test the text exposition layout."""
+        registry = MetricsRegistry()
+        registry.register(Counter("a_total", "A things."))
+
+        text = registry.render()
+
+        assert text.startswith("# HELP a_total A things.\n# TYPE a_total counter\n")
+        assert text.endswith("\n")
+
+    def test_duplicate_names_rejected(self):
+        """Test that a metric name can only be registered once."""
+        registry = MetricsRegistry()
+        registry.register(Counter("a_total", "A."))
+
+        with pytest.raises(ValueError):
+            registry.register(Counter("a_total", "A again."))
+
+    def test_track_request(self):
+        """Test that a tracked request is in flight while running and timed afterwards."""
+        before = REQUEST_SECONDS.count()
+
+        with track_request():
+            in_flight = IN_FLIGHT.value()
+
+        assert in_flight >= 1
+        assert IN_FLIGHT.value() == in_flight - 1
+        assert REQUEST_SECONDS.count() == before + 1
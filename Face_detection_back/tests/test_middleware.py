@@ -0,0 +1,206 @@
+"""Tests for the request size limit, timing and admission check middleware."""
+import json
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.middleware import AdmissionCheckMiddleware, RequestSizeLimitMiddleware, RequestTimingMiddleware, max_request_bytes
+from app.services.admission import AdmissionController
+from app.services.tracing import record_count, record_span
+
+
+def build_app(limit):
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_body_bytes=limit)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return app
+
+
+class TestRequestSizeLimit:
+    """Test cases for RequestSizeLimitMiddleware."""
+
+    def test_accepts_small_body(self):
+        """Test bodies under the limit reach the endpoint."""
+        client = TestClient(build_app(10_000))
+
+        response = client.post("/upload", files={"file": ("a.bin", b"x" * 100)})
+
+        assert response.status_code == 200
+        assert response.json()["size"] == 100
+
+    def test_rejects_declared_oversized_body(self):
+        """Test a Content-Length over the limit is answered with 413."""
+        client = TestClient(build_app(1_000))
+
+        response = client.post("/upload", files={"file": ("a.bin", b"x" * 5_000)})
+
+        assert response.status_code == 413
+
+    def test_rejects_streamed_oversized_body(self):
+        """Test a chunked body without Content-Length is cut off at the limit."""
+        client = TestClient(build_app(1_000))
+        boundary = "limit-test"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.bin\"\r\n\r\n".encode()
+            + b"x" * 5_000
+            + f"\r\n--{boundary}--\r\n".encode()
+        )
+
+        def chunks():
+            for i in range(0, len(body), 512):
+                yield body[i:i + 512]
+
+        response = client.post(
+            "/upload",
+            content=chunks(),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+
+        assert response.status_code == 413
+
+    def test_default_limit_covers_both_uploads(self):
+        """Test the default limit allows a maximum image plus a maximum video."""
+        from app.config import get_settings
+        settings = get_settings()
+
+        assert max_request_bytes() > settings.upload_max_image_bytes + settings.upload_max_video_bytes
+
+
+def build_timed_app():
+    app = FastAPI()
+    app.add_middleware(RequestTimingMiddleware)
+
+    @app.get("/pipeline")
+    async def pipeline():
+        record_span("video_decode", 0.02)
+        record_count("frames_decoded", 4)
+        return {"ok": True}
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    return app
+
+
+class TestRequestTiming:
+    """Test cases for RequestTimingMiddleware."""
+
+    def test_server_timing_header(self):
+        """Test that recorded spans and counts are reported in Server-Timing."""
+        client = TestClient(build_timed_app())
+
+        response = client.get("/pipeline")
+
+        header = response.headers["server-timing"]
+        assert "video_decode;dur=20.0" in header
+        assert 'frames_decoded;desc="4"' in header
+        assert "total;dur=" in header
+
+    def test_no_header_without_spans(self):
+        """Test that requests that recorded nothing are left alone."""
+        client = TestClient(build_timed_app())
+
+        response = client.get("/plain")
+
+        assert "server-timing" not in response.headers
+
+    def test_header_can_be_disabled(self):
+        """Test SERVER_TIMING_ENABLED=false keeps timings out of responses."""
+        client = TestClient(build_timed_app())
+
+        with patch('app.middleware.settings.server_timing_enabled', False):
+            response = client.get("/pipeline")
+
+        assert "server-timing" not in response.headers
+
+    def test_structured_log_line(self):
+        """Test that each traced request logs one JSON timing record."""
+        client = TestClient(build_timed_app())
+
+        with patch('app.middleware.logger') as mock_logger:
+            client.get("/pipeline")
+
+        message = mock_logger.info.call_args.args[0]
+        assert message.startswith("request_timing ")
+        record = json.loads(message[len("request_timing "):])
+        assert record["path"] == "/pipeline"
+        assert record["status"] == 200
+        assert record["counts"] == {"frames_decoded": 4}
+
+
+def build_admission_app():
+    app = FastAPI()
+    app.add_middleware(AdmissionCheckMiddleware)
+    received = []
+
+    @app.post("/verify_identity")
+    async def verify(file: UploadFile = File(...)):
+        received.append(await file.read())
+        return {"ok": True}
+
+    @app.post("/enroll")
+    async def enroll(file: UploadFile = File(...)):
+        return {"ok": True}
+
+    return app, received
+
+
+def saturated_controller():
+    """One busy slot and a full queue of zero."""
+    controller = AdmissionController(max_concurrent=1, max_queued=0, max_wait=5)
+    controller._active = 1
+    controller._service_seconds = 2.5
+    return controller
+
+
+class TestAdmissionCheck:
+    """Test cases for AdmissionCheckMiddleware."""
+
+    def test_sheds_before_body_is_read(self):
+        """Test that an overloaded server answers at once with Retry-After."""
+        app, received = build_admission_app()
+        client = TestClient(app)
+
+        with patch('app.middleware.get_admission_controller', return_value=saturated_controller()):
+            response = client.post("/verify_identity", files={"file": ("a.bin", b"x" * 100)})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert response.json()["error_code"] == "OVERLOADED"
+        assert received == []
+
+    def test_reject_status_configurable(self):
+        """Test that shed requests can be answered with 429."""
+        app, _ = build_admission_app()
+        client = TestClient(app)
+
+        with patch('app.middleware.get_admission_controller', return_value=saturated_controller()), \
+             patch('app.services.admission.settings.admission_reject_status', 429):
+            response = client.post("/verify_identity", files={"file": ("a.bin", b"x")})
+
+        assert response.status_code == 429
+
+    def test_other_routes_not_checked(self):
+        """Test that only verification routes are shed."""
+        app, _ = build_admission_app()
+        client = TestClient(app)
+
+        with patch('app.middleware.get_admission_controller', return_value=saturated_controller()):
+            response = client.post("/enroll", files={"file": ("a.bin", b"x")})
+
+        assert response.status_code == 200
+
+    def test_admits_when_idle(self):
+        """Test that requests pass through when a slot is free."""
+        app, received = build_admission_app()
+        client = TestClient(app)
+
+        with patch('app.middleware.get_admission_controller', return_value=AdmissionController(1, 0, 5)):
+            response = client.post("/verify_identity", files={"file": ("a.bin", b"abc")})
+
+        assert response.status_code == 200
+        assert received == [b"abc"]
@@ -6,6 +6,7 @@ from app.models import (
     VerificationResult,
     VerificationResponse,
     ErrorResponse,
+    EnrollmentResponse,
     HealthResponse
 )
 
@@ -144,6 +145,22 @@ class TestVerificationResponse:
         assert response.verification.verified is False
 
 
+class TestEnrollmentResponse:
+    """Test cases for EnrollmentResponse model."""
+
+    def test_enrollment_response(self):
+        """Test enrollment response."""
+        response = EnrollmentResponse(
+            status="enrolled",
+            user_id="alice",
+            model="Facenet512"
+        )
+        
+        assert response.status == "enrolled"
+        assert response.user_id == "alice"
+        assert response.message is None
+
+
 class TestErrorResponse:
     """Test cases for ErrorResponse model."""
 
@@ -0,0 +1,146 @@
+"""Tests for the streaming verification WebSocket."""
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from tests.test_streaming import JPEG, pose
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def embeddings():
+    with patch('app.services.streaming.get_profile_embedding', return_value=[1.0, 0.0]), \
+         patch('app.services.streaming.get_face_embedding', return_value=np.array([1.0, 0.0], np.float32)):
+        yield
+
+
+class TestStreamRouter:
+    """Test the /verify_identity/stream protocol."""
+
+    def test_result_sent_once_live(self, embeddings):
+        """Test that frames are acknowledged and the result arrives as soon as liveness passes."""
+        poses = [pose(1.0), pose(1.1), pose(2.0)]
+        with patch('app.services.streaming.estimate_head_pose', side_effect=poses), \
+             client.websocket_connect("/verify_identity/stream") as ws:
+            ws.send_bytes(b"profile bytes")
+            events = []
+            for _ in poses:
+                ws.send_bytes(JPEG)
+                events.append(ws.receive_json())
+            result = ws.receive_json()
+            with pytest.raises(WebSocketDisconnect):
+                ws.receive_json()
+
+        assert [e["index"] for e in events] == [0, 1, 2]
+        assert events[-1]["live"] is True
+        assert result["type"] == "result"
+        assert result["status"] == "success"
+        assert result["liveness"]["passed"] is True
+        assert result["verification"]["verified"] is True
+
+    def test_end_without_turn(self, embeddings):
+        """Test that ending the stream before a head turn returns a liveness failure."""
+        with patch('app.services.streaming.estimate_head_pose', return_value=pose(1.0)), \
+             client.websocket_connect("/verify_identity/stream") as ws:
+            ws.send_bytes(b"profile bytes")
+            ws.send_bytes(JPEG)
+            ws.receive_json()
+            ws.send_json({"type": "end"})
+            result = ws.receive_json()
+
+        assert result["type"] == "result"
+        assert result["status"] == "failed"
+        assert result["liveness"]["passed"] is False
+
+    def test_enrolled_user(self, embeddings):
+        """Test that ?user_id= uses the enrolled template and needs no profile image."""
+        store = MagicMock()
+        store.get.return_value = np.array([1.0, 0.0], np.float32)
+        with patch('app.routers.stream.get_template_store', return_value=store), \
+             patch('app.services.streaming.estimate_head_pose', side_effect=[pose(1.0), pose(2.0)]), \
+             client.websocket_connect("/verify_identity/stream?user_id=alice") as ws:
+            ws.send_bytes(JPEG)
+            ws.receive_json()
+            ws.send_bytes(JPEG)
+            ws.receive_json()
+            result = ws.receive_json()
+
+        store.get.assert_called_once_with("alice")
+        assert result["verification"]["verified"] is True
+
+    def test_unknown_user(self):
+        """Test that an unknown user id is answered with an error event."""
+        store = MagicMock()
+        store.get.return_value = None
+        store.needs_reenrollment.return_value = False
+        with patch('app.routers.stream.get_template_store', return_value=store), \
+             client.websocket_connect("/verify_identity/stream?user_id=bob") as ws:
+            error = ws.receive_json()
+
+        assert error == {"type": "error", "status_code": 404, "detail": "User 'bob' is not enrolled"}
+
+    def test_stale_template(self):
+        """Test that a template from another embedding model asks for re-enrollment."""
+        store = MagicMock()
+        store.get.return_value = None
+        store.needs_reenrollment.return_value = True
+        with patch('app.routers.stream.get_template_store', return_value=store), \
+             client.websocket_connect("/verify_identity/stream?user_id=bob") as ws:
+            error = ws.receive_json()
+
+        assert error["status_code"] == 409
+
+    def test_oversized_frame(self, embeddings):
+        """Test that frames over STREAM_MAX_FRAME_BYTES end the stream."""
+        with patch('app.routers.stream.settings.stream_max_frame_bytes', 10), \
+             client.websocket_connect("/verify_identity/stream") as ws:
+            ws.send_bytes(b"profile bytes")
+            ws.send_bytes(JPEG)
+            error = ws.receive_json()
+
+        assert error["status_code"] == 413
+
+    def test_missing_profile(self):
+        """Test that a stream must start with the profile image."""
+        with client.websocket_connect("/verify_identity/stream") as ws:
+            ws.send_json({"type": "end"})
+            error = ws.receive_json()
+
+        assert error["status_code"] == 400
+
+    @pytest.mark.parametrize("text", ['{"type": "pause"}', '{}', '"end"', '[1]', 'end'])
+    def test_malformed_control_message(self, embeddings, text):
+        """Test that every text message other than {"type": "end"} is rejected the same way."""
+        with client.websocket_connect("/verify_identity/stream") as ws:
+            ws.send_bytes(b"profile bytes")
+            ws.send_text(text)
+            error = ws.receive_json()
+
+        assert error == {"type": "error", "status_code": 400, "detail": 'Text messages must be {"type": "end"}'}
+
+    def test_idle_timeout(self):
+        """Test that a silent client is timed out."""
+        with patch('app.routers.stream.settings.stream_idle_timeout_seconds', 0.05), \
+             client.websocket_connect("/verify_identity/stream") as ws:
+            error = ws.receive_json()
+
+        assert error["status_code"] == 408
+
+    def test_frame_limit(self, embeddings):
+        """Test that the verdict is given after STREAM_MAX_FRAMES frames."""
+        with patch('app.routers.stream.settings.stream_max_frames', 2), \
+             patch('app.services.streaming.estimate_head_pose', return_value=pose(1.0)), \
+             client.websocket_connect("/verify_identity/stream") as ws:
+            ws.send_bytes(b"profile bytes")
+            for _ in range(2):
+                ws.send_bytes(JPEG)
+                ws.receive_json()
+            result = ws.receive_json()
+
+        assert result["type"] == "result"
+        assert result["liveness"]["passed"] is False
@@ -0,0 +1,117 @@
+"""Tests for streaming liveness and speculative embedding."""
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.streaming import StreamingVerification, analyze_frame
+
+JPEG = cv2.imencode(".jpg", np.zeros((64, 48, 3), np.uint8))[1].tobytes()
+
+
+def pose(yaw_ratio):
+    return {"yaw_ratio": yaw_ratio, "face_box": {"x": 0, "y": 0, "w": 48, "h": 64}, "landmarks": {}}
+
+
+class TestAnalyzeFrame:
+    """Test decoding and pose estimation of one streamed frame."""
+
+    def test_decodes_jpeg(self):
+        """Test that a JPEG is decoded to RGB and passed to FaceMesh."""
+        with patch('app.services.streaming.estimate_head_pose', return_value=pose(1.0)) as mock_pose:
+            frame, result = analyze_frame(JPEG)
+
+        assert frame.shape == (64, 48, 3)
+        assert result["yaw_ratio"] == 1.0
+        mock_pose.assert_called_once()
+
+    def test_undecodable_bytes(self):
+        """Test that bytes that are not an image give no frame and no pose."""
+        with patch('app.services.streaming.estimate_head_pose') as mock_pose:
+            assert analyze_frame(b"not an image") == (None, None)
+
+        mock_pose.assert_not_called()
+
+
+class TestStreamingVerification:
+    """Test incremental liveness and the speculative embedding."""
+
+    @pytest.mark.asyncio
+    @patch('app.services.streaming.get_profile_embedding', return_value=[1.0, 0.0])
+    @patch('app.services.streaming.get_face_embedding', return_value=np.array([1.0, 0.0], np.float32))
+    async def test_passes_on_head_turn(self, mock_embedding, mock_profile):
+        """Test that the verdict is ready once the turn is seen, embedding the first frontal frame."""
+        poses = [None, pose(1.3), pose(1.02), pose(1.0), pose(0.3)]
+        with patch('app.services.streaming.estimate_head_pose', side_effect=poses):
+            stream = StreamingVerification(profile_path="/tmp/profile.jpg")
+            events = []
+            while not stream.done:
+                events.append(await stream.add_frame(JPEG))
+            (is_live, _, details), match_result = await stream.finish()
+
+        assert [e["face"] for e in events] == [False, True, True, True, True]
+        assert events[-1]["live"] is True
+        assert is_live is True
+        assert len(details["poses"]) == 5
+        assert match_result["verified"] is True
+        assert match_result["distance"] == pytest.approx(0.0, abs=1e-6)
+        mock_embedding.assert_called_once()
+        assert mock_embedding.call_args.args[1]["yaw_ratio"] == 1.02
+        mock_profile.assert_called_once_with("/tmp/profile.jpg")
+
+    @pytest.mark.asyncio
+    @patch('app.services.streaming.get_face_embedding', return_value=np.array([0.0, 1.0], np.float32))
+    async def test_embeds_best_frame_when_none_frontal(self, mock_embedding):
+        """Test that the most frontal frame is embedded at the end if none was within tolerance."""
+        poses = [pose(1.4), pose(1.2), pose(2.0)]
+        with patch('app.services.streaming.estimate_head_pose', side_effect=poses):
+            stream = StreamingVerification(template=np.array([1.0, 0.0], np.float32))
+            for _ in poses:
+                await stream.add_frame(JPEG)
+            mock_embedding.assert_not_called()
+            (is_live, _, _), match_result = await stream.finish()
+
+        assert is_live is True
+        assert mock_embedding.call_args.args[1]["yaw_ratio"] == 1.2
+        assert match_result["verified"] is False
+
+    @pytest.mark.asyncio
+    @patch('app.services.streaming.verify_against_template')
+    @patch('app.services.streaming.get_face_embedding', return_value=None)
+    async def test_falls_back_when_embedding_fails(self, mock_embedding, mock_verify):
+        """Test that a failed speculative embedding falls back to the full match, which reports the error."""
+        mock_verify.return_value = {"verified": False, "error": "no face", "distance": 1.0, "threshold": 0.5, "model": "Facenet512"}
+        poses = [pose(1.0), pose(2.0)]
+        template = np.array([1.0, 0.0], np.float32)
+        with patch('app.services.streaming.estimate_head_pose', side_effect=poses):
+            stream = StreamingVerification(template=template)
+            for _ in poses:
+                await stream.add_frame(JPEG)
+            _, match_result = await stream.finish()
+
+        assert match_result["error"] == "no face"
+        assert mock_verify.call_args.args[2]["yaw_ratio"] == 1.0
+
+    @pytest.mark.asyncio
+    @patch('app.services.streaming.get_face_embedding')
+    async def test_fails_without_turn(self, mock_embedding):
+        """Test that a stream ending without a head turn fails liveness and skips matching."""
+        poses = [pose(1.4), pose(1.2)]
+        with patch('app.services.streaming.estimate_head_pose', side_effect=poses):
+            stream = StreamingVerification(template=np.array([1.0, 0.0], np.float32))
+            for _ in poses:
+                await stream.add_frame(JPEG)
+            assert not stream.done
+            (is_live, message, _), match_result = await stream.finish()
+
+        assert is_live is False
+        assert "not detected" in message
+        assert match_result is None
+        mock_embedding.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_requires_one_reference(self):
+        """Test that exactly one of profile_path and template must be given."""
+        with pytest.raises(ValueError):
+            StreamingVerification()
@@ -0,0 +1,104 @@
+"""Unit tests for the enrolled template store."""
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services.template_store import TemplateStore, is_valid_user_id
+
+
+class TestUserIdValidation:
+    """Test cases for user id validation."""
+
+    def test_valid_user_ids(self):
+        """Test accepted user id formats."""
+        assert is_valid_user_id("user-42")
+        assert is_valid_user_id("alice.smith_01")
+
+    def test_invalid_user_ids(self):
+        """Test rejected user ids."""
+        assert not is_valid_user_id("")
+        assert not is_valid_user_id("..")
+        assert not is_valid_user_id("../etc/passwd")
+        assert not is_valid_user_id("a" * 65)
+
+
+class TestTemplateStore:
+    """Test cases for TemplateStore."""
+
+    def test_enroll_and_get(self):
+        """Test storing and retrieving a template in memory."""
+        store = TemplateStore(model_name="Facenet512")
+        store.enroll("alice", [0.1, 0.2])
+        
+        template = store.get("alice")
+        
+        assert "alice" in store
+        assert template.dtype == np.float32
+        assert np.allclose(template, [0.1, 0.2])
+
+    def test_get_unknown_user(self):
+        """Test lookup of a user that is not enrolled."""
+        store = TemplateStore(model_name="Facenet512")
+        
+        assert store.get("bob") is None
+
+    def test_enroll_invalid_user_id(self):
+        """Test that unsafe user ids are rejected."""
+        store = TemplateStore(model_name="Facenet512")
+        
+        with pytest.raises(ValueError):
+            store.enroll("../bob", [0.1])
+
+    def test_persisted_templates_reloaded(self, tmp_path):
+        """Test that templates survive a new store instance."""
+        TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512").enroll("alice", [1.0, 2.0])
+        
+        store = TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512")
+        
+        assert len(store) == 1
+        assert np.allclose(store.get("alice"), [1.0, 2.0])
+
+    def test_templates_from_other_model_skipped(self, tmp_path):
+        """Test that templates from a different model are not loaded."""
+        TemplateStore(storage_dir=str(tmp_path), model_name="ArcFace").enroll("alice", [1.0])
+        
+        store = TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512")
+        
+        assert store.get("alice") is None
+
+    def test_templates_from_other_embedding_backend_need_reenrollment(self, tmp_path):
+        """Test that a backend or exported model change marks templates for re-enrollment."""
+        TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512").enroll("alice", [1.0])
+        
+        store = TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512@onnx:0123456789abcdef")
+        
+        assert store.get("alice") is None
+        assert store.needs_reenrollment("alice") is True
+        assert store.needs_reenrollment("bob") is False
+        
+        store.enroll("alice", [2.0])
+        assert store.needs_reenrollment("alice") is False
+        assert np.allclose(store.get("alice"), [2.0])
+
+    def test_default_tag_is_model_tag(self):
+        """Test that templates are tagged with the embedding model tag by default."""
+        with patch('app.services.template_store.model_tag', return_value="Facenet512@onnx:abc"):
+            assert TemplateStore().model_name == "Facenet512@onnx:abc"
+
+    def test_delete_stale_template(self, tmp_path):
+        """Test that a template waiting for re-enrollment can be removed."""
+        TemplateStore(storage_dir=str(tmp_path), model_name="ArcFace").enroll("alice", [1.0])
+        store = TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512")
+        
+        assert store.delete("alice") is True
+        assert not (tmp_path / "alice.npz").exists()
+        assert store.needs_reenrollment("alice") is False
+
+    def test_delete(self, tmp_path):
+        """Test removing a template from memory and disk."""
+        store = TemplateStore(storage_dir=str(tmp_path), model_name="Facenet512")
+        store.enroll("alice", [1.0])
+        
+        assert store.delete("alice") is True
+        assert store.delete("alice") is False
+        assert not (tmp_path / "alice.npz").exists()
+        assert store.user_ids() == []
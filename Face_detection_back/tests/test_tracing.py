@@ -0,0 +1,80 @@
+"""Unit tests for per-request stage tracing."""
+import contextvars
+import pytest
+from app.services.executor import run_in_executor
+from app.services.metrics import observe_stage
+from app.services.tracing import RequestTrace, current_trace, record_count, record_span, start_trace
+
+
+def _in_fresh_context(func):
+    return contextvars.Context().run(func)
+
+
+class TestRequestTrace:
+    """Test cases for RequestTrace."""
+
+    def test_repeated_spans_are_summed(self):
+        """Test that spans with one name add up and are counted."""
+        trace = RequestTrace()
+        trace.add_span("face_mesh", 0.010)
+        trace.add_span("face_mesh", 0.005)
+        trace.add_count("frames_decoded", 4)
+
+        summary = trace.summary()
+
+        assert summary["spans"]["face_mesh"] == {"ms": 15.0, "count": 2}
+        assert summary["counts"] == {"frames_decoded": 4}
+        assert summary["total_ms"] >= 0.0
+
+    def test_server_timing_format(self):
+        """Test the Server-Timing header value."""
+        trace = RequestTrace()
+        trace.add_span("video_decode", 0.0123)
+        trace.add_span("face_mesh", 0.002)
+        trace.add_span("face_mesh", 0.002)
+        trace.add_count("frames_decoded", 4)
+
+        entries = trace.server_timing().split(", ")
+
+        assert entries[0] == "video_decode;dur=12.3"
+        assert entries[1] == 'face_mesh;dur=4.0;desc="x2"'
+        assert entries[2] == 'frames_decoded;desc="4"'
+        assert entries[3].startswith("total;dur=")
+
+    def test_empty(self):
+        """Test that a trace without records reports empty."""
+        trace = RequestTrace()
+        assert trace.empty
+        trace.add_count("frames_analyzed")
+        assert not trace.empty
+
+
+class TestCurrentTrace:
+    """Test cases for the request-scoped trace."""
+
+    def test_records_without_trace_are_ignored(self):
+        """Test that recording outside a request is a no-op."""
+        def record():
+            record_span("video_decode", 1.0)
+            record_count("frames_decoded")
+            return current_trace()
+
+        assert _in_fresh_context(record) is None
+
+    def test_stage_observations_reach_trace(self):
+        """Test that metric stage observations are also recorded in the trace."""
+        def record():
+            trace = start_trace()
+            observe_stage("best_frame", 0.001)
+            return trace
+
+        assert "best_frame" in _in_fresh_context(record).summary()["spans"]
+
+    @pytest.mark.asyncio
+    async def test_trace_follows_work_into_thread_pool(self):
+        """Test that spans recorded on the pipeline pool land in the caller's trace."""
+        trace = start_trace()
+
+        await run_in_executor(record_span, "embedding", 0.002)
+
+        assert trace.summary()["spans"]["embedding"]["count"] == 1
@@ -0,0 +1,181 @@
+"""Tests for upload streaming and validation."""
+import io
+import pytest
+import cv2
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi import UploadFile
+from app.services.uploads import (
+    UploadRejected,
+    sniff_video_container,
+    sniff_image_format,
+    read_frame_upload,
+    check_video_header,
+    check_video_stream,
+    copy_upload
+)
+
+
+def make_upload(data):
+    """Builds an UploadFile mock whose async read follows a byte buffer."""
+    buffer = io.BytesIO(data)
+    upload = MagicMock(spec=UploadFile)
+    upload.read = AsyncMock(side_effect=lambda size=-1: buffer.read(size))
+    return upload
+
+
+def make_capture(width=720, height=1280, fps=30.0, frame_count=90, fourcc="avc1"):
+    """Builds a VideoCapture mock reporting the given stream metadata."""
+    props = {
+        cv2.CAP_PROP_FRAME_WIDTH: width,
+        cv2.CAP_PROP_FRAME_HEIGHT: height,
+        cv2.CAP_PROP_FPS: fps,
+        cv2.CAP_PROP_FRAME_COUNT: frame_count,
+        cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*fourcc)
+    }
+    cap = MagicMock()
+    cap.get.side_effect = lambda prop: props.get(prop, 0)
+    return cap
+
+
+class TestContainerSniffing:
+    """Test cases for container detection from header bytes."""
+
+    def test_mp4(self):
+        """Test MP4/MOV headers are recognised."""
+        assert sniff_video_container(b"\x00\x00\x00\x18ftypmp42") == "mp4"
+        assert sniff_video_container(b"\x00\x00\x00\x14ftypqt  ") == "mp4"
+
+    def test_matroska(self):
+        """Test WebM/MKV headers are recognised."""
+        assert sniff_video_container(b"\x1a\x45\xdf\xa3\x01\x00\x00\x00") == "matroska"
+
+    def test_avi(self):
+        """Test AVI headers are recognised."""
+        assert sniff_video_container(b"RIFF\x00\x10\x00\x00AVI LIST") == "avi"
+
+    def test_unknown(self):
+        """Test non-video data is not recognised."""
+        assert sniff_video_container(b"\xff\xd8\xff\xe0\x00\x10JFIF") is None
+        assert sniff_video_container(b"") is None
+
+    def test_header_check_rejects_unknown(self):
+        """Test an unknown container is rejected with 415."""
+        with pytest.raises(UploadRejected) as exc:
+            check_video_header(b"not a video at all")
+        assert exc.value.status_code == 415
+
+    def test_header_check_can_be_disabled(self):
+        """Test the container check is skipped when disabled."""
+        with patch('app.services.uploads.settings.video_check_container', False):
+            check_video_header(b"not a video at all")
+
+
+class TestStreamCheck:
+    """Test cases for codec, resolution and duration limits."""
+
+    def test_accepts_typical_phone_video(self):
+        """Test a short portrait 720p clip passes."""
+        check_video_stream(make_capture())
+
+    def test_rejects_excessive_resolution(self):
+        """Test a stream above the dimension limit is rejected with 422."""
+        with pytest.raises(UploadRejected) as exc:
+            check_video_stream(make_capture(width=7680, height=4320))
+        assert exc.value.status_code == 422
+
+    def test_rejects_excessive_duration(self):
+        """Test a stream above the duration limit is rejected with 422."""
+        with pytest.raises(UploadRejected) as exc:
+            check_video_stream(make_capture(fps=30.0, frame_count=30 * 600))
+        assert exc.value.status_code == 422
+        assert "duration" in exc.value.message
+
+    def test_skips_duration_without_frame_count(self):
+        """Test an unknown frame count does not fail the duration check."""
+        check_video_stream(make_capture(frame_count=0))
+
+    def test_rejects_disallowed_codec(self):
+        """Test a codec outside the allow-list is rejected with 415."""
+        with patch('app.services.uploads.settings.video_allowed_codecs', "avc1,hvc1"):
+            with pytest.raises(UploadRejected) as exc:
+                check_video_stream(make_capture(fourcc="MJPG"))
+        assert exc.value.status_code == 415
+
+    def test_accepts_allowed_codec(self):
+        """Test the codec allow-list is case-insensitive."""
+        with patch('app.services.uploads.settings.video_allowed_codecs', "AVC1, hvc1"):
+            check_video_stream(make_capture(fourcc="avc1"))
+
+
+@pytest.mark.asyncio
+class TestCopyUpload:
+    """Test cases for chunked upload copying."""
+
+    async def test_copies_in_chunks(self):
+        """Test the upload is read in fixed-size chunks."""
+        data = bytes(range(256)) * 10
+        upload = make_upload(data)
+        destination = io.BytesIO()
+
+        with patch('app.services.uploads.settings.upload_chunk_size', 100):
+            written = await copy_upload(upload, destination, max_bytes=len(data))
+
+        assert written == len(data)
+        assert destination.getvalue() == data
+        assert all(call.args == (100,) for call in upload.read.call_args_list)
+
+    async def test_rejects_oversized_upload(self):
+        """Test the copy stops with 413 once the limit is crossed."""
+        upload = make_upload(b"x" * 1000)
+        destination = io.BytesIO()
+
+        with patch('app.services.uploads.settings.upload_chunk_size', 100):
+            with pytest.raises(UploadRejected) as exc:
+                await copy_upload(upload, destination, max_bytes=250)
+
+        assert exc.value.status_code == 413
+        assert len(destination.getvalue()) <= 250
+        assert upload.read.call_count == 3
+
+    async def test_header_check_runs_on_first_chunk(self):
+        """Test a bad header is rejected before anything is written."""
+        destination = io.BytesIO()
+
+        with pytest.raises(UploadRejected):
+            await copy_upload(make_upload(b"garbage" * 100), destination, 10_000, check_header=check_video_header)
+
+        assert destination.getvalue() == b""
+
+
+class TestFrameUpload:
+    """Test cases for still frame uploads."""
+
+    def test_sniffs_image_formats(self):
+        """Test JPEG, PNG and WebP detection from header bytes."""
+        assert sniff_image_format(b"\xff\xd8\xff\xe0rest") == "jpeg"
+        assert sniff_image_format(b"\x89PNG\r\n\x1a\nrest") == "png"
+        assert sniff_image_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+        assert sniff_image_format(b"\x00\x00\x00\x18ftypmp42") is None
+
+    @pytest.mark.asyncio
+    async def test_reads_frame(self):
+        """Test a JPEG frame is read whole."""
+        data = b"\xff\xd8\xff" + b"x" * 100
+        assert await read_frame_upload(make_upload(data)) == data
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_frame(self):
+        """Test a frame over the size limit is rejected with 413."""
+        with patch('app.services.uploads.settings.upload_max_frame_bytes', 64):
+            with pytest.raises(UploadRejected) as exc:
+                await read_frame_upload(make_upload(b"\xff\xd8\xff" + b"x" * 128))
+
+        assert exc.value.status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_rejects_non_image(self):
+        """Test a frame that is not a known image format is rejected with 415."""
+        with pytest.raises(UploadRejected) as exc:
+            await read_frame_upload(make_upload(b"<html>not an image</html>"))
+
+        assert exc.value.status_code == 415
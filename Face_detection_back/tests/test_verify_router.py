@@ -1,21 +1,36 @@
 """Tests for verify router."""
 import pytest
 from fastapi.testclient import TestClient
+import cv2
+import numpy as np
 from unittest.mock import patch, MagicMock
 from app.main import app
+from app.services.uploads import UploadRejected
+from app.services.face_matcher import FACE_VALIDATION_FAILED
+from app.services.admission import AdmissionController
+from app.services.metrics import ADMISSION_REJECTED, OUTCOME_TOTAL, REQUEST_SECONDS
 
 client = TestClient(app)
 
+JPEG = cv2.imencode(".jpg", np.zeros((64, 48, 3), dtype=np.uint8))[1].tobytes()
+
+
+def analyzed(frames):
+    """Stands in for analyze_video: feeds the decoded frames to the consumer."""
+    async def analyze_video(video_file, consumer=None, num_frames=None):
+        return frames, consumer(iter(frames)) if consumer else None
+    return analyze_video
+
 
 class TestVerifyRouter:
     """Test cases for verification endpoint."""
 
     @patch('app.routers.verify.verify_faces')
     @patch('app.routers.verify.check_liveness_pose')
-    @patch('app.routers.verify.extract_frames_from_video')
-    def test_verify_endpoint_success(self, mock_extract, mock_liveness, mock_verify):
+    @patch('app.routers.verify.analyze_video')
+    def test_verify_endpoint_success(self, mock_analyze, mock_liveness, mock_verify):
         """Test successful verification flow."""
-        mock_extract.return_value = [MagicMock()]
+        mock_analyze.side_effect = analyzed([MagicMock()])
         mock_liveness.return_value = (True, "Liveness verified", {})
         mock_verify.return_value = {
             "verified": True,
@@ -37,6 +52,36 @@ class TestVerifyRouter:
         assert data["liveness"]["passed"] is True
         assert data["verification"]["verified"] is True
 
+    @patch('app.routers.verify.verify_faces')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    def test_verify_endpoint_reuses_liveness_poses(self, mock_analyze, mock_liveness, mock_verify):
+        """Test that the best frame comes from liveness pose records."""
+        frames = [MagicMock(name=f"frame{i}") for i in range(3)]
+        mock_analyze.side_effect = analyzed(frames)
+        poses = [{"yaw_ratio": 0.3}, {"yaw_ratio": 1.05}, {"yaw_ratio": 1.6}]
+        mock_liveness.return_value = (True, "Liveness verified", {"poses": poses})
+        mock_verify.return_value = {
+            "verified": True,
+            "distance": 0.3,
+            "threshold": 0.5,
+            "model": "Facenet512"
+        }
+        
+        files = {
+            "profile_image": ("profile.jpg", b"fake image", "image/jpeg"),
+            "live_video": ("video.mp4", b"fake video", "video/mp4")
+        }
+        
+        with patch('app.services.liveness.estimate_head_pose') as mock_pose:
+            response = client.post("/verify_identity", files=files)
+            mock_pose.assert_not_called()
+        
+        assert response.status_code == 200
+        assert mock_verify.call_args.args[1] is frames[1]
+        assert mock_verify.call_args.args[2] is poses[1]
+        assert response.json()["liveness"]["details"]["poses"] == poses
+
     def test_verify_endpoint_missing_files(self):
         """Test verification with missing files."""
         # Sending empty files dict causing validation error or custom check
@@ -50,10 +95,10 @@ class TestVerifyRouter:
 
     @patch('app.routers.verify.verify_faces')
     @patch('app.routers.verify.check_liveness_pose')
-    @patch('app.routers.verify.extract_frames_from_video')
-    def test_verify_endpoint_liveness_failed(self, mock_extract, mock_liveness, mock_verify):
+    @patch('app.routers.verify.analyze_video')
+    def test_verify_endpoint_liveness_failed(self, mock_analyze, mock_liveness, mock_verify):
         """Test verification when liveness check fails."""
-        mock_extract.return_value = [MagicMock()]
+        mock_analyze.side_effect = analyzed([MagicMock()])
         mock_liveness.return_value = (False, "No movement detected", {})
         
         files = {
@@ -70,10 +115,10 @@ class TestVerifyRouter:
 
     @patch('app.routers.verify.verify_faces')
     @patch('app.routers.verify.check_liveness_pose')
-    @patch('app.routers.verify.extract_frames_from_video')
-    def test_verify_endpoint_verification_failed(self, mock_extract, mock_liveness, mock_verify):
+    @patch('app.routers.verify.analyze_video')
+    def test_verify_endpoint_verification_failed(self, mock_analyze, mock_liveness, mock_verify):
         """Test verification when face matching fails."""
-        mock_extract.return_value = [MagicMock()]
+        mock_analyze.side_effect = analyzed([MagicMock()])
         mock_liveness.return_value = (True, "Liveness verified", {})
         mock_verify.return_value = {
             "verified": False,
@@ -94,3 +139,380 @@ class TestVerifyRouter:
         data = response.json()
         assert data["status"] == "failed"
         assert data["verification"]["verified"] is False
+
+
+    @patch('app.routers.verify.analyze_video')
+    def test_verify_endpoint_rejected_video(self, mock_analyze):
+        """Test that a rejected video upload keeps its status code."""
+        mock_analyze.side_effect = UploadRejected(415, "Unsupported video container")
+        
+        files = {
+            "profile_image": ("profile.jpg", b"fake image", "image/jpeg"),
+            "live_video": ("video.mp4", b"fake video", "video/mp4")
+        }
+        
+        response = client.post("/verify_identity", files=files)
+        
+        assert response.status_code == 415
+        assert response.json()["detail"] == "Unsupported video container"
+
+    @patch('app.routers.verify.analyze_video')
+    def test_verify_endpoint_profile_too_large(self, mock_analyze):
+        """Test that an oversized profile image is rejected before the video is read."""
+        files = {
+            "profile_image": ("profile.jpg", b"x" * 2048, "image/jpeg"),
+            "live_video": ("video.mp4", b"fake video", "video/mp4")
+        }
+        
+        with patch('app.routers.verify.settings.upload_max_image_bytes', 1024):
+            response = client.post("/verify_identity", files=files)
+        
+        assert response.status_code == 413
+        mock_analyze.assert_not_called()
+
+
+class TestFrameUploads:
+    """Test cases for still frames uploaded instead of a video."""
+
+    @patch('app.routers.verify.verify_faces')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    def test_frames_skip_video_decode(self, mock_analyze, mock_liveness, mock_verify):
+        """Test that frames are decoded upright in RGB and the video path is not used."""
+        pulled = []
+        def liveness(frames):
+            pulled.extend(frames)
+            return (True, "Liveness verified", {"poses": [{"yaw_ratio": 1.0}] * len(pulled)})
+        mock_liveness.side_effect = liveness
+        mock_verify.return_value = {"verified": True, "distance": 0.3, "threshold": 0.5, "model": "Facenet512"}
+
+        files = [
+            ("profile_image", ("profile.jpg", b"fake image", "image/jpeg")),
+            ("frames", ("0.jpg", JPEG, "image/jpeg")),
+            ("frames", ("1.jpg", JPEG, "image/jpeg"))
+        ]
+        response = client.post("/verify_identity", files=files)
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert len(pulled) == 2
+        assert pulled[0].shape == (64, 48, 3)
+        mock_analyze.assert_not_called()
+
+    @patch('app.routers.verify.verify_faces')
+    @patch('app.routers.verify.check_liveness_pose')
+    def test_frames_sorted_by_timestamp(self, mock_liveness, mock_verify):
+        """Test that frames are analyzed in timestamp order and the timestamps are reported."""
+        dark = cv2.imencode(".jpg", np.zeros((64, 48, 3), dtype=np.uint8))[1].tobytes()
+        bright = cv2.imencode(".jpg", np.full((64, 48, 3), 255, dtype=np.uint8))[1].tobytes()
+        pulled = []
+        def liveness(frames):
+            pulled.extend(frames)
+            return (True, "Liveness verified", {"poses": [{"yaw_ratio": 1.0}] * len(pulled)})
+        mock_liveness.side_effect = liveness
+        mock_verify.return_value = {"verified": True, "distance": 0.3, "threshold": 0.5, "model": "Facenet512"}
+
+        files = [
+            ("profile_image", ("profile.jpg", b"fake image", "image/jpeg")),
+            ("frames", ("late.jpg", bright, "image/jpeg")),
+            ("frames", ("early.jpg", dark, "image/jpeg"))
+        ]
+        response = client.post("/verify_identity", files=files, data={"frame_timestamps": "0.8,0.1"})
+
+        assert response.status_code == 200
+        assert pulled[0].mean() < pulled[1].mean()
+        assert response.json()["liveness"]["details"]["timestamps"] == [0.1, 0.8]
+
+    @pytest.mark.parametrize("timestamps", ["0.1", "0.1,abc"])
+    def test_bad_timestamps(self, timestamps):
+        """Test that timestamps must be numbers, one per frame."""
+        files = [
+            ("profile_image", ("profile.jpg", b"fake image", "image/jpeg")),
+            ("frames", ("0.jpg", JPEG, "image/jpeg")),
+            ("frames", ("1.jpg", JPEG, "image/jpeg"))
+        ]
+        response = client.post("/verify_identity", files=files, data={"frame_timestamps": timestamps})
+
+        assert response.status_code == 400
+
+    def test_video_and_frames_rejected(self):
+        """Test that a request must not carry both a video and frames."""
+        files = [
+            ("profile_image", ("profile.jpg", b"fake image", "image/jpeg")),
+            ("live_video", ("video.mp4", b"fake video", "video/mp4")),
+            ("frames", ("0.jpg", JPEG, "image/jpeg"))
+        ]
+        response = client.post("/verify_identity", files=files)
+
+        assert response.status_code == 400
+
+    def test_no_video_or_frames_rejected(self):
+        """Test that a request needs a video or frames."""
+        files = {"profile_image": ("profile.jpg", b"fake image", "image/jpeg")}
+        response = client.post("/verify_identity", files=files)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Missing required files"
+
+    def test_non_image_frame_rejected(self):
+        """Test that a frame that is not an image is rejected with 415."""
+        files = [
+            ("profile_image", ("profile.jpg", b"fake image", "image/jpeg")),
+            ("frames", ("0.jpg", b"not an image", "image/jpeg"))
+        ]
+        response = client.post("/verify_identity", files=files)
+
+        assert response.status_code == 415
+
+
+class TestVerifyEnrolledRouter:
+    """Test cases for verification against an enrolled template."""
+
+    @patch('app.routers.verify.verify_against_template')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    @patch('app.routers.verify.get_template_store')
+    def test_verify_enrolled_success(self, mock_store, mock_analyze, mock_liveness, mock_verify):
+        """Test successful verification by user id."""
+        mock_store.return_value.get.return_value = [0.1] * 512
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (True, "Liveness verified", {})
+        mock_verify.return_value = {
+            "verified": True,
+            "distance": 0.3,
+            "threshold": 0.5,
+            "model": "Facenet512"
+        }
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/verify_identity/alice", files=files)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "success"
+        assert data["verification"]["verified"] is True
+        mock_store.return_value.get.assert_called_once_with("alice")
+
+    @patch('app.routers.verify.analyze_video')
+    @patch('app.routers.verify.get_template_store')
+    def test_verify_enrolled_unknown_user(self, mock_store, mock_analyze):
+        """Test verification of a user that is not enrolled."""
+        mock_store.return_value.get.return_value = None
+        mock_store.return_value.needs_reenrollment.return_value = False
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/verify_identity/bob", files=files)
+        
+        assert response.status_code == 404
+        mock_analyze.assert_not_called()
+
+    @patch('app.routers.verify.analyze_video')
+    @patch('app.routers.verify.get_template_store')
+    def test_verify_enrolled_stale_template(self, mock_store, mock_analyze):
+        """Test that a template from another embedding model asks for re-enrollment."""
+        mock_store.return_value.get.return_value = None
+        mock_store.return_value.needs_reenrollment.return_value = True
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/verify_identity/bob", files=files)
+        
+        assert response.status_code == 409
+        assert "re-enroll" in response.json()["detail"]
+        mock_analyze.assert_not_called()
+
+    @patch('app.routers.verify.verify_against_template')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    @patch('app.routers.verify.get_template_store')
+    def test_verify_enrolled_liveness_failed(self, mock_store, mock_analyze, mock_liveness, mock_verify):
+        """Test that template matching is skipped when liveness fails."""
+        mock_store.return_value.get.return_value = [0.1] * 512
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (False, "No movement detected", {})
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/verify_identity/alice", files=files)
+        
+        assert response.status_code == 200
+        assert response.json()["liveness"]["passed"] is False
+        mock_verify.assert_not_called()
+
+
+class TestVerifyMetrics:
+    """Test cases for verification outcome metrics."""
+
+    @pytest.mark.parametrize("liveness, match, outcome", [
+        ((False, "No movement detected", {}), None, "liveness_failed"),
+        ((True, "Liveness verified", {}), {"verified": True, "distance": 0.3, "threshold": 0.5, "model": "Facenet512"}, "verified"),
+        ((True, "Liveness verified", {}), {"verified": False, "distance": 0.9, "threshold": 0.5, "model": "Facenet512"}, "not_verified"),
+        ((True, "Liveness verified", {}), {"verified": False, "error": "no face", "distance": 1.0, "threshold": 0.5, "model": "Facenet512", "message": FACE_VALIDATION_FAILED}, "no_face"),
+        ((True, "Liveness verified", {}), {"verified": False, "error": "boom", "distance": 1.0, "threshold": 0.5, "model": "Facenet512", "message": "Verification service error"}, "error"),
+    ])
+    @patch('app.routers.verify.verify_against_template')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    @patch('app.routers.verify.get_template_store')
+    def test_outcome_counted(self, mock_store, mock_analyze, mock_liveness, mock_verify, liveness, match, outcome):
+        """Test that each verification is counted under its outcome and timed."""
+        mock_store.return_value.get.return_value = [0.1] * 512
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = liveness
+        mock_verify.return_value = match
+        before = OUTCOME_TOTAL.value(outcome=outcome)
+        requests_before = REQUEST_SECONDS.count()
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/verify_identity/alice", files=files)
+        
+        assert response.status_code == 200
+        assert OUTCOME_TOTAL.value(outcome=outcome) == before + 1
+        assert REQUEST_SECONDS.count() == requests_before + 1
+
+    @patch('app.routers.verify.verify_against_template')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    @patch('app.routers.verify.get_template_store')
+    def test_timings_in_debug_mode(self, mock_store, mock_analyze, mock_liveness, mock_verify):
+        """Test that debug mode returns the stage breakdown that Server-Timing reports."""
+        mock_store.return_value.get.return_value = [0.1] * 512
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (True, "Liveness verified", {})
+        mock_verify.return_value = {"verified": True, "distance": 0.3, "threshold": 0.5, "model": "Facenet512"}
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        with patch('app.routers.verify.settings.debug_mode', True):
+            response = client.post("/verify_identity/alice", files=files)
+        
+        timings = response.json()["timings"]
+        assert "best_frame" in timings["spans"]
+        assert "best_frame;dur=" in response.headers["server-timing"]
+
+    @pytest.mark.parametrize("identified, outcome", [(True, "identified"), (False, "not_identified")])
+    @patch('app.routers.verify.get_gallery')
+    @patch('app.routers.verify.match_gallery')
+    @patch('app.routers.verify.get_face_embedding')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    def test_identification_counted(self, mock_analyze, mock_liveness, mock_embedding, mock_identify, mock_gallery, identified, outcome):
+        """Test that /identify is timed, tracked and counted under its own outcomes."""
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (True, "Liveness verified", {})
+        mock_identify.return_value = {"identified": identified, "matches": [], "threshold": 0.5, "model": "Facenet512"}
+        before = OUTCOME_TOTAL.value(outcome=outcome)
+        requests_before = REQUEST_SECONDS.count()
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/identify", files=files)
+        
+        assert response.status_code == 200
+        assert OUTCOME_TOTAL.value(outcome=outcome) == before + 1
+        assert REQUEST_SECONDS.count() == requests_before + 1
+
+    @patch('app.routers.verify.get_template_store')
+    def test_rejected_request_counted(self, mock_store):
+        """Test that client errors are counted as rejected."""
+        mock_store.return_value.get.return_value = None
+        mock_store.return_value.needs_reenrollment.return_value = False
+        before = OUTCOME_TOTAL.value(outcome="rejected")
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/verify_identity/bob", files=files)
+        
+        assert response.status_code == 404
+        assert OUTCOME_TOTAL.value(outcome="rejected") == before + 1
+
+
+class TestIdentifyRouter:
+    """Test cases for 1:N identification endpoint."""
+
+    @patch('app.routers.verify.get_gallery')
+    @patch('app.routers.verify.match_gallery')
+    @patch('app.routers.verify.get_face_embedding')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    def test_identify_success(self, mock_analyze, mock_liveness, mock_embedding, mock_identify, mock_gallery):
+        """Test successful identification."""
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (True, "Liveness verified", {})
+        mock_identify.return_value = {
+            "identified": True,
+            "user_id": "alice",
+            "matches": [{"user_id": "alice", "distance": 0.2, "verified": True}],
+            "threshold": 0.5,
+            "model": "Facenet512"
+        }
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/identify", files=files, data={"top_k": "3"})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "success"
+        assert data["identification"]["user_id"] == "alice"
+        assert mock_identify.call_args.args[2] == 3
+
+    @patch('app.routers.verify.get_face_embedding')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    def test_identify_liveness_failed(self, mock_analyze, mock_liveness, mock_identify):
+        """Test that identification is skipped when liveness fails."""
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (False, "No movement detected", {})
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/identify", files=files)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "failed"
+        assert data["identification"]["identified"] is False
+        mock_identify.assert_not_called()
+
+    def test_identify_invalid_top_k(self):
+        """Test that non-positive top_k is rejected."""
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        response = client.post("/identify", files=files, data={"top_k": "0"})
+        
+        assert response.status_code == 400
+
+
+class TestAdmission:
+    """Test admission control on the verification routes."""
+
+    @patch('app.routers.verify.analyze_video')
+    def test_shed_when_no_slot(self, mock_analyze):
+        """Test that a request that cannot get a slot is shed without running the pipeline."""
+        controller = AdmissionController(max_concurrent=1, max_queued=0, max_wait=5)
+        controller._active = 1
+        before = ADMISSION_REJECTED.value(reason="queue_full")
+        
+        files = {
+            "profile_image": ("profile.jpg", b"fake image", "image/jpeg"),
+            "live_video": ("video.mp4", b"fake video", "video/mp4")
+        }
+        with patch('app.routers.verify.get_admission_controller', return_value=controller):
+            response = client.post("/verify_identity", files=files)
+        
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+        assert ADMISSION_REJECTED.value(reason="queue_full") == before + 1
+        mock_analyze.assert_not_called()
+
+    @patch('app.routers.verify.get_face_embedding')
+    @patch('app.routers.verify.check_liveness_pose')
+    @patch('app.routers.verify.analyze_video')
+    def test_slot_released(self, mock_analyze, mock_liveness, mock_embedding):
+        """Test that the slot is freed and the service time recorded after the request."""
+        mock_analyze.side_effect = analyzed([MagicMock()])
+        mock_liveness.return_value = (False, "No movement detected", {})
+        controller = AdmissionController(max_concurrent=1, max_queued=0, max_wait=5)
+        
+        files = {"live_video": ("video.mp4", b"fake video", "video/mp4")}
+        with patch('app.routers.verify.get_admission_controller', return_value=controller):
+            first = client.post("/identify", files=files)
+            second = client.post("/identify", files=files)
+        
+        assert first.status_code == second.status_code == 200
+        assert controller.active() == 0
+        assert controller.stats()["admitted"] == 2
+        assert controller.stats()["avg_service_seconds"] is not None
@@ -1,9 +1,33 @@
 """Tests for video utilities."""
 import pytest
+import cv2
 import numpy as np
 from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import UploadFile
-from app.services.video_utils import extract_frames_from_video
+import io
+from app.services.uploads import UploadRejected
+from app.services.video_utils import (
+    extract_frames_from_video,
+    read_frames,
+    consume_frames,
+    consume_images,
+    analyze_frame_uploads,
+    FrameSampler,
+    choose_read_strategy,
+    _read_unknown_length
+)
+
+MP4_HEADER = b"\x00\x00\x00\x18ftypmp42"
+
+
+def make_upload(data):
+    """Builds an UploadFile mock whose async read/seek follow a byte buffer."""
+    buffer = io.BytesIO(data)
+    upload = MagicMock(spec=UploadFile)
+    upload.read = AsyncMock(side_effect=lambda size=-1: buffer.read(size))
+    upload.seek = AsyncMock(side_effect=buffer.seek)
+    return upload
+
 
 @pytest.mark.asyncio
 class TestVideoUtils:
@@ -34,8 +58,7 @@ class TestVideoUtils:
         mock_capture.return_value = mock_cap
         
         # Mock UploadFile
-        mock_upload = MagicMock(spec=UploadFile)
-        mock_upload.read = AsyncMock(return_value=b"fake-video-content")
+        mock_upload = make_upload(MP4_HEADER + b"fake-video-content")
         
         frames = await extract_frames_from_video(mock_upload, num_frames=4)
         
@@ -55,8 +78,7 @@ class TestVideoUtils:
         mock_cap.isOpened.return_value = False
         mock_capture.return_value = mock_cap
         
-        mock_upload = MagicMock(spec=UploadFile)
-        mock_upload.read = AsyncMock(return_value=b"bad-content")
+        mock_upload = make_upload(MP4_HEADER + b"bad-content")
         
         frames = await extract_frames_from_video(mock_upload)
         
@@ -74,10 +96,11 @@ class TestVideoUtils:
         mock_cap = MagicMock()
         mock_cap.isOpened.return_value = True
         mock_cap.get.return_value = 0  # 0 frames
+        mock_cap.grab.return_value = False
+        mock_cap.read.return_value = (False, None)
         mock_capture.return_value = mock_cap
         
-        mock_upload = MagicMock(spec=UploadFile)
-        mock_upload.read = AsyncMock(return_value=b"empty")
+        mock_upload = make_upload(MP4_HEADER + b"empty")
         
         frames = await extract_frames_from_video(mock_upload)
         
@@ -94,3 +117,315 @@ class TestVideoUtils:
         
         assert frames == []
 
+
+
+def write_test_video(path, num_frames, width=64, height=48):
+    """Writes a video whose frame i is filled with grey level 4 * i."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    for i in range(num_frames):
+        writer.write(np.full((height, width, 3), 4 * i, dtype=np.uint8))
+    writer.release()
+
+
+class FakeCapture:
+    """Minimal VideoCapture stand-in over a list of frames, reporting no frame count."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+        self.reads = 0
+
+    def grab(self):
+        if self.position >= len(self.frames):
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        if self.position >= len(self.frames):
+            return False, None
+        self.reads += 1
+        self.position += 1
+        return True, self.frames[self.position - 1]
+
+
+@pytest.mark.asyncio
+class TestInMemoryDecode:
+    """Test cases for decoding uploads without a temp file."""
+
+    async def test_decodes_from_memory(self, tmp_path):
+        """Test a real video is decoded without creating a temp file."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 30)
+
+        with patch('app.services.video_utils.tempfile.NamedTemporaryFile') as mock_temp:
+            frames = await extract_frames_from_video(make_upload(path.read_bytes()), num_frames=4)
+
+        assert len(frames) == 4
+        mock_temp.assert_not_called()
+
+    async def test_falls_back_to_temp_file_when_unsupported(self, tmp_path):
+        """Test the temp file path is used when no in-memory file can be created."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 30)
+
+        with patch('app.services.video_utils._create_memory_file', return_value=None):
+            frames = await extract_frames_from_video(make_upload(path.read_bytes()), num_frames=4)
+
+        assert len(frames) == 4
+
+    @patch('app.services.video_utils.iter_frames')
+    async def test_falls_back_to_temp_file_when_decode_fails(self, mock_iter_frames):
+        """Test an unreadable in-memory file is retried from a temp file with the full upload."""
+        written = []
+
+        def iter_frames(path, num_frames):
+            with open(path, "rb") as f:
+                written.append(f.read())
+            if not path.startswith("/proc/"):
+                yield np.zeros((4, 4, 3), dtype=np.uint8)
+
+        mock_iter_frames.side_effect = iter_frames
+
+        video = MP4_HEADER + b"video-bytes"
+        frames = await extract_frames_from_video(make_upload(video), num_frames=1)
+
+        assert len(frames) == 1
+        assert written == [video, video]
+
+
+    async def test_rejected_container_is_not_decoded(self):
+        """Test an unknown container is rejected before OpenCV sees it."""
+        with patch('app.services.video_utils.iter_frames') as mock_iter_frames:
+            with pytest.raises(UploadRejected) as exc:
+                await extract_frames_from_video(make_upload(b"<html>not a video</html>"))
+
+        assert exc.value.status_code == 415
+        mock_iter_frames.assert_not_called()
+
+    async def test_oversized_video_is_rejected(self):
+        """Test a video over the size limit is rejected with 413."""
+        with patch('app.services.video_utils.settings.upload_max_video_bytes', 64):
+            with pytest.raises(UploadRejected) as exc:
+                await extract_frames_from_video(make_upload(MP4_HEADER + b"x" * 128))
+
+        assert exc.value.status_code == 413
+
+
+class TestFrameSampling:
+    """Test cases for the frame sampling strategies."""
+
+    def test_strategy_sequential_for_close_samples(self):
+        """Test short clips are decoded in one pass."""
+        assert choose_read_strategy(np.array([0, 40, 80, 120])) == "sequential"
+
+    def test_strategy_seek_for_distant_samples(self):
+        """Test samples many GOPs apart are reached by seeking."""
+        assert choose_read_strategy(np.array([0, 1000, 2000, 3000])) == "seek"
+
+    def test_sequential_matches_seeking(self, tmp_path):
+        """Test both strategies return the same frames."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 60)
+
+        with patch('app.services.video_utils.choose_read_strategy', return_value="sequential"):
+            sequential = read_frames(str(path), 4)
+        with patch('app.services.video_utils.choose_read_strategy', return_value="seek"):
+            seeked = read_frames(str(path), 4)
+
+        assert len(sequential) == 4
+        for a, b in zip(sequential, seeked):
+            np.testing.assert_array_equal(a, b)
+
+    def test_overstated_frame_count_resamples(self, tmp_path):
+        """Test a stream shorter than its reported frame count still yields frames."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 20)
+
+        real_capture = cv2.VideoCapture
+
+        def overstating_capture(video_path):
+            cap = real_capture(video_path)
+            wrapper = MagicMock(wraps=cap)
+            wrapper.get.side_effect = lambda prop: 500 if prop == cv2.CAP_PROP_FRAME_COUNT else cap.get(prop)
+            return wrapper
+
+        with patch('app.services.video_utils.cv2.VideoCapture', side_effect=overstating_capture):
+            frames = read_frames(str(path), 4)
+
+        assert len(frames) == 4
+
+    def test_consumer_stopping_early_stops_decoding(self, tmp_path):
+        """Test frames after the consumer stops are never decoded and the decoder is released."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 60)
+        real_capture = cv2.VideoCapture
+        captures = []
+
+        def tracking_capture(video_path):
+            cap = MagicMock(wraps=real_capture(video_path))
+            captures.append(cap)
+            return cap
+
+        def take_two(frames):
+            return [next(frames), next(frames)]
+
+        with patch('app.services.video_utils.cv2.VideoCapture', side_effect=tracking_capture):
+            frames, result = consume_frames(str(path), 4, take_two)
+
+        assert len(frames) == 2
+        assert len(result) == 2
+        assert captures[0].read.call_count == 2
+        captures[0].release.assert_called()
+
+    def test_unknown_length_starts_after_offset(self):
+        """Test resampling can skip frames already used."""
+        frames = [np.full((2, 2, 3), i, dtype=np.uint8) for i in range(20)]
+
+        picked = _read_unknown_length(FakeCapture(frames), 2, start=10)
+
+        assert [i for i, _ in picked][0] == 10
+        assert all(i >= 10 for i, _ in picked)
+
+    def test_unknown_length_spreads_samples(self):
+        """Test sampling without a frame count covers the whole stream."""
+        frames = [np.full((2, 2, 3), i, dtype=np.uint8) for i in range(100)]
+        cap = FakeCapture(frames)
+
+        picked = _read_unknown_length(cap, 4)
+        values = [int(f[0, 0, 0]) for _, f in picked]
+        indices = [i for i, _ in picked]
+
+        assert len(picked) == 4
+        assert values[0] == 0
+        assert values[-1] >= 80
+        assert values == indices
+        assert cap.reads < len(frames)
+
+    def test_unknown_length_short_stream(self):
+        """Test a stream shorter than the sample count returns every frame."""
+        cap = FakeCapture([np.zeros((2, 2, 3), dtype=np.uint8)] * 3)
+
+        assert len(_read_unknown_length(cap, 4)) == 3
+
+
+class TestAdaptiveSampling:
+    """Test cases for coarse-to-fine frame sampling."""
+
+    def _run(self, path, ratios_by_index, num_frames=4, max_frames=10):
+        sampler = FrameSampler(str(path), num_frames, max_frames=max_frames)
+        try:
+            for _ in sampler:
+                sampler.report(ratios_by_index(sampler.indices[-1]))
+        finally:
+            sampler.close()
+        return sampler
+
+    def test_clean_video_needs_no_refinement(self, tmp_path):
+        """Test a steady yaw keeps the coarse pass only."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 61)
+
+        sampler = self._run(path, lambda i: 1.0)
+
+        assert sampler.indices == [0, 19, 39, 59]
+
+    def test_refines_where_yaw_changes(self, tmp_path):
+        """Test new samples land in the gap where the yaw ratio jumped."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 61)
+
+        sampler = self._run(path, lambda i: 1.0 if i < 30 else 0.6, max_frames=6)
+
+        assert sampler.indices[:4] == [0, 19, 39, 59]
+        assert len(sampler.indices) == 6
+        assert all(19 < i < 39 for i in sampler.indices[4:])
+
+    def test_refines_where_face_was_lost(self, tmp_path):
+        """Test gaps next to a frame without a face are sampled first."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 61)
+
+        sampler = self._run(path, lambda i: None if i == 59 else 1.0, max_frames=5)
+
+        assert sampler.indices == [0, 19, 39, 59, 49]
+
+    def test_total_frames_capped(self, tmp_path):
+        """Test refinement stops at max_frames however noisy the yaw is."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 120)
+
+        sampler = self._run(path, lambda i: float(i % 2) * 2, max_frames=9)
+
+        assert len(sampler.frames) == 9
+        assert len(set(sampler.indices)) == 9
+
+    def test_no_refinement_without_reports(self, tmp_path):
+        """Test callers that do not report get the coarse pass only."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 61)
+
+        sampler = FrameSampler(str(path), 4, max_frames=10)
+        frames = list(sampler)
+        sampler.close()
+
+        assert len(frames) == 4
+
+    def test_refined_frames_match_seeked_frames(self, tmp_path):
+        """Test refinement decodes the frame at the requested index."""
+        path = tmp_path / "clip.avi"
+        write_test_video(path, 61)
+
+        sampler = self._run(path, lambda i: 1.0 if i < 30 else 0.6, max_frames=5)
+        expected = read_frames(str(path), 60)[sampler.indices[-1]]
+
+        np.testing.assert_array_equal(sampler.frames[-1], expected)
+
+    def test_strategy_accounts_for_decoder_position(self):
+        """Test a far jump from the current position is reached by seeking."""
+        assert choose_read_strategy(np.array([500, 510]), position=20) == "seek"
+        assert choose_read_strategy(np.array([30, 40]), position=20) == "sequential"
+
+
+class TestFrameUploads:
+    """Test cases for decoding uploaded still frames."""
+
+    def test_landscape_frames_rotated_to_rgb(self):
+        """Test frames get the same upright rotation and RGB conversion as video frames."""
+        image = np.zeros((40, 60, 3), dtype=np.uint8)
+        image[:, :, 0] = 255  # blue in BGR
+        data = cv2.imencode(".png", image)[1].tobytes()
+
+        frames, result = consume_images([data, data])
+
+        assert result is None
+        assert len(frames) == 2
+        assert frames[0].shape == (60, 40, 3)
+        assert frames[0][..., 2].min() == 255 and frames[0][..., 0].max() == 0
+
+    def test_consumer_stopping_early_stops_decoding(self):
+        """Test frames after the consumer stops are not decoded."""
+        data = cv2.imencode(".png", np.zeros((60, 40, 3), dtype=np.uint8))[1].tobytes()
+
+        frames, result = consume_images([data, data, b"garbage"], lambda it: next(it).shape)
+
+        assert result == (60, 40, 3)
+        assert len(frames) == 1
+
+    def test_undecodable_frame_rejected(self):
+        """Test a frame OpenCV cannot decode is rejected with 422."""
+        with pytest.raises(UploadRejected) as exc:
+            consume_images([b"\xff\xd8\xff truncated"])
+
+        assert exc.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_too_many_frames_rejected(self):
+        """Test more than the frame limit is rejected with 413 before reading."""
+        uploads = [make_upload(b"\xff\xd8\xff") for _ in range(3)]
+        with patch('app.services.video_utils.settings.upload_max_frames', 2):
+            with pytest.raises(UploadRejected) as exc:
+                await analyze_frame_uploads(uploads)
+
+        assert exc.value.status_code == 413
+        uploads[0].read.assert_not_called()
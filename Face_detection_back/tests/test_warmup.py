@@ -0,0 +1,83 @@
+"""Unit tests for background model warm-up."""
+import threading
+import pytest
+from unittest.mock import MagicMock
+from app.services.warmup import ModelWarmup
+
+
+class TestModelWarmup:
+    """Test cases for ModelWarmup."""
+
+    def test_loaders_run_in_background(self):
+        """Test that start() returns before loading finishes and status tracks progress."""
+        release = threading.Event()
+        warmup = ModelWarmup()
+        warmup.register("slow", lambda: release.wait(5))
+        
+        warmup.start()
+        
+        assert warmup.status()["slow"]["state"] == "loading"
+        assert warmup.is_ready() is False
+        release.set()
+        warmup.wait("slow", timeout=5)
+        assert warmup.status()["slow"]["state"] == "ready"
+        assert warmup.status()["slow"]["seconds"] is not None
+        assert warmup.is_ready() is True
+
+    def test_wait_blocks_while_loading(self):
+        """Test that a request arriving early waits instead of loading again."""
+        release = threading.Event()
+        loader = MagicMock(side_effect=lambda: release.wait(5))
+        warmup = ModelWarmup()
+        warmup.register("model", loader)
+        warmup.start()
+        
+        waiter = threading.Thread(target=warmup.wait, args=("model", 5))
+        waiter.start()
+        waiter.join(0.05)
+        assert waiter.is_alive()
+        
+        release.set()
+        waiter.join(5)
+        assert not waiter.is_alive()
+        assert loader.call_count == 1
+
+    def test_wait_timeout(self):
+        """Test that waiting past the timeout raises."""
+        release = threading.Event()
+        warmup = ModelWarmup()
+        warmup.register("model", lambda: release.wait(5))
+        warmup.start()
+        try:
+            with pytest.raises(TimeoutError):
+                warmup.wait("model", timeout=0.01)
+        finally:
+            release.set()
+
+    def test_wait_without_start_returns_immediately(self):
+        """Test that models never scheduled are left to lazy loading."""
+        loader = MagicMock()
+        warmup = ModelWarmup()
+        warmup.register("model", loader)
+        
+        warmup.wait("model", timeout=0)
+        warmup.wait("unknown", timeout=0)
+        
+        loader.assert_not_called()
+        assert warmup.status()["model"]["state"] == "pending"
+
+    def test_failure_recorded_and_retried(self):
+        """Test that a failed load is reported and retried on the next start."""
+        loader = MagicMock(side_effect=[RuntimeError("no weights"), None])
+        warmup = ModelWarmup()
+        warmup.register("model", loader)
+        
+        warmup.start()
+        warmup.wait("model", timeout=5)
+        assert warmup.status()["model"]["state"] == "failed"
+        assert warmup.status()["model"]["error"] == "no weights"
+        
+        warmup.start()
+        warmup.wait("model", timeout=5)
+        assert warmup.status()["model"]["state"] == "ready"
+        assert warmup.status()["model"]["error"] is None
@@ -0,0 +1,301 @@
+"""
+Benchmarks the verification pipeline on synthetic media and writes JSON.
+
+Measures latency (per call and per stage) and throughput of
+extract_frames_from_video, check_liveness_pose, verify_faces and the whole
+/verify_identity flow, across video resolutions, frame counts and
+concurrency levels. Runs on CPU with no network: videos and the profile
+image are generated (see tools.synthetic_media). verify_faces needs the
+embedding model to be available locally; if it cannot be loaded, the
+verify benchmarks are reported as skipped and the rest still run.
+
+Run from Face_detection_back/:
+
+    python -m tools.benchmark_pipeline --output bench/HEAD.json
+    python -m tools.benchmark_pipeline --output bench/new.json --baseline bench/HEAD.json
+    python -m tools.benchmark_pipeline --resolutions 720x1280 --frame-counts 4 --concurrency 1,2,4,8 --repeats 10
+
+Stage times come from the same per-request trace that feeds Server-Timing;
+with PIPELINE_EXECUTOR=process, stages run in workers are not included.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+from starlette.datastructures import UploadFile
+
+from app.config import get_settings
+from app.services.executor import run_in_executor, shutdown_executor
+from app.services.liveness import check_liveness_pose, select_best_frame
+from app.services.tracing import start_trace
+from app.services.video_utils import analyze_video, extract_frames_from_video, read_frames
+from tools.synthetic_media import parse_resolution, write_profile, write_video
+
+settings = get_settings()
+
+BENCHMARKS = ("extract_frames", "liveness", "verify_faces", "end_to_end")
+SETTINGS_RECORDED = (
+    "pipeline_executor",
+    "pipeline_max_workers",
+    "face_model",
+    "face_detector_backend",
+    "embedding_backend",
+    "face_live_alignment",
+    "face_embedding_cache_enabled",
+    "inference_batching_enabled",
+    "video_in_memory",
+    "video_max_frames",
+    "liveness_analysis_max_side"
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def summarize(latencies_ms: List[float], wall_seconds: float, traces: List[dict]) -> dict:
+    """
+    Aggregates one benchmark configuration.
+
+    Args:
+        latencies_ms: Per-call latencies.
+        wall_seconds: Wall time of the timed phase (all workers).
+        traces: RequestTrace.summary() of every call.
+
+    Returns:
+        Dictionary with calls, latency_ms (mean, p50, p95, min, max),
+        throughput_per_s, stages_ms (mean per call) and counts (mean per call).
+    """
+    calls = len(latencies_ms)
+    stages: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for trace in traces:
+        for name, span in trace["spans"].items():
+            stages[name] = stages.get(name, 0.0) + span["ms"]
+        for name, count in trace["counts"].items():
+            counts[name] = counts.get(name, 0.0) + count
+    return {
+        "calls": calls,
+        "latency_ms": {
+            "mean": round(float(np.mean(latencies_ms)), 2) if calls else 0.0,
+            "p50": round(percentile(latencies_ms, 50), 2),
+            "p95": round(percentile(latencies_ms, 95), 2),
+            "min": round(min(latencies_ms), 2) if calls else 0.0,
+            "max": round(max(latencies_ms), 2) if calls else 0.0
+        },
+        "throughput_per_s": round(calls / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "stages_ms": {name: round(total / calls, 2) for name, total in stages.items()} if calls else {},
+        "counts": {name: round(total / calls, 2) for name, total in counts.items()} if calls else {}
+    }
+
+
+async def measure(call: Callable[[], Awaitable], concurrency: int, repeats: int, warmup: int) -> dict:
+    """Runs ``call`` ``repeats`` times on each of ``concurrency`` concurrent workers, after untimed warm-up calls."""
+    for _ in range(warmup):
+        await call()
+
+    latencies: List[float] = []
+    traces: List[dict] = []
+
+    async def worker():
+        for _ in range(repeats):
+            trace = start_trace()
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+            traces.append(trace.summary())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, traces)
+
+
+def _upload(video_bytes: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(video_bytes), filename="benchmark.mp4")
+
+
+def probe_verify(profile_path: str, frame: np.ndarray, pose: Optional[dict]) -> Optional[str]:
+    """Runs verify_faces once; returns why it cannot be benchmarked, or None if it works."""
+    try:
+        from app.services.face_matcher import verify_faces
+    except Exception as e:
+        return f"face matcher unavailable: {e}"
+    result = verify_faces(profile_path, frame, pose)
+    return result.get("error")
+
+
+async def run_configuration(
+    benchmark: str,
+    video_bytes: bytes,
+    frames: List[np.ndarray],
+    profile_path: str,
+    num_frames: int,
+    concurrency: int,
+    repeats: int,
+    warmup: int
+) -> dict:
+    """Measures one benchmark; ``frames`` are the ``num_frames`` frames sampled from the video."""
+    if benchmark == "extract_frames":
+        async def call():
+            await extract_frames_from_video(_upload(video_bytes), num_frames)
+    elif benchmark == "liveness":
+        async def call():
+            await run_in_executor(check_liveness_pose, frames)
+    elif benchmark == "verify_faces":
+        from app.services.face_matcher import verify_faces
+        _, _, details = await run_in_executor(check_liveness_pose, frames)
+        best_frame, best_pose = select_best_frame(frames, details.get("poses", []))
+
+        async def call():
+            await run_in_executor(verify_faces, profile_path, best_frame, best_pose)
+    else:
+        from app.services.face_matcher import verify_faces
+
+        async def call():
+            decoded, (is_live, _, details) = await analyze_video(_upload(video_bytes), check_liveness_pose, num_frames)
+            if is_live:
+                best_frame, best_pose = select_best_frame(decoded, details.get("poses", []))
+                await run_in_executor(verify_faces, profile_path, best_frame, best_pose)
+
+    return await measure(call, concurrency, repeats, warmup)
+
+
+async def run_suite(args) -> dict:
+    resolutions = [parse_resolution(r) for r in args.resolutions.split(",")]
+    frame_counts = [int(n) for n in args.frame_counts.split(",")]
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    benchmarks = [b for b in args.benchmarks.split(",") if b]
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = []
+    skipped: Dict[str, str] = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+        profile_path = write_profile(os.path.join(workdir, "profile.jpg"))
+
+        for width, height in resolutions:
+            video_path = write_video(os.path.join(workdir, f"video_{width}x{height}.mp4"), width, height, args.video_frames)
+            with open(video_path, "rb") as f:
+                video_bytes = f.read()
+            frames = {n: read_frames(video_path, n) for n in frame_counts}
+
+            verify_benchmarks = {"verify_faces", "end_to_end"} & set(benchmarks)
+            if verify_benchmarks and "verify_faces" not in skipped:
+                first = frames[frame_counts[0]]
+                reason = probe_verify(profile_path, first[0], None) if first else "no frames decoded"
+                if reason:
+                    print(f"Skipping {', '.join(sorted(verify_benchmarks))}: {reason}", file=sys.stderr)
+                    for name in verify_benchmarks:
+                        skipped[name] = reason
+
+            for benchmark in benchmarks:
+                if benchmark in skipped:
+                    continue
+                for num_frames in frame_counts:
+                    for concurrency in concurrency_levels:
+                        print(f"{benchmark} {width}x{height} frames={num_frames} concurrency={concurrency}", file=sys.stderr)
+                        summary = await run_configuration(
+                            benchmark, video_bytes, frames[num_frames], profile_path,
+                            num_frames, concurrency, args.repeats, args.warmup
+                        )
+                        results.append({
+                            "benchmark": benchmark,
+                            "resolution": f"{width}x{height}",
+                            "frames": num_frames,
+                            "concurrency": concurrency,
+                            **summary
+                        })
+
+    return {"meta": run_metadata(args), "skipped": skipped, "results": results}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(args) -> dict:
+    import mediapipe
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"numpy": np.__version__, "opencv": cv2.__version__, "mediapipe": mediapipe.__version__},
+        "settings": {name: getattr(settings, name) for name in SETTINGS_RECORDED},
+        "args": vars(args)
+    }
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """
+    Lines comparing p50 latency and throughput with a baseline run.
+
+    Configurations are matched on benchmark, resolution, frames and concurrency.
+    """
+    def key(result):
+        return result["benchmark"], result["resolution"], result["frames"], result["concurrency"]
+
+    previous = {key(r): r for r in baseline.get("results", [])}
+    lines = []
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        old_p50, new_p50 = old["latency_ms"]["p50"], result["latency_ms"]["p50"]
+        change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        lines.append(
+            f"{result['benchmark']:<15} {result['resolution']:>10} frames={result['frames']:<3} "
+            f"c={result['concurrency']:<3} p50 {old_p50:>9.1f} -> {new_p50:>9.1f} ms ({change:+.1f}%)  "
+            f"throughput {old['throughput_per_s']:.2f} -> {result['throughput_per_s']:.2f}/s"
+        )
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", required=True, help="JSON results file")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help=f"Comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--resolutions", default="360x640,720x1280,1080x1920", help="Comma-separated WIDTHxHEIGHT")
+    parser.add_argument("--frame-counts", default="4,8", help="Comma-separated frames sampled per video")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrent callers")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per caller")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed calls before each configuration")
+    parser.add_argument("--video-frames", type=int, default=30, help="Length of the generated videos")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    args = parser.parse_args(argv)
+
+    try:
+        report = asyncio.run(run_suite(args))
+    finally:
+        shutdown_executor()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n".join(compare(json.load(f), report)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
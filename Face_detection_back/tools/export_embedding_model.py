@@ -0,0 +1,132 @@
+"""
+Exports the configured face embedding model to ONNX or TFLite and checks that
+the exported model reproduces the TensorFlow reference embeddings.
+
+Run from Face_detection_back/:
+
+    python -m tools.export_embedding_model --format onnx --output models/facenet512.onnx
+    python -m tools.export_embedding_model --format tflite --quantize float16 --output models/facenet512_fp16.tflite
+    python -m tools.export_embedding_model --format onnx --output models/facenet512.onnx --check-only --images samples/
+
+Export needs tensorflow plus tf2onnx (ONNX), onnxconverter-common (ONNX
+float16) or onnxruntime (ONNX int8). The check always compares against the
+TensorFlow backend. The process exits with status 1 if the largest cosine
+distance between reference and exported embeddings exceeds the tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.embedding_backend import TensorFlowBackend, OnnxBackend, TFLiteBackend, compare_embeddings
+
+settings = get_settings()
+
+DEFAULT_TOLERANCE = {"none": 1e-4, "float16": 1e-3, "int8": 2e-2}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def export_onnx(keras_model, input_shape, output_path: str, quantize: str) -> None:
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, input_shape[0], input_shape[1], 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=13, output_path=output_path)
+
+    if quantize == "float16":
+        import onnx
+        from onnxconverter_common import float16
+        model = float16.convert_float_to_float16(onnx.load(output_path), keep_io_types=True)
+        onnx.save(model, output_path)
+    elif quantize == "int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        float_path = f"{output_path}.fp32"
+        os.replace(output_path, float_path)
+        try:
+            quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+        finally:
+            os.remove(float_path)
+
+
+def export_tflite(keras_model, output_path: str, quantize: str) -> None:
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+
+def load_inputs(image_dir: str, samples: int, input_shape, seed: int) -> np.ndarray:
+    """Prepared faces from image_dir (if given) plus random inputs of the model shape."""
+    faces: List[np.ndarray] = []
+    if image_dir:
+        from app.services.face_matcher import prepare_face
+        for name in sorted(os.listdir(image_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                face = prepare_face(os.path.join(image_dir, name))
+                if face is not None:
+                    faces.append(face.astype(np.float32))
+
+    rng = np.random.default_rng(seed)
+    if samples:
+        faces.append(rng.random((samples, input_shape[0], input_shape[1], 3), dtype=np.float32))
+    return np.concatenate(faces, axis=0)
+
+
+def check_export(reference: TensorFlowBackend, fmt: str, model_path: str, inputs: np.ndarray, tolerance: float) -> dict:
+    """
+    Embeds the inputs with the reference and the exported model and compares them.
+
+    Returns:
+        compare_embeddings result plus format, model path, input count,
+        tolerance and a passed flag.
+    """
+    candidate = OnnxBackend(model_path) if fmt == "onnx" else TFLiteBackend(model_path)
+    stats = compare_embeddings(reference.embed(inputs), candidate.embed(inputs))
+    stats.update({
+        "format": fmt,
+        "model_path": model_path,
+        "inputs": int(inputs.shape[0]),
+        "tolerance": tolerance,
+        "passed": stats["max_cosine_distance"] <= tolerance
+    })
+    return stats
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--format", choices=("onnx", "tflite"), required=True)
+    parser.add_argument("--output", required=True, help="Exported model file")
+    parser.add_argument("--quantize", choices=("none", "float16", "int8"), default="none")
+    parser.add_argument("--check-only", action="store_true", help="Skip export, only check an existing file")
+    parser.add_argument("--images", help="Directory of face images to check with (in addition to random inputs)")
+    parser.add_argument("--samples", type=int, default=16, help="Random inputs to check with")
+    parser.add_argument("--tolerance", type=float, help="Max cosine distance to the reference (default depends on --quantize)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    reference = TensorFlowBackend(settings.face_model)
+    if not args.check_only:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        if args.format == "onnx":
+            export_onnx(reference.keras_model, reference.input_shape, args.output, args.quantize)
+        else:
+            export_tflite(reference.keras_model, args.output, args.quantize)
+
+    tolerance = args.tolerance if args.tolerance is not None else DEFAULT_TOLERANCE[args.quantize]
+    inputs = load_inputs(args.images, args.samples, reference.input_shape, args.seed)
+    result = check_export(reference, args.format, args.output, inputs, tolerance)
+    print(json.dumps(result, indent=2))
+    return 0 if result["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
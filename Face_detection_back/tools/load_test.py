@@ -0,0 +1,290 @@
+"""
+Drives /verify_identity on a running instance and reports latency,
+throughput and error rates.
+
+Replays a corpus of (profile image, video) pairs at a fixed concurrency
+(closed loop: each worker sends its next request when the previous one
+returns) or at a target request rate (open loop: requests start on
+schedule whether or not earlier ones finished, and latency is measured from
+the scheduled start so a saturated server cannot hide its queueing).
+
+Run from Face_detection_back/:
+
+    python -m tools.load_test --url http://localhost:8000 --concurrency 8 --duration 60
+    python -m tools.load_test --url http://localhost:8000 --rps 4 --duration 60 --corpus samples/ --output load.json
+    python -m tools.load_test --calibrate bench/HEAD.json
+
+A corpus directory holds videos (.mp4, .mov, .webm, .mkv, .avi) and, for
+each, a profile image with the same name (or one shared profile.jpg).
+Without --corpus, a synthetic pair is generated (see tools.synthetic_media).
+
+To load-test the web, upload and decode layers on their own, start the
+server with FAKE_MODELS=true: FaceMesh, the face detector and the embedding
+model are replaced by sleeps (FAKE_MODEL_COST=sleep) or CPU burners (burn)
+of FAKE_FACE_MESH_MS / FAKE_DETECTOR_MS / FAKE_EMBEDDING_MS each. --calibrate
+prints those values as measured by tools.benchmark_pipeline on this machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from tools.synthetic_media import parse_resolution, write_profile, write_video
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".mkv", ".avi")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def load_corpus(directory: str) -> List[Tuple[str, str]]:
+    """
+    Pairs each video in a directory with its profile image.
+
+    Returns:
+        List of (profile path, video path), sorted by video name.
+
+    Raises:
+        ValueError: If a video has no matching or shared profile image, or there are no videos.
+    """
+    names = sorted(os.listdir(directory))
+    images = {os.path.splitext(n)[0]: n for n in names if n.lower().endswith(IMAGE_EXTENSIONS)}
+    pairs = []
+    for name in names:
+        if not name.lower().endswith(VIDEO_EXTENSIONS):
+            continue
+        profile = images.get(os.path.splitext(name)[0]) or images.get("profile")
+        if profile is None:
+            raise ValueError(f"No profile image for {name}")
+        pairs.append((os.path.join(directory, profile), os.path.join(directory, name)))
+    if not pairs:
+        raise ValueError(f"No videos in {directory}")
+    return pairs
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Durations (ms) by name from a Server-Timing header; entries without dur are skipped."""
+    timings: Dict[str, float] = {}
+    for entry in (header or "").split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        for param in parts[1:]:
+            if param.startswith("dur="):
+                timings[parts[0]] = float(param[4:])
+    return timings
+
+
+def calibration(benchmark: dict) -> Dict[str, float]:
+    """
+    FAKE_* settings from a tools.benchmark_pipeline results file.
+
+    Uses the single-caller liveness and verify_faces results: FaceMesh time
+    per analyzed frame, and live embedding time per call. The detector only
+    runs on profile cache misses, so its cost is the profile embedding time
+    minus one embedding.
+    """
+    def stages(benchmark_name):
+        for result in benchmark.get("results", []):
+            if result["benchmark"] == benchmark_name and result["concurrency"] == 1:
+                return result
+        return None
+
+    values = {}
+    liveness = stages("liveness")
+    if liveness and liveness["counts"].get("frames_analyzed"):
+        values["FAKE_FACE_MESH_MS"] = round(liveness["stages_ms"]["face_mesh"] / liveness["counts"]["frames_analyzed"], 1)
+    verify = stages("verify_faces")
+    if verify and "embedding" in verify["stages_ms"]:
+        embedding = verify["stages_ms"]["embedding"]
+        values["FAKE_EMBEDDING_MS"] = round(embedding, 1)
+        if "profile_embedding" in verify["stages_ms"]:
+            values["FAKE_DETECTOR_MS"] = round(max(verify["stages_ms"]["profile_embedding"] - embedding, 0.0), 1)
+    return values
+
+
+class LoadTest:
+    """Sends verification requests and collects one record per request."""
+
+    def __init__(self, client: httpx.AsyncClient, path: str, corpus: List[Tuple[str, str]]):
+        self.client = client
+        self.path = path
+        self.records: List[dict] = []
+        self._files = [(self._read(profile), self._read(video), os.path.basename(video)) for profile, video in corpus]
+        self._next = 0
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def send(self, scheduled: float = None) -> None:
+        """Sends the next corpus pair; latency counts from ``scheduled`` if given."""
+        profile, video, video_name = self._files[self._next % len(self._files)]
+        self._next += 1
+        start = scheduled if scheduled is not None else time.perf_counter()
+        record = {"status_code": None, "status": None, "error": None, "server_timing": {}}
+        try:
+            response = await self.client.post(self.path, files={
+                "profile_image": ("profile.jpg", profile, "image/jpeg"),
+                "live_video": (video_name, video, "video/mp4")
+            })
+            record["status_code"] = response.status_code
+            record["server_timing"] = parse_server_timing(response.headers.get("server-timing"))
+            try:
+                record["status"] = response.json().get("status")
+            except ValueError:
+                pass
+        except httpx.HTTPError as e:
+            record["error"] = type(e).__name__
+        record["latency_ms"] = (time.perf_counter() - start) * 1000
+        self.records.append(record)
+
+    async def closed_loop(self, concurrency: int, duration: float, max_requests: int = None) -> None:
+        deadline = time.perf_counter() + duration
+        sent = 0
+
+        async def worker():
+            nonlocal sent
+            while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+                sent += 1
+                await self.send()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, rps: float, duration: float, max_requests: int = None, poisson: bool = False) -> None:
+        start = time.perf_counter()
+        scheduled = start
+        tasks = []
+        rng = random.Random(0)
+        while scheduled < start + duration and (max_requests is None or len(tasks) < max_requests):
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.send(scheduled)))
+            scheduled += rng.expovariate(rps) if poisson else 1.0 / rps
+        await asyncio.gather(*tasks)
+
+
+def report(records: List[dict], wall_seconds: float) -> dict:
+    """
+    Summarizes request records.
+
+    Returns:
+        Dictionary with requests, wall_seconds, throughput_per_s (completed
+        2xx per second), latency_ms (p50, p95, p99, mean, max over all
+        requests that got a response), error_rate (non-2xx responses and
+        transport errors), status_codes, outcomes (response "status" field),
+        transport_errors and server_timing_ms (mean per stage over 2xx responses).
+    """
+    latencies = [r["latency_ms"] for r in records if r["status_code"] is not None]
+    ok = [r for r in records if r["status_code"] is not None and 200 <= r["status_code"] < 300]
+    status_codes: Dict[str, int] = {}
+    outcomes: Dict[str, int] = {}
+    transport_errors: Dict[str, int] = {}
+    stage_totals: Dict[str, float] = {}
+    for r in records:
+        if r["error"]:
+            transport_errors[r["error"]] = transport_errors.get(r["error"], 0) + 1
+            continue
+        code = str(r["status_code"])
+        status_codes[code] = status_codes.get(code, 0) + 1
+        if r["status"]:
+            outcomes[r["status"]] = outcomes.get(r["status"], 0) + 1
+        if 200 <= r["status_code"] < 300:
+            for name, ms in r["server_timing"].items():
+                stage_totals[name] = stage_totals.get(name, 0.0) + ms
+
+    def pct(q):
+        return round(float(np.percentile(latencies, q)), 2) if latencies else 0.0
+
+    return {
+        "requests": len(records),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_s": round(len(ok) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "latency_ms": {
+            "p50": pct(50),
+            "p95": pct(95),
+            "p99": pct(99),
+            "mean": round(float(np.mean(latencies)), 2) if latencies else 0.0,
+            "max": round(max(latencies), 2) if latencies else 0.0
+        },
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else 0.0,
+        "status_codes": status_codes,
+        "outcomes": outcomes,
+        "transport_errors": transport_errors,
+        "server_timing_ms": {name: round(total / len(ok), 2) for name, total in stage_totals.items()} if ok else {}
+    }
+
+
+async def run(args, transport: httpx.AsyncBaseTransport = None) -> dict:
+    with tempfile.TemporaryDirectory(prefix="load-test-") as workdir:
+        if args.corpus:
+            corpus = load_corpus(args.corpus)
+        else:
+            width, height = parse_resolution(args.resolution)
+            corpus = [(
+                write_profile(os.path.join(workdir, "profile.jpg")),
+                write_video(os.path.join(workdir, "video.mp4"), width, height)
+            )]
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits, transport=transport) as client:
+            test = LoadTest(client, args.path, corpus)
+            start = time.perf_counter()
+            if args.rps:
+                await test.open_loop(args.rps, args.duration, args.requests, args.poisson)
+            else:
+                await test.closed_loop(args.concurrency, args.duration, args.requests)
+            wall = time.perf_counter() - start
+
+    summary = report(test.records, wall)
+    summary["config"] = {
+        "url": args.url,
+        "path": args.path,
+        "mode": "open" if args.rps else "closed",
+        "rps": args.rps,
+        "concurrency": None if args.rps else args.concurrency,
+        "duration": args.duration,
+        "corpus_pairs": len(corpus)
+    }
+    return summary
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/verify_identity")
+    parser.add_argument("--corpus", help="Directory of videos and profile images")
+    parser.add_argument("--resolution", default="720x1280", help="Synthetic video size when no corpus is given")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed loop: concurrent clients")
+    parser.add_argument("--rps", type=float, help="Open loop: target requests per second (overrides --concurrency)")
+    parser.add_argument("--poisson", action="store_true", help="Open loop: exponential inter-arrival times")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write the JSON report here as well")
+    parser.add_argument("--calibrate", metavar="BENCHMARK_JSON", help="Print FAKE_* settings from a benchmark run and exit")
+    args = parser.parse_args(argv)
+
+    if args.calibrate:
+        with open(args.calibrate) as f:
+            for name, value in calibration(json.load(f)).items():
+                print(f"{name}={value}")
+        return 0
+
+    summary = asyncio.run(run(args))
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
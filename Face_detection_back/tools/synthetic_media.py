@@ -0,0 +1,120 @@
+"""
+Synthetic faces and head-turn videos for benchmarks and load tests.
+
+The faces are flat drawings, but MediaPipe FaceMesh finds landmarks on them,
+and shifting the features sideways moves the yaw ratio the liveness check
+measures (turn 0 -> ~1.0, turn 0.4 -> ~2.0). Generated media is deterministic
+and needs no network, dataset or GPU.
+
+    python -m tools.synthetic_media --output samples/ --resolution 720x1280 --frames 30
+"""
+import argparse
+import os
+import sys
+from typing import List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+SKIN = (150, 180, 225)
+HAIR = (40, 40, 60)
+BACKGROUND = (200, 210, 220)
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    """Parses "WIDTHxHEIGHT" into (width, height)."""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def draw_face(width: int, height: int, turn: float = 0.0) -> np.ndarray:
+    """
+    Draws a frontal face, with the features shifted by ``turn`` to fake yaw.
+
+    Args:
+        width: Image width in pixels.
+        height: Image height in pixels.
+        turn: Feature shift as a fraction of half the face width; positive
+            values read as the head turned left, negative as right.
+
+    Returns:
+        BGR uint8 image.
+    """
+    img = np.full((height, width, 3), BACKGROUND, np.uint8)
+    cx, cy = width // 2, height // 2
+    fw = int(min(width, height / 1.3) * 0.30)
+    fh = int(fw * 1.3)
+    dx = int(turn * fw * 0.5)
+
+    cv2.ellipse(img, (cx, cy), (fw, fh), 0, 0, 360, SKIN, -1)
+    cv2.ellipse(img, (cx, cy - fh + fh // 4), (fw, fh // 3), 0, 180, 360, HAIR, -1)
+
+    eye_y = cy - fh // 5
+    for side in (-1, 1):
+        eye = (cx + side * fw // 2 + dx, eye_y)
+        cv2.ellipse(img, eye, (fw // 6, fw // 12), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(img, eye, fw // 14, (60, 40, 30), -1)
+        brow_y = eye_y - fw // 6
+        cv2.line(img, (eye[0] - fw // 6, brow_y), (eye[0] + fw // 6, brow_y), HAIR, fw // 25 + 1)
+
+    nose = np.array([[cx + dx, eye_y + fw // 8], [cx + dx - fw // 8, cy + fh // 6], [cx + dx + fw // 8, cy + fh // 6]])
+    cv2.polylines(img, [nose], True, (110, 140, 190), max(1, fw // 40))
+    cv2.ellipse(img, (cx + dx, cy + fh // 2), (fw // 3, fw // 10), 0, 0, 180, (80, 80, 170), -1)
+    return img
+
+
+def head_turn_schedule(num_frames: int, hold: float = 0.4, max_turn: float = 0.6) -> List[float]:
+    """Turn per frame: frontal for the first ``hold`` of the clip, then a steady turn to the left."""
+    hold_frames = int(num_frames * hold)
+    turning = max(num_frames - hold_frames, 1)
+    return [0.0] * hold_frames + [max_turn * (i + 1) / turning for i in range(num_frames - hold_frames)]
+
+
+def write_video(path: str, width: int, height: int, num_frames: int = 30, fps: float = 15.0, turns: Sequence[float] = None) -> str:
+    """
+    Writes a head-turn video (frontal, then turning left) as MP4.
+
+    Landscape sizes are stored rotated, like phone footage, so the decoder's
+    upright rotation turns them back into a portrait face.
+
+    Returns:
+        The path written.
+    """
+    turns = list(turns) if turns is not None else head_turn_schedule(num_frames)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"OpenCV cannot write {path}")
+    try:
+        for turn in turns:
+            if width > height:
+                writer.write(cv2.rotate(draw_face(height, width, turn), cv2.ROTATE_90_COUNTERCLOCKWISE))
+            else:
+                writer.write(draw_face(width, height, turn))
+    finally:
+        writer.release()
+    return path
+
+
+def write_profile(path: str, width: int = 480, height: int = 640) -> str:
+    """Writes a frontal profile image of the same synthetic face."""
+    cv2.imwrite(path, draw_face(width, height))
+    return path
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", required=True, help="Directory to write profile.jpg and video_<WxH>.mp4 to")
+    parser.add_argument("--resolution", default="720x1280", help="Video size as WIDTHxHEIGHT")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--fps", type=float, default=15.0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    width, height = parse_resolution(args.resolution)
+    print(write_profile(os.path.join(args.output, "profile.jpg")))
+    print(write_video(os.path.join(args.output, f"video_{width}x{height}.mp4"), width, height, args.frames, args.fps))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())